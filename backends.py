@@ -0,0 +1,656 @@
+"""
+Model backends for the debate system.
+A small interface for sync/async generation, streaming and usage reporting,
+with a Google Gemini implementation and an offline stub for tests and benchmarks.
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple, Union
+
+from rate_limiter import RateLimiter, TokenBucket, estimate_tokens, get_rate_limiter
+
+_env_loaded = False
+
+
+def load_env():
+    """Load ``.env`` into the environment once, the first time a key is needed."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def _genai() -> Any:
+    """``google.generativeai``, imported on first use: it takes most of a second to load."""
+    import google.generativeai as genai
+    return genai
+
+
+DEFAULT_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
+]
+
+
+@dataclass
+class Usage:
+    """Token usage reported for one call (None when the backend did not say).
+
+    ``cached_tokens`` is the part of ``prompt_tokens`` served from a context cache.
+    """
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+
+
+@dataclass
+class GenerationResult:
+    """Text of one generation plus its metadata.
+
+    ``text`` is empty when the model returned no content; ``finish_reason`` is
+    None when it returned no candidates at all.
+    """
+    text: str
+    usage: Usage = field(default_factory=Usage)
+    finish_reason: Any = None
+
+
+@dataclass
+class GenerationChunk:
+    """One piece of a streamed generation. The last chunk carries usage, if known."""
+    text: str
+    usage: Optional[Usage] = None
+    finish_reason: Any = None
+
+
+@dataclass
+class ContextCache:
+    """A prompt prefix stored on the provider side.
+
+    Calls made with it send only the rest of the prompt; ``handle`` is
+    whatever the backend needs to use the cache.
+    """
+    name: str
+    prefix: str
+    tokens: int
+    expires: float
+    handle: Any = None
+
+    def expired(self, margin: float = 0.0) -> bool:
+        return time.time() + margin >= self.expires
+
+
+class ModelBackend:
+    """Interface every model backend implements.
+
+    Backends that can cache a prompt prefix on the provider side implement
+    ``create_context_cache``; ``generate`` and friends then take the cache and
+    the rest of the prompt. Backends that cannot return None and only ever
+    see full prompts. Backends that can return several candidates for one
+    request set ``max_candidates`` and implement ``generate_candidates``.
+    """
+
+    model_name: str = "unknown"
+    temperature: float = 0.7
+    max_output_tokens: int = 1000
+    # Shortest prefix worth caching (providers have a minimum)
+    min_context_cache_tokens: int = 0
+    # Most candidates one request can return (1: ask for separate samples instead)
+    max_candidates: int = 1
+
+    def __init__(self):
+        self._usage_lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+
+    def generate(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        """Generate a full response for ``prompt`` (appended to ``context_cache``'s prefix, if given)."""
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        """Async version of ``generate``."""
+        raise NotImplementedError
+
+    def stream(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Iterator[GenerationChunk]:
+        """Yield the response as it is produced. Defaults to one chunk."""
+        result = self.generate(prompt, context_cache)
+        yield GenerationChunk(result.text, result.usage, result.finish_reason)
+
+    async def stream_async(self, prompt: str,
+                           context_cache: Optional[ContextCache] = None) -> AsyncIterator[GenerationChunk]:
+        """Async version of ``stream``."""
+        result = await self.generate_async(prompt, context_cache)
+        yield GenerationChunk(result.text, result.usage, result.finish_reason)
+
+    def generate_candidates(self, prompt: str, count: int,
+                            context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        """``count`` (at most ``max_candidates``) alternative responses from one request.
+
+        The request's usage is reported on the first result only.
+        """
+        raise NotImplementedError
+
+    async def generate_candidates_async(self, prompt: str, count: int,
+                                        context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        """Async version of ``generate_candidates``."""
+        raise NotImplementedError
+
+    def create_context_cache(self, prefix: str, ttl_seconds: float) -> Optional[ContextCache]:
+        """Store ``prefix`` on the provider for ``ttl_seconds``; None if not supported or too short."""
+        return None
+
+    def delete_context_cache(self, cache: ContextCache):
+        """Release a context cache before it expires."""
+
+    def for_role(self, role: str) -> "ModelBackend":
+        """Backend to use for one debate role's calls (the same backend unless it routes by role)."""
+        return self
+
+    def default_rate_limiter(self) -> RateLimiter:
+        """Limiter used when the caller does not supply one."""
+        return RateLimiter()
+
+    def generation_config(self) -> dict:
+        """Settings that change what the model returns for a prompt (used as cache identity)."""
+        return {'temperature': self.temperature, 'max_output_tokens': self.max_output_tokens}
+
+    def record_usage(self, usage: Usage):
+        """Add one call's usage to the backend totals."""
+        with self._usage_lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.output_tokens += usage.output_tokens or 0
+            self.cached_tokens += usage.cached_tokens or 0
+
+    def usage_summary(self) -> dict:
+        """Cumulative calls and tokens for this backend."""
+        with self._usage_lock:
+            return {
+                'calls': self.calls,
+                'prompt_tokens': self.prompt_tokens,
+                'output_tokens': self.output_tokens,
+                'cached_tokens': self.cached_tokens,
+            }
+
+
+class _GeminiClients:
+    """SDK clients for one API key, made without ``genai.configure``.
+
+    ``genai.configure`` sets a single key for the whole process, so two
+    backends with different keys would both end up using the last one.
+    """
+
+    def __init__(self, api_key: Optional[str]):
+        from google.generativeai import client as genai_client
+        self._manager = genai_client._ClientManager()
+        self._manager.configure(api_key=api_key)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """The key's client for an SDK service ("generative", "generative_async", "cache")."""
+        with self._lock:
+            return self._manager.get_default_client(name)
+
+
+_gemini_clients: dict = {}
+_gemini_clients_lock = threading.Lock()
+
+
+def gemini_clients(api_key: Optional[str]) -> _GeminiClients:
+    """Process-wide SDK clients for an API key, created on first use."""
+    with _gemini_clients_lock:
+        clients = _gemini_clients.get(api_key)
+        if clients is None:
+            clients = _gemini_clients[api_key] = _GeminiClients(api_key)
+        return clients
+
+
+_gemini_models: dict = {}
+_gemini_models_lock = threading.Lock()
+
+
+def gemini_model(api_key: Optional[str], model_name: str, temperature: float, max_output_tokens: int,
+                 safety_settings: List[dict]) -> Any:
+    """Process-wide ``GenerativeModel`` for a key, model and generation config, created on first use.
+
+    Backends with the same settings (e.g. one per debate system in a sweep)
+    share the configured model and its clients instead of building their own.
+    """
+    key = (api_key, model_name, temperature, max_output_tokens,
+           tuple(tuple(sorted(setting.items())) for setting in safety_settings))
+    with _gemini_models_lock:
+        model = _gemini_models.get(key)
+        if model is None:
+            genai = _genai()
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_output_tokens,
+                ),
+                safety_settings=safety_settings
+            )
+            model._client = gemini_clients(api_key).get("generative")
+            _gemini_models[key] = model
+        return model
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini through ``google.generativeai``.
+
+    Each backend talks to the API with its own key's clients (see
+    ``gemini_clients``), so backends for several keys can run side by side.
+    The SDK is only imported, and the model only configured (once per process
+    for each key, model and generation config, see ``gemini_model``), when
+    the first call is made.
+
+    Context caches use the Gemini caching API (explicit ``CachedContent``);
+    prefixes shorter than ``min_context_cache_tokens`` are not cached, since
+    the API rejects them. ``generate_candidates`` sets the generation config's
+    ``candidate_count``; pass ``max_candidates=1`` for models that reject it.
+    ``request_timeout`` (seconds) is sent with every request, so the SDK gives
+    up on a hung call itself rather than only the caller's timeout abandoning it.
+    """
+
+    def __init__(self, model_name: str = "gemini-2.0-flash-exp", temperature: float = 0.7,
+                 max_output_tokens: int = 1000, api_key: Optional[str] = None,
+                 safety_settings: Optional[List[dict]] = None, min_context_cache_tokens: int = 4096,
+                 max_candidates: int = 8, request_timeout: Optional[float] = 120.0):
+        super().__init__()
+        load_env()
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.min_context_cache_tokens = min_context_cache_tokens
+        self.max_candidates = max_candidates
+        self.request_timeout = request_timeout
+        self._safety_settings = safety_settings or DEFAULT_SAFETY_SETTINGS
+
+    @property
+    def _clients(self) -> _GeminiClients:
+        return gemini_clients(self.api_key)
+
+    @property
+    def model(self) -> Any:
+        """The configured ``GenerativeModel`` (shared, see ``gemini_model``)."""
+        return gemini_model(self.api_key, self.model_name, self.temperature, self.max_output_tokens,
+                            self._safety_settings)
+
+    def _bind(self, model: Any) -> Any:
+        """Point a model at this backend's key instead of the process-wide default client."""
+        model._client = self._clients.get("generative")
+        return model
+
+    @staticmethod
+    def _usage(response: Any) -> Usage:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return Usage()
+        return Usage(
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+            total_tokens=getattr(usage, "total_token_count", None),
+            cached_tokens=getattr(usage, "cached_content_token_count", None) or None,
+        )
+
+    @classmethod
+    def _result(cls, response: Any) -> GenerationResult:
+        usage = cls._usage(response)
+        if response.candidates and len(response.candidates) > 0:
+            candidate = response.candidates[0]
+            if candidate.content and candidate.content.parts:
+                return GenerationResult(candidate.content.parts[0].text, usage, candidate.finish_reason)
+            return GenerationResult("", usage, candidate.finish_reason)
+        return GenerationResult("", usage, None)
+
+    @classmethod
+    def _candidate_results(cls, response: Any) -> List[GenerationResult]:
+        usage = cls._usage(response)
+        results = []
+        for candidate in response.candidates or []:
+            text = candidate.content.parts[0].text if candidate.content and candidate.content.parts else ""
+            results.append(GenerationResult(text, usage if not results else Usage(), candidate.finish_reason))
+        return results or [GenerationResult("", usage, None)]
+
+    def _candidate_config(self, count: int) -> Any:
+        return _genai().types.GenerationConfig(
+            temperature=self.temperature,
+            max_output_tokens=self.max_output_tokens,
+            candidate_count=count,
+        )
+
+    @staticmethod
+    def _chunk_text(chunk: Any) -> str:
+        if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
+            return "".join(part.text for part in chunk.candidates[0].content.parts)
+        return ""
+
+    def _request_options(self) -> Optional[dict]:
+        return {'timeout': self.request_timeout} if self.request_timeout is not None else None
+
+    def _model(self, context_cache: Optional[ContextCache]) -> Any:
+        return context_cache.handle if context_cache is not None else self.model
+
+    def _async_model(self, context_cache: Optional[ContextCache]) -> Any:
+        model = self._model(context_cache)
+        if model._async_client is None:
+            # Created on first use, inside the event loop
+            model._async_client = self._clients.get("generative_async")
+        return model
+
+    def generate(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        response = self._model(context_cache).generate_content(prompt, request_options=self._request_options())
+        result = self._result(response)
+        self.record_usage(result.usage)
+        return result
+
+    async def generate_async(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        response = await self._async_model(context_cache).generate_content_async(
+            prompt, request_options=self._request_options())
+        result = self._result(response)
+        self.record_usage(result.usage)
+        return result
+
+    def stream(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Iterator[GenerationChunk]:
+        last = None
+        for chunk in self._model(context_cache).generate_content(prompt, stream=True,
+                                                                 request_options=self._request_options()):
+            last = chunk
+            text = self._chunk_text(chunk)
+            if text:
+                yield GenerationChunk(text)
+        if last is not None:
+            usage = self._usage(last)
+            self.record_usage(usage)
+            finish_reason = last.candidates[0].finish_reason if last.candidates else None
+            yield GenerationChunk("", usage, finish_reason)
+
+    async def stream_async(self, prompt: str,
+                           context_cache: Optional[ContextCache] = None) -> AsyncIterator[GenerationChunk]:
+        last = None
+        async for chunk in await self._async_model(context_cache).generate_content_async(
+                prompt, stream=True, request_options=self._request_options()):
+            last = chunk
+            text = self._chunk_text(chunk)
+            if text:
+                yield GenerationChunk(text)
+        if last is not None:
+            usage = self._usage(last)
+            self.record_usage(usage)
+            finish_reason = last.candidates[0].finish_reason if last.candidates else None
+            yield GenerationChunk("", usage, finish_reason)
+
+    def generate_candidates(self, prompt: str, count: int,
+                            context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        response = self._model(context_cache).generate_content(
+            prompt, generation_config=self._candidate_config(count), request_options=self._request_options())
+        results = self._candidate_results(response)
+        self.record_usage(results[0].usage)
+        return results
+
+    async def generate_candidates_async(self, prompt: str, count: int,
+                                        context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        response = await self._async_model(context_cache).generate_content_async(
+            prompt, generation_config=self._candidate_config(count), request_options=self._request_options())
+        results = self._candidate_results(response)
+        self.record_usage(results[0].usage)
+        return results
+
+    def create_context_cache(self, prefix: str, ttl_seconds: float) -> Optional[ContextCache]:
+        tokens = estimate_tokens(prefix)
+        if tokens < self.min_context_cache_tokens:
+            return None
+        genai = _genai()
+        request = genai.caching.CachedContent._prepare_create_request(
+            model=self.model_name, contents=[prefix], ttl=int(ttl_seconds))
+        try:
+            cached = genai.caching.CachedContent._from_obj(self._clients.get("cache").create_cached_content(request))
+        except Exception as e:
+            # Not every model supports caching; the prompt is then sent in full
+            print(f"⚠️  Context cache unavailable for {self.model_name}: {e}")
+            return None
+        model = self._bind(genai.GenerativeModel.from_cached_content(
+            cached_content=cached, generation_config=self.model._generation_config,
+            safety_settings=self._safety_settings))
+        return ContextCache(cached.name, prefix, tokens, time.time() + ttl_seconds, model)
+
+    def delete_context_cache(self, cache: ContextCache):
+        try:
+            self._clients.get("cache").delete_cached_content(
+                _genai().protos.DeleteCachedContentRequest(name=cache.name))
+        except Exception as e:
+            print(f"⚠️  Could not delete context cache {cache.name}: {e}")
+
+    def default_rate_limiter(self) -> RateLimiter:
+        # Gemini quotas are per model, so each model on a key gets its own limiter
+        return get_rate_limiter(
+            self.api_key,
+            requests_per_minute=float(os.getenv("GEMINI_RPM", "60")),
+            tokens_per_minute=float(os.getenv("GEMINI_TPM", "1000000")),
+            scope=self.model_name,
+        )
+
+
+class StubBackendError(RuntimeError):
+    """Failure injected by ``StubBackend``; treated as transient, like a 429/503."""
+    retryable = True
+
+
+class StubRateLimitError(StubBackendError):
+    """``StubBackend`` quota exceeded, reported like a provider 429."""
+    code = 429
+
+
+_STUB_SENTENCES = [
+    "Research shows that the question has practical consequences for most communities.",
+    "According to recent data, usage patterns have shifted over the last decade.",
+    "However, the cost of a full transition is a real concern for smaller institutions.",
+    "First, access must remain equitable; second, budgets are limited.",
+    "A realistic plan would implement changes gradually and measure outcomes.",
+    "One risk is that long-term preservation becomes harder to guarantee.",
+    "For example, several pilot programs reported higher engagement.",
+    "Therefore, a balanced approach is both feasible and achievable.",
+    "Critics point to the limitation of relying on a single vendor.",
+    "In conclusion, the evidence favours a mixed strategy with clear milestones.",
+    "Statistics on circulation suggest demand is still strong.",
+    "Clearly, the decision depends on local needs and available time.",
+]
+
+
+class StubBackend(ModelBackend):
+    """Offline backend with deterministic text, simulated latency and failure injection.
+
+    Output depends only on ``seed``, the prompt and how many times that prompt has
+    been seen, so runs are reproducible even when calls happen concurrently.
+
+    ``latency`` is a fixed number of seconds, a ``(low, high)`` uniform range, or a
+    callable taking a ``random.Random`` and returning seconds. ``failure_rate`` is
+    the probability a call raises ``error_factory()``.
+
+    With ``context_caching`` the stub stands in for a provider context cache:
+    a call through a cache answers exactly as for the full prompt but reports
+    the prefix as cached tokens, and ``prefill_latency`` (seconds per 1000
+    prompt tokens) is only charged for the uncached part.
+
+    ``generate_candidates`` returns up to ``max_candidates`` texts per request;
+    the first is the text ``generate`` would have given.
+
+    ``requests_per_minute`` simulates a provider quota: calls beyond it are
+    rejected at once with ``StubRateLimitError`` (a 429).
+    """
+
+    def __init__(self, model_name: str = "stub", temperature: float = 0.7,
+                 max_output_tokens: int = 1000, seed: int = 0,
+                 latency: Union[float, Tuple[float, float], Callable[[random.Random], float]] = 0.0,
+                 failure_rate: float = 0.0, sentences: int = 6, chunk_words: int = 8,
+                 error_factory: Callable[[], Exception] = lambda: StubBackendError("injected failure"),
+                 context_caching: bool = False, min_context_cache_tokens: int = 0, prefill_latency: float = 0.0,
+                 max_candidates: int = 8, requests_per_minute: Optional[float] = None):
+        super().__init__()
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.seed = seed
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sentences = sentences
+        self.chunk_words = chunk_words
+        self.error_factory = error_factory
+        self.context_caching = context_caching
+        self.min_context_cache_tokens = min_context_cache_tokens
+        self.prefill_latency = prefill_latency
+        self.max_candidates = max_candidates
+        self.requests_per_minute = requests_per_minute
+        self._quota = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self.rejected = 0
+        self.context_caches: List[ContextCache] = []
+        self.prompts: List[str] = []
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def generation_config(self) -> dict:
+        config = super().generation_config()
+        config.update(seed=self.seed, sentences=self.sentences)
+        return config
+
+    def _rng(self, prompt: str) -> random.Random:
+        with self._lock:
+            self.prompts.append(prompt)
+            attempt = self._seen.get(prompt, 0)
+            self._seen[prompt] = attempt + 1
+        digest = hashlib.sha256(f"{self.seed}:{attempt}:{prompt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _admit(self):
+        """Reject the call if it is over the simulated quota."""
+        if self._quota is not None and self._quota.reserve(1) > 0:
+            self._quota.refund(1)
+            with self._lock:
+                self.rejected += 1
+            raise StubRateLimitError(f"{self.model_name}: quota of {self.requests_per_minute:g} requests/min exceeded")
+
+    def _delay(self, rng: random.Random) -> float:
+        if callable(self.latency):
+            return max(0.0, float(self.latency(rng)))
+        if isinstance(self.latency, tuple):
+            return rng.uniform(*self.latency)
+        return float(self.latency)
+
+    def _plan(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Tuple[float, bool, GenerationResult]:
+        delay, fail, results = self._plan_candidates(prompt, 1, context_cache)
+        return delay, fail, results[0]
+
+    def _plan_candidates(self, prompt: str, count: int,
+                         context_cache: Optional[ContextCache] = None) -> Tuple[float, bool, List[GenerationResult]]:
+        cached = 0
+        if context_cache is not None:
+            prompt = context_cache.prefix + prompt
+            cached = context_cache.tokens
+        rng = self._rng(prompt)
+        delay = self._delay(rng)
+        fail = rng.random() < self.failure_rate
+        texts = [" ".join(rng.choice(_STUB_SENTENCES) for _ in range(self.sentences)) for _ in range(count)]
+        usage = Usage(estimate_tokens(prompt), sum(map(estimate_tokens, texts)), cached_tokens=cached or None)
+        usage.total_tokens = usage.prompt_tokens + usage.output_tokens
+        delay += self.prefill_latency * (usage.prompt_tokens - cached) / 1000
+        results = [GenerationResult(text, usage if i == 0 else Usage(), "STOP") for i, text in enumerate(texts)]
+        return delay, fail, results
+
+    def _chunks(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [" ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else "")
+                for i in range(0, len(words), self.chunk_words)]
+
+    def generate(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        self._admit()
+        delay, fail, result = self._plan(prompt, context_cache)
+        time.sleep(delay)
+        if fail:
+            raise self.error_factory()
+        self.record_usage(result.usage)
+        return result
+
+    async def generate_async(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        self._admit()
+        delay, fail, result = self._plan(prompt, context_cache)
+        await asyncio.sleep(delay)
+        if fail:
+            raise self.error_factory()
+        self.record_usage(result.usage)
+        return result
+
+    def stream(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Iterator[GenerationChunk]:
+        self._admit()
+        delay, fail, result = self._plan(prompt, context_cache)
+        chunks = self._chunks(result.text)
+        time.sleep(delay / 2)
+        if fail:
+            raise self.error_factory()
+        for text in chunks:
+            time.sleep(delay / 2 / len(chunks))
+            yield GenerationChunk(text)
+        self.record_usage(result.usage)
+        yield GenerationChunk("", result.usage, result.finish_reason)
+
+    async def stream_async(self, prompt: str,
+                           context_cache: Optional[ContextCache] = None) -> AsyncIterator[GenerationChunk]:
+        self._admit()
+        delay, fail, result = self._plan(prompt, context_cache)
+        chunks = self._chunks(result.text)
+        await asyncio.sleep(delay / 2)
+        if fail:
+            raise self.error_factory()
+        for text in chunks:
+            await asyncio.sleep(delay / 2 / len(chunks))
+            yield GenerationChunk(text)
+        self.record_usage(result.usage)
+        yield GenerationChunk("", result.usage, result.finish_reason)
+
+    def generate_candidates(self, prompt: str, count: int,
+                            context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        self._admit()
+        delay, fail, results = self._plan_candidates(prompt, min(count, self.max_candidates), context_cache)
+        time.sleep(delay)
+        if fail:
+            raise self.error_factory()
+        self.record_usage(results[0].usage)
+        return results
+
+    async def generate_candidates_async(self, prompt: str, count: int,
+                                        context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        self._admit()
+        delay, fail, results = self._plan_candidates(prompt, min(count, self.max_candidates), context_cache)
+        await asyncio.sleep(delay)
+        if fail:
+            raise self.error_factory()
+        self.record_usage(results[0].usage)
+        return results
+
+    def create_context_cache(self, prefix: str, ttl_seconds: float) -> Optional[ContextCache]:
+        tokens = estimate_tokens(prefix)
+        if not self.context_caching or tokens < self.min_context_cache_tokens:
+            return None
+        digest = hashlib.sha256(prefix.encode()).hexdigest()[:16]
+        cache = ContextCache(f"stub-cache-{digest}", prefix, tokens, time.time() + ttl_seconds)
+        with self._lock:
+            self.context_caches.append(cache)
+        return cache
+
+    def delete_context_cache(self, cache: ContextCache):
+        with self._lock:
+            if cache in self.context_caches:
+                self.context_caches.remove(cache)
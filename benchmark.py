@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the debate orchestration.
+Drives WorkingMultiAgentDebate, BulkDebateRunner and WorkingExperimentRunner
+against StubBackend (simulated latency and failures, no network or API spend)
+and saves the measurements as JSON so runs can be compared across commits.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from backends import StubBackend
+from bulk import BulkDebateRunner
+from multi_agent_debate import DebateTurnError, QualityRubric, WorkingMultiAgentDebate
+from resilience import ModelCallError
+from run_experiments import WorkingExperimentRunner
+
+SCHEMA_VERSION = 1
+TOPIC = "Should libraries invest more in digital resources or physical books?"
+
+LatencyModel = Union[float, Tuple[float, float], Callable]
+
+
+def latency_model(spec: str) -> LatencyModel:
+    """Parse a latency distribution for ``StubBackend``.
+
+    "0.2" or "fixed:0.2" is a fixed delay, "uniform:0.1,0.5" a uniform range,
+    "lognormal:0.2,0.5" a log-normal with median 0.2 s and shape 0.5 (a
+    realistic long tail) and "exp:0.2" an exponential with mean 0.2 s.
+    """
+    name, _, args = spec.partition(":")
+    if not args:
+        return float(name)
+    values = [float(value) for value in args.split(",")]
+    if name == "fixed":
+        return values[0]
+    if name == "uniform":
+        return (values[0], values[1])
+    if name == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    if name == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@dataclass
+class BenchSettings:
+    """What to simulate and how much of it to run."""
+    latency: str = "lognormal:0.05,0.5"
+    failure_rate: float = 0.0
+    seed: int = 0
+    repeats: int = 3
+    agent_count: int = 4
+    rounds: int = 3
+    concurrency: List[int] = field(default_factory=lambda: [1, 2, 4, 8, 16])
+    debates: int = 16
+    growth_rounds: int = 5
+    rubric_texts: int = 2000
+
+    def backend(self, temperature: float = 0.7, **options) -> StubBackend:
+        options.setdefault("latency", latency_model(self.latency))
+        return StubBackend(temperature=temperature, seed=self.seed, failure_rate=self.failure_rate, **options)
+
+
+@contextlib.contextmanager
+def _quiet() -> Iterator[None]:
+    """Silence the debate progress output while a benchmark runs."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _run_one(run: Callable[[], Any], tally: Dict[str, int]) -> Optional[Any]:
+    """Run one debate quietly, counting it in ``tally['ok']`` or ``tally['failed']``.
+
+    With ``--failure-rate`` some debates are expected to fail; those return None
+    instead of aborting the benchmark.
+    """
+    try:
+        with _quiet():
+            result = run()
+    except (DebateTurnError, ModelCallError):
+        tally['failed'] += 1
+        return None
+    tally['ok'] += 1
+    return result
+
+
+def _distribution(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {'mean': None, 'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(samples)
+    return {
+        'mean': statistics.mean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+def bench_latency(settings: BenchSettings) -> Dict[str, Any]:
+    """End-to-end debate latency (sync and async) and the orchestration overhead per call.
+
+    Overhead is measured with a zero-latency model, so it is the time the
+    debate system itself spends per call (prompting, retries layer, spans).
+    """
+    results = {}
+    for mode in ("sync", "async"):
+        times, calls, tally = [], 0, {'ok': 0, 'failed': 0}
+        for repeat in range(settings.repeats):
+            backend = settings.backend()
+            debate_system = WorkingMultiAgentDebate(backend=backend)
+            topic = f"{TOPIC} #{repeat}"
+            if mode == "sync":
+                run = lambda: debate_system.run_debate(topic, settings.agent_count, settings.rounds)
+            else:
+                run = lambda: asyncio.run(debate_system.run_debate_async(topic, settings.agent_count, settings.rounds))
+            started = time.perf_counter()
+            if _run_one(run, tally) is not None:
+                times.append(time.perf_counter() - started)
+            calls = backend.calls
+        results[mode] = dict(_distribution(times), calls=calls, **tally)
+
+    backend = settings.backend(latency=0.0)
+    debate_system = WorkingMultiAgentDebate(backend=backend)
+    tally = {'ok': 0, 'failed': 0}
+    started = time.perf_counter()
+    for repeat in range(settings.repeats):
+        _run_one(lambda: debate_system.run_debate(f"{TOPIC} #{repeat}", settings.agent_count, settings.rounds), tally)
+    elapsed = time.perf_counter() - started
+    results['overhead_ms_per_call'] = 1000 * elapsed / backend.calls if backend.calls else None
+    return results
+
+
+def bench_throughput(settings: BenchSettings) -> Dict[str, Any]:
+    """Debates per second against the number of debates run at once (``BulkDebateRunner``)."""
+    results = {}
+    for concurrency in settings.concurrency:
+        runner = BulkDebateRunner(backend_factory=settings.backend)
+        jobs = [(f"{TOPIC} #{i}", settings.agent_count, settings.rounds) for i in range(settings.debates)]
+
+        async def run():
+            return [outcome async for outcome in runner.run_many_async(jobs, max_concurrent_debates=concurrency)]
+
+        started = time.perf_counter()
+        with _quiet():
+            outcomes = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        latencies = [outcome.result.execution_time for outcome in outcomes if outcome.ok]
+        results[str(concurrency)] = {
+            'debates_per_sec': len(latencies) / elapsed,
+            'mean_latency': statistics.mean(latencies) if latencies else None,
+            'failed': sum(not outcome.ok for outcome in outcomes),
+        }
+    return results
+
+
+def bench_calls(settings: BenchSettings) -> Dict[str, Any]:
+    """Model calls (and attempts, counting retries) per debate across panel sizes and rounds."""
+    results = {}
+    tally = {'ok': 0, 'failed': 0}
+    for agent_count in (2, 3, 4, 8):
+        for rounds in (1, 2, 3):
+            debate_system = WorkingMultiAgentDebate(backend=settings.backend(latency=0.0))
+            result = _run_one(lambda: debate_system.run_debate(TOPIC, agent_count, rounds), tally)
+            if result is None:
+                continue
+            results[f"{agent_count}x{rounds}"] = {
+                'calls': len(result.spans),
+                'attempts': sum(1 + span.retries for span in result.spans),
+            }
+    results.update(tally)
+    return results
+
+
+def bench_prompt_growth(settings: BenchSettings) -> Dict[str, Any]:
+    """Mean prompt tokens per debater turn in each round, and the Judge's, for several prompt strategies.
+
+    ``billed`` leaves out tokens served from a provider context cache.
+    """
+    variants = {
+        'default': ({}, {}),
+        'context_budget': ({'context_budget': 600}, {}),
+        'prefix_cache': ({'prefix_cache': True}, {'context_caching': True}),
+        'ring_16': ({'topology': 'ring'}, {}),
+    }
+    results = {}
+    tally = {'ok': 0, 'failed': 0}
+    for name, (options, backend_options) in variants.items():
+        agent_count = 16 if name == 'ring_16' else settings.agent_count
+        debate_system = WorkingMultiAgentDebate(backend=settings.backend(latency=0.0, **backend_options), **options)
+        result = _run_one(lambda: debate_system.run_debate(TOPIC, agent_count, settings.growth_rounds), tally)
+        if result is None:
+            continue
+        per_round = {}
+        for span in result.spans:
+            if span.role != "Judge":
+                per_round.setdefault(span.round_num, []).append(span)
+        judge = [span for span in result.spans if span.role == "Judge"]
+        results[name] = {
+            'agent_count': agent_count,
+            'prompt_tokens_by_round': [statistics.mean(s.prompt_tokens for s in per_round[r]) for r in sorted(per_round)],
+            'billed_tokens_by_round': [statistics.mean(s.prompt_tokens - s.cached_tokens for s in per_round[r])
+                                       for r in sorted(per_round)],
+            'judge_prompt_tokens': judge[0].prompt_tokens if judge else None,
+            'total_prompt_tokens': sum(span.prompt_tokens for span in result.spans),
+            'total_billed_tokens': sum(span.prompt_tokens - span.cached_tokens for span in result.spans),
+        }
+    results.update(tally)
+    return results
+
+
+def bench_judge(settings: BenchSettings) -> Dict[str, Any]:
+    """Cost of a self-consistent Judge: one sample, five candidates in one request, five separate samples."""
+    variants = {
+        'single': (1, 8),
+        'candidates_5': (5, 8),
+        'samples_5': (5, 1),
+    }
+    results = {}
+    for name, (judge_candidates, max_candidates) in variants.items():
+        times, judge_calls, judge_tokens, agreement = [], 0, 0, []
+        tally = {'ok': 0, 'failed': 0}
+        for repeat in range(settings.repeats):
+            debate_system = WorkingMultiAgentDebate(backend=settings.backend(max_candidates=max_candidates),
+                                                    judge_candidates=judge_candidates)
+            topic = f"{TOPIC} #{repeat}"
+            started = time.perf_counter()
+            result = _run_one(lambda: asyncio.run(debate_system.run_debate_async(topic, settings.agent_count,
+                                                                                 settings.rounds)), tally)
+            if result is None:
+                continue
+            times.append(time.perf_counter() - started)
+            judge = [span for span in result.spans if span.role == "Judge"]
+            judge_calls = len(judge)
+            judge_tokens = sum(span.prompt_tokens + span.output_tokens for span in judge)
+            if result.verdict_agreement is not None:
+                agreement.append(result.verdict_agreement)
+        results[name] = dict(_distribution(times), judge_calls=judge_calls, judge_tokens=judge_tokens,
+                             agreement=statistics.mean(agreement) if agreement else None, **tally)
+    return results
+
+
+def bench_rubric(settings: BenchSettings) -> Dict[str, Any]:
+    """``QualityRubric`` scoring throughput, one text at a time and batched."""
+    # The texts are only scoring input, so they are generated without injected failures
+    backend = replace(settings, failure_rate=0.0).backend(latency=0.0, sentences=12)
+    texts = [backend.generate(f"text {i}").text for i in range(settings.rubric_texts)]
+    started = time.perf_counter()
+    for text in texts:
+        QualityRubric.assess_quality(text)
+    single = time.perf_counter() - started
+    started = time.perf_counter()
+    QualityRubric.assess_batch(texts)
+    batch = time.perf_counter() - started
+    return {'texts': len(texts), 'single_texts_per_sec': len(texts) / single, 'batch_texts_per_sec': len(texts) / batch}
+
+
+def bench_experiments(settings: BenchSettings) -> Dict[str, Any]:
+    """The full ``WorkingExperimentRunner`` grid, with and without shared sweep prefixes."""
+    results = {}
+    for name, independent in (('shared_prefixes', False), ('independent', True)):
+        backends = []
+
+        def backend_factory(temperature: float) -> StubBackend:
+            backends.append(settings.backend(temperature))
+            return backends[-1]
+
+        runner = WorkingExperimentRunner(topic=TOPIC, backend_factory=backend_factory)
+        started = time.perf_counter()
+        with _quiet():
+            runner.run_all_experiments(independent_samples=independent)
+        results[name] = {
+            'seconds': time.perf_counter() - started,
+            'debates': len(runner.results),
+            'calls': sum(backend.calls for backend in backends),
+        }
+    return results
+
+
+BENCHMARKS = {
+    'latency': bench_latency,
+    'throughput': bench_throughput,
+    'calls': bench_calls,
+    'prompt_growth': bench_prompt_growth,
+    'judge': bench_judge,
+    'rubric': bench_rubric,
+    'experiments': bench_experiments,
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(settings: Optional[BenchSettings] = None, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the selected benchmarks (all by default) and return a JSON-ready document."""
+    settings = settings or BenchSettings()
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        print(f"⏱️  {name}...")
+        started = time.perf_counter()
+        try:
+            results[name] = bench(settings)
+        except Exception as e:
+            # Keep the other benchmarks (and the results file) when one breaks
+            print(f"❌ {name} failed: {e}")
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+            continue
+        print(f"   done in {time.perf_counter() - started:.1f}s")
+    return {
+        'schema': SCHEMA_VERSION,
+        'meta': {
+            'commit': _git_commit(),
+            'created': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'settings': asdict(settings),
+        'results': results,
+    }
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _flatten(item, f"{prefix}[{index}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def _higher_is_better(metric: str) -> bool:
+    return "per_sec" in metric or metric.rsplit(".", 1)[-1] == "ok"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Metrics that got worse by more than ``threshold`` (relative) from ``baseline`` to ``current``.
+
+    Throughput metrics (``*_per_sec``) and completed debates (``ok``) should go
+    up; everything else (time, calls, tokens, failures) should not.
+    """
+    before = dict(_flatten(baseline['results']))
+    regressions = []
+    for metric, value in _flatten(current['results']):
+        if metric not in before:
+            continue
+        if before[metric] == 0:
+            # e.g. failures appearing where there were none
+            if value > 0 and not _higher_is_better(metric):
+                regressions.append({'metric': metric, 'baseline': 0.0, 'current': value, 'change': math.inf})
+            continue
+        change = (value - before[metric]) / abs(before[metric])
+        worse = -change if _higher_is_better(metric) else change
+        if worse > threshold:
+            regressions.append({'metric': metric, 'baseline': before[metric], 'current': value, 'change': change})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks from the command line; exits 1 on regressions with ``--compare``."""
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the multi-agent debate system.")
+    parser.add_argument("--out", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument("--latency", default=BenchSettings.latency,
+                        help="fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exp:MEAN (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability a simulated call fails")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and debates, for a smoke run")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    settings = BenchSettings(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    if args.quick:
+        settings = replace(settings, repeats=1, concurrency=[1, 4], debates=4, growth_rounds=3, rubric_texts=200)
+    document = run_benchmarks(settings, args.only)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"📊 Benchmark results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, document, args.threshold)
+        for row in regressions:
+            print(f"⚠️  {row['metric']}: {row['baseline']:.4g} -> {row['current']:.4g} ({row['change']:+.0%})")
+        print(f"{len(regressions)} regression(s) against {baseline['meta'].get('commit') or args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
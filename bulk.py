@@ -0,0 +1,172 @@
+"""
+Bulk debate runner.
+Runs many (topic, agent_count, rounds, temperature) jobs with bounded
+concurrency, pulling jobs lazily and yielding outcomes as debates finish.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from backends import GeminiBackend, ModelBackend
+from multi_agent_debate import DebateResult, WorkingMultiAgentDebate
+
+
+@dataclass
+class DebateJob:
+    """One debate to run."""
+    topic: str
+    agent_count: int = 4
+    rounds: int = 2
+    temperature: float = 0.7
+
+    @classmethod
+    def coerce(cls, item: Any) -> "DebateJob":
+        """Accept a DebateJob, a topic string or a (topic, agent_count, rounds, temperature) tuple."""
+        if isinstance(item, cls):
+            return item
+        if isinstance(item, str):
+            return cls(item)
+        if isinstance(item, dict):
+            return cls(**item)
+        return cls(*item)
+
+
+@dataclass
+class JobOutcome:
+    """Result of one job; ``index`` is its position in the input.
+
+    ``job`` is None when the input item could not be read as a job.
+    """
+    index: int
+    job: Optional[DebateJob]
+    result: Optional[DebateResult] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+JobSource = Union[Iterable[Any], AsyncIterable[Any]]
+
+
+class BulkDebateRunner:
+    """Runs debates for many topics on shared clients.
+
+    One ``WorkingMultiAgentDebate`` (and backend) is created per temperature and
+    reused for every job with that temperature, so clients, the rate limiter,
+    the circuit breaker and the optional cache are shared across the batch.
+    ``backend_factory(temperature)`` builds the backends (Gemini by default);
+    ``debate_options`` are passed on to ``WorkingMultiAgentDebate``.
+    """
+
+    def __init__(self, model_name: str = "gemini-2.0-flash-exp",
+                 backend_factory: Optional[Callable[[float], ModelBackend]] = None,
+                 **debate_options):
+        self.model_name = model_name
+        self.backend_factory = backend_factory or (
+            lambda temperature: GeminiBackend(model_name=model_name, temperature=temperature))
+        self.debate_options = debate_options
+        self._systems: Dict[float, WorkingMultiAgentDebate] = {}
+
+    def debate_system(self, temperature: float) -> WorkingMultiAgentDebate:
+        """Return the shared debate system for a temperature, creating it once."""
+        if temperature not in self._systems:
+            self._systems[temperature] = WorkingMultiAgentDebate(
+                backend=self.backend_factory(temperature), **self.debate_options)
+        return self._systems[temperature]
+
+    def close(self):
+        """Release provider-side resources (context caches) of every debate system."""
+        for system in self._systems.values():
+            system.close()
+
+    async def _run_job(self, index: int, item: Any, call_slots: Optional[asyncio.Semaphore],
+                       debate_timeout: Optional[float]) -> JobOutcome:
+        try:
+            job = DebateJob.coerce(item)
+        except (TypeError, ValueError) as e:
+            print(f"❌ Job {index} ({item!r:.60}) is not a valid job: {e}")
+            return JobOutcome(index, None, error=e)
+        try:
+            result = await self.debate_system(job.temperature).run_debate_async(
+                job.topic, agent_count=job.agent_count, rounds=job.rounds,
+                call_slots=call_slots, debate_timeout=debate_timeout,
+            )
+        except Exception as e:
+            print(f"❌ Job {index} ({job.topic[:60]}) failed: {e}")
+            return JobOutcome(index, job, error=e)
+        return JobOutcome(index, job, result=result)
+
+    async def run_many_async(self, jobs: JobSource, max_concurrent_debates: int = 8,
+                             max_concurrent_calls: Optional[int] = None,
+                             debate_timeout: Optional[float] = None) -> AsyncIterator[JobOutcome]:
+        """Run ``jobs`` and yield a ``JobOutcome`` for each as it finishes.
+
+        ``jobs`` may be any (async) iterable, including an unbounded stream: only
+        ``max_concurrent_debates`` jobs are taken from it at a time.
+        ``max_concurrent_calls`` additionally caps in-flight model calls across
+        the batch. A failing job is reported in its outcome and does not stop
+        the others. Closing the generator cancels the debates still running.
+        """
+        call_slots = asyncio.Semaphore(max_concurrent_calls) if max_concurrent_calls else None
+        if isinstance(jobs, AsyncIterable):
+            source = jobs.__aiter__()
+
+            async def next_job():
+                return await source.__anext__()
+        else:
+            source = iter(jobs)
+
+            async def next_job():
+                try:
+                    return next(source)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        pending = set()
+        index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < max_concurrent_debates:
+                    try:
+                        item = await next_job()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(
+                        self._run_job(index, item, call_slots, debate_timeout)))
+                    index += 1
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def run_many(self, jobs: JobSource, max_concurrent_debates: int = 8,
+                 max_concurrent_calls: Optional[int] = None,
+                 debate_timeout: Optional[float] = None) -> Iterator[JobOutcome]:
+        """Blocking version of ``run_many_async`` for code without an event loop."""
+        loop = asyncio.new_event_loop()
+        outcomes = self.run_many_async(jobs, max_concurrent_debates, max_concurrent_calls, debate_timeout)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(outcomes.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(outcomes.aclose())
+            loop.close()
+
+
+def run_many(jobs: JobSource, max_concurrent_debates: int = 8, max_concurrent_calls: Optional[int] = None,
+             **runner_options) -> Iterator[JobOutcome]:
+    """Run ``jobs`` on a fresh ``BulkDebateRunner``; see ``BulkDebateRunner.run_many``."""
+    return BulkDebateRunner(**runner_options).run_many(jobs, max_concurrent_debates, max_concurrent_calls)
@@ -0,0 +1,154 @@
+"""
+Checkpoints for in-flight debates.
+The debate state (topic, config, finished turns, current round, verdict) is
+saved after every turn so an interrupted debate can resume from the last
+finished turn instead of paying for its earlier calls again.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class DebateCheckpoint:
+    """Saved state of one debate.
+
+    ``turns`` has one slot per debater turn in speaking order (round by round);
+    a slot is None until that turn has finished. ``elapsed`` is the debate's
+    running time over all attempts so far.
+    """
+    checkpoint_id: str
+    topic: str
+    agent_count: int
+    rounds: int
+    turns: List[Optional[str]] = field(default_factory=list)
+    current_round: int = 1
+    verdict: Optional[str] = None
+    elapsed: float = 0.0
+    updated: float = field(default_factory=time.time)
+
+    @classmethod
+    def new(cls, topic: str, agent_count: int, rounds: int, turns_per_round: int,
+            checkpoint_id: Optional[str] = None) -> "DebateCheckpoint":
+        return cls(checkpoint_id or uuid.uuid4().hex, topic, agent_count, rounds,
+                   turns=[None] * (turns_per_round * rounds))
+
+    @property
+    def finished(self) -> bool:
+        return self.verdict is not None
+
+
+class CheckpointStore:
+    """Where checkpoints live. The base class keeps them in memory."""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def save(self, checkpoint: DebateCheckpoint):
+        """Store (or replace) a checkpoint."""
+        checkpoint.updated = time.time()
+        with self._lock:
+            self._checkpoints[checkpoint.checkpoint_id] = json.dumps(asdict(checkpoint))
+
+    def load(self, checkpoint_id: str) -> Optional[DebateCheckpoint]:
+        """Return the checkpoint, or None if there is none with that id."""
+        with self._lock:
+            data = self._checkpoints.get(checkpoint_id)
+        return DebateCheckpoint(**json.loads(data)) if data is not None else None
+
+    def delete(self, checkpoint_id: str):
+        """Forget a checkpoint."""
+        with self._lock:
+            self._checkpoints.pop(checkpoint_id, None)
+
+    def ids(self) -> List[str]:
+        """Ids of all stored checkpoints."""
+        with self._lock:
+            return list(self._checkpoints)
+
+
+class FileCheckpointStore(CheckpointStore):
+    """One JSON file per checkpoint in ``directory``, replaced atomically on save."""
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, checkpoint_id: str) -> str:
+        return os.path.join(self.directory, f"{checkpoint_id}.json")
+
+    def save(self, checkpoint: DebateCheckpoint):
+        checkpoint.updated = time.time()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(checkpoint.checkpoint_id))
+
+    def load(self, checkpoint_id: str) -> Optional[DebateCheckpoint]:
+        try:
+            with open(self._path(checkpoint_id), encoding="utf-8") as f:
+                return DebateCheckpoint(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, checkpoint_id: str):
+        try:
+            os.remove(self._path(checkpoint_id))
+        except FileNotFoundError:
+            pass
+
+    def ids(self) -> List[str]:
+        return [name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")]
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """Checkpoints in a SQLite ``checkpoints`` table (can share a file with other stores)."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def save(self, checkpoint: DebateCheckpoint):
+        checkpoint.updated = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (id, payload, updated) VALUES (?, ?, ?)",
+                (checkpoint.checkpoint_id, json.dumps(asdict(checkpoint)), checkpoint.updated),
+            )
+            self._conn.commit()
+
+    def load(self, checkpoint_id: str) -> Optional[DebateCheckpoint]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM checkpoints WHERE id = ?", (checkpoint_id,)).fetchone()
+        return DebateCheckpoint(**json.loads(row[0])) if row is not None else None
+
+    def delete(self, checkpoint_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE id = ?", (checkpoint_id,))
+            self._conn.commit()
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM checkpoints ORDER BY updated")]
+
+    def close(self):
+        """Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,130 @@
+"""
+Provider-side prompt prefix caching.
+Keeps one backend context cache per distinct prompt prefix (the debate's
+instructions, topic and finished rounds), so the turns of a round and the
+Judge send only their short suffix instead of re-sending the whole debate.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from backends import ContextCache, ModelBackend
+
+
+class ContextCacheManager:
+    """Creates, reuses and releases context caches for one backend.
+
+    A prefix is cached on first use and reused until ``refresh_margin``
+    seconds before it expires, when a fresh cache is made. Prefixes the
+    backend declines (caching unsupported, or shorter than the provider
+    minimum) are remembered so they are not offered again. ``created``,
+    ``reused`` and ``declined`` count lookups.
+
+    Expired entries are dropped and at most ``max_entries`` prefixes are
+    kept: the least recently used go first and their provider caches are
+    deleted, so storage is not billed until they expire. Debates bracket their
+    lookups with ``begin``/``end``, and the caches are deleted once the last
+    running debate ends.
+    """
+
+    def __init__(self, backend: ModelBackend, ttl_seconds: float = 600.0, refresh_margin: float = 30.0,
+                 max_entries: int = 256):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.created = 0
+        self.reused = 0
+        self.declined = 0
+        self._caches: "OrderedDict[str, Optional[ContextCache]]" = OrderedDict()
+        self._pending: Dict[str, "asyncio.Future"] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """A debate that may look up prefixes has started."""
+        with self._lock:
+            self._active += 1
+
+    def end(self):
+        """A debate has finished; the last one out releases the caches."""
+        with self._lock:
+            self._active -= 1
+            idle = self._active == 0
+        if idle:
+            self.close()
+
+    def _known(self, prefix: str):
+        """(True, cache or None) if the prefix has a usable answer already, else (False, None)."""
+        with self._lock:
+            if prefix not in self._caches:
+                return False, None
+            cache = self._caches[prefix]
+            if cache is None:
+                self.declined += 1
+                return True, None
+            if cache.expired(self.refresh_margin):
+                del self._caches[prefix]
+                return False, None
+            self._caches.move_to_end(prefix)
+            self.reused += 1
+            return True, cache
+
+    def _store(self, prefix: str, cache: Optional[ContextCache]) -> Optional[ContextCache]:
+        evicted = []
+        with self._lock:
+            for known in [known for known, entry in self._caches.items() if entry is not None and entry.expired()]:
+                del self._caches[known]
+            self._caches[prefix] = cache
+            self._caches.move_to_end(prefix)
+            while len(self._caches) > self.max_entries:
+                _, entry = self._caches.popitem(last=False)
+                if entry is not None:
+                    evicted.append(entry)
+            if cache is None:
+                self.declined += 1
+            else:
+                self.created += 1
+        # Deleting is a provider call, so it happens outside the lock (and only logs on failure)
+        for entry in evicted:
+            self.backend.delete_context_cache(entry)
+        return cache
+
+    def lookup(self, prefix: str) -> Optional[ContextCache]:
+        """Cache for ``prefix``, creating it if needed; None to send the prompt in full."""
+        known, cache = self._known(prefix)
+        if known:
+            return cache
+        return self._store(prefix, self.backend.create_context_cache(prefix, self.ttl_seconds))
+
+    async def lookup_async(self, prefix: str) -> Optional[ContextCache]:
+        """Async version of ``lookup``; concurrent turns wait for a single creation."""
+        known, cache = self._known(prefix)
+        if known:
+            return cache
+        pending = self._pending.get(prefix)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = self._pending[prefix] = loop.run_in_executor(
+                None, self.backend.create_context_cache, prefix, self.ttl_seconds)
+            try:
+                return self._store(prefix, await asyncio.shield(pending))
+            finally:
+                del self._pending[prefix]
+        cache = await asyncio.shield(pending)
+        with self._lock:
+            if cache is None:
+                self.declined += 1
+            else:
+                self.reused += 1
+        return cache
+
+    def close(self):
+        """Delete every live cache on the provider (they also expire on their own)."""
+        with self._lock:
+            caches = [cache for cache in self._caches.values() if cache is not None]
+            self._caches.clear()
+        for cache in caches:
+            self.backend.delete_context_cache(cache)
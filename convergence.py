@@ -0,0 +1,63 @@
+"""
+Per-round convergence check for debates.
+Compares each debater's turn with their turn in the previous round using
+bag-of-words cosine similarity, so no extra model calls are needed.
+"""
+
+import math
+from collections import Counter
+from typing import List, Optional
+
+from debate_context import content_words
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Cosine similarity (0-1) of the content-word counts of two texts."""
+    counts_a, counts_b = Counter(content_words(a)), Counter(content_words(b))
+    if not counts_a or not counts_b:
+        return 0.0
+    dot = sum(count * counts_b[word] for word, count in counts_a.items())
+    norm = math.sqrt(sum(c * c for c in counts_a.values()) * sum(c * c for c in counts_b.values()))
+    return dot / norm
+
+
+def round_similarity(previous: List[str], current: List[str]) -> float:
+    """Mean similarity of each debater's turn to their own turn one round earlier."""
+    pairs = list(zip(previous, current))
+    if not pairs:
+        return 0.0
+    return sum(text_similarity(a, b) for a, b in pairs) / len(pairs)
+
+
+class ConvergenceMonitor:
+    """Decides when a debate's positions have stopped moving.
+
+    Call ``observe`` with each finished round's turns (in speaking order). Once
+    at least ``min_rounds`` rounds have run and ``patience`` consecutive rounds
+    were at least ``threshold`` similar to the round before, the debate has
+    converged and the remaining rounds can be skipped.
+    """
+
+    def __init__(self, threshold: float = 0.85, min_rounds: int = 2, patience: int = 1):
+        self.threshold = threshold
+        self.min_rounds = min_rounds
+        self.patience = patience
+        self.similarities: List[float] = []
+        self._previous: Optional[List[str]] = None
+        self._rounds = 0
+        self._stable = 0
+
+    def observe(self, turns: List[str]) -> bool:
+        """Record one round; True if the debate has converged."""
+        self._rounds += 1
+        if self._previous is not None:
+            similarity = round_similarity(self._previous, turns)
+            self.similarities.append(similarity)
+            self._stable = self._stable + 1 if similarity >= self.threshold else 0
+        self._previous = list(turns)
+        return self._rounds >= self.min_rounds and self._stable >= self.patience
+
+    @property
+    def last_similarity(self) -> Optional[float]:
+        """Similarity of the latest round to the one before, if there was one."""
+        return self.similarities[-1] if self.similarities else None
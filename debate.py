@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the multi-agent debate system.
+
+    python debate.py run "Should cities ban cars?" --agents 4 --rounds 2
+    python debate.py sweep --results results.jsonl
+    python debate.py report results.jsonl
+    python debate.py bench --quick
+
+Everything beyond argparse is imported inside the subcommands, and the model
+SDK only when the first call is made, so ``--help`` and ``report`` start
+immediately.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+DEFAULT_TOPIC = "Should libraries invest more in digital resources or physical books?"
+
+
+def _backend_factory(args: argparse.Namespace):
+    """``backend_factory(temperature)`` for the chosen backend; None means Gemini with ``--model``."""
+    if args.stub:
+        from backends import StubBackend
+        return lambda temperature: StubBackend(temperature=temperature, latency=(0.05, 0.2))
+    from backends import load_env
+    load_env()
+    if not os.getenv("GOOGLE_API_KEY") and not os.getenv("GOOGLE_API_KEYS"):
+        sys.exit("❌ Please set your GOOGLE_API_KEY in a .env file (or use --stub)")
+    if os.getenv("GOOGLE_API_KEYS") or os.getenv("GEMINI_MODELS"):
+        from endpoint_pool import gemini_pool
+        return lambda temperature: gemini_pool(temperature=temperature)
+    return None
+
+
+def _cache(args: argparse.Namespace):
+    if not args.cache:
+        return None
+    from response_cache import ResponseCache
+    return ResponseCache(args.cache)
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """Run one debate and print its scores and verdict."""
+    from multi_agent_debate import DebateMetrics, TokenChunk, TurnStarted, WorkingMultiAgentDebate
+    from result_store import result_to_dict
+
+    backend_factory = _backend_factory(args)
+    debate_system = WorkingMultiAgentDebate(
+        model_name=args.model, temperature=args.temperature,
+        backend=backend_factory(args.temperature) if backend_factory else None,
+        cache=_cache(args), topology=args.topology, judge_candidates=args.judge_candidates,
+    )
+    print(f"📝 Topic: {args.topic}")
+    if args.stream:
+        result = None
+        for event in debate_system.stream_debate(args.topic, args.agents, args.rounds,
+                                                 debate_timeout=args.timeout):
+            if isinstance(event, TurnStarted):
+                print(f"\n🤖 {event.role} (round {event.round_num}): ", end="", flush=True)
+            elif isinstance(event, TokenChunk):
+                print(event.text, end="", flush=True)
+            elif isinstance(event, DebateMetrics):
+                result = event.result
+        print()
+    else:
+        result = debate_system.run_debate(args.topic, agent_count=args.agents, rounds=args.rounds,
+                                          debate_timeout=args.timeout)
+
+    print("\n📊 RESULTS")
+    print("=" * 40)
+    print(f"⏱️  Execution Time: {result.execution_time:.2f} seconds")
+    print(f"🎯 Quality Scores:")
+    for dimension, score in result.quality_scores.items():
+        print(f"   {dimension.capitalize()}: {score:.1f}/5.0")
+    print(f"🤝 Convergence: {'Yes' if result.convergence else 'No'}")
+    if not args.stream:
+        print(f"\n📝 Final Verdict:")
+        print("-" * 20)
+        print(result.final_verdict)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result_to_dict(result), f, indent=2)
+        print(f"💾 Result written to {args.out}")
+    return 0
+
+
+def cmd_sweep(args: argparse.Namespace) -> int:
+    """Run every configuration in EXPERIMENT_CONFIGS and write the report."""
+    from result_store import open_result_store
+    from run_experiments import WorkingExperimentRunner
+
+    store = open_result_store(args.results, args.results_format)
+    try:
+        runner = WorkingExperimentRunner(cache=_cache(args), fresh_samples=args.fresh_samples, topic=args.topic,
+                                         store=store, backend_factory=_backend_factory(args))
+        runner.run_all_experiments(max_concurrent_calls=args.max_concurrent_calls,
+                                   independent_samples=args.independent_samples)
+        runner.generate_report()
+    finally:
+        store.close()
+    return 0
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    """Write the experiment report for stored results, without running anything."""
+    from result_store import open_result_store
+    from run_experiments import WorkingExperimentRunner, report_topic
+
+    if not os.path.exists(args.results):
+        sys.exit(f"❌ No results at {args.results}")
+    store = open_result_store(args.results, args.results_format)
+    try:
+        topic = args.topic
+        if topic is None:
+            topic = report_topic(record['result'].topic for record in store) or DEFAULT_TOPIC
+        WorkingExperimentRunner(topic=topic, store=store).generate_report()
+    finally:
+        store.close()
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    """Hand the remaining arguments to ``benchmark.py``."""
+    import benchmark
+    return benchmark.main(args.bench_args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="debate", description="Multi-agent debate system.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def model_options(command: argparse.ArgumentParser):
+        command.add_argument("--stub", action="store_true", help="use the offline StubBackend instead of Gemini")
+        command.add_argument("--cache", help="response cache file (e.g. .debate_cache.sqlite)")
+
+    run = commands.add_parser("run", help="run one debate")
+    run.add_argument("topic", nargs="?", default=DEFAULT_TOPIC)
+    run.add_argument("--agents", type=int, default=2, help="agents including the Judge")
+    run.add_argument("--rounds", type=int, default=2)
+    run.add_argument("--temperature", type=float, default=0.7)
+    run.add_argument("--model", default="gemini-2.0-flash-exp")
+    run.add_argument("--topology", help="message routing for large panels (see topology.py)")
+    run.add_argument("--judge-candidates", type=int, default=1)
+    run.add_argument("--timeout", type=float, help="seconds for the whole debate")
+    run.add_argument("--stream", action="store_true", help="print turns as they are generated")
+    run.add_argument("--out", help="write the DebateResult as JSON")
+    model_options(run)
+    run.set_defaults(handler=cmd_run)
+
+    sweep = commands.add_parser("sweep", help="run the experiment grid and write the report")
+    sweep.add_argument("--topic", default=DEFAULT_TOPIC)
+    sweep.add_argument("--results", help="append results to this store (.jsonl or .sqlite)")
+    sweep.add_argument("--results-format", choices=("jsonl", "sqlite"))
+    sweep.add_argument("--max-concurrent-calls", type=int, default=4)
+    sweep.add_argument("--independent-samples", action="store_true", help="don't share common turns")
+    sweep.add_argument("--fresh-samples", action="store_true", help="bypass the response cache")
+    model_options(sweep)
+    sweep.set_defaults(handler=cmd_sweep)
+
+    report = commands.add_parser("report", help="write the experiment report for stored results")
+    report.add_argument("results", help="results store (.jsonl or .sqlite)")
+    report.add_argument("--results-format", choices=("jsonl", "sqlite"))
+    report.add_argument("--topic", help="topic for the report header (default: the stored topics)")
+    report.set_defaults(handler=cmd_report)
+
+    bench = commands.add_parser("bench", help="offline benchmarks (arguments go to benchmark.py)", add_help=False)
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER)
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    # Options after "bench" belong to benchmark.py, which parses them itself
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra + args.bench_args
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
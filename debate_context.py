@@ -0,0 +1,137 @@
+"""
+Token-budgeted debate context.
+Keeps an incremental extractive summary of finished rounds and builds each
+agent's context to a token budget, instead of cutting turns at a fixed length.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from rate_limiter import estimate_tokens
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z][a-z'-]{3,}")
+_STOPWORDS = {
+    "that", "this", "with", "from", "have", "will", "would", "could", "should", "their", "there",
+    "these", "those", "which", "while", "about", "into", "more", "most", "also", "than", "then",
+    "they", "them", "been", "being", "such", "some", "other", "only", "very", "what", "when",
+}
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, ignoring markdown bullets and empty lines."""
+    sentences = []
+    for line in text.splitlines():
+        line = line.strip().lstrip("#*->0123456789. ").strip()
+        if line:
+            sentences.extend(s.strip() for s in _SENTENCE_RE.split(line) if s.strip())
+    return sentences
+
+
+def content_words(text: str) -> List[str]:
+    """Lowercased words of four or more letters, without common function words."""
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def key_sentences(text: str, count: int) -> List[str]:
+    """Pick the ``count`` most informative sentences, kept in their original order.
+
+    Sentences are scored by how many distinct content words they contain, with a
+    bonus for the opening sentence (which usually states the position).
+    """
+    sentences = list(dict.fromkeys(split_sentences(text)))
+    if len(sentences) <= count:
+        return sentences
+    scored = []
+    for index, sentence in enumerate(sentences):
+        words = set(content_words(sentence))
+        scored.append((len(words) + (5 if index == 0 else 0), -index))
+    chosen = sorted(sorted(range(len(sentences)), key=lambda i: scored[i], reverse=True)[:count])
+    return [sentences[i] for i in chosen]
+
+
+def fit_to_budget(text: str, token_budget: int) -> str:
+    """Shorten text to roughly ``token_budget`` tokens at a sentence (or word) boundary."""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    kept, used = [], 0
+    for sentence in split_sentences(text):
+        cost = estimate_tokens(sentence)
+        if used + cost > token_budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept) + " …"
+    words = text.split()
+    out = []
+    for word in words:
+        if estimate_tokens(" ".join(out + [word])) > token_budget:
+            break
+        out.append(word)
+    return " ".join(out) + " …"
+
+
+class RollingContext:
+    """Per-debate context builder with a rolling summary of finished rounds.
+
+    Turns are recorded as they happen; ``end_round`` folds the round into the
+    summary (only that round is processed, earlier digests are reused). The
+    summary never uses more than ``summary_share`` of a budget; when it grows
+    past that, the oldest round digests are shortened to one sentence per turn
+    and finally dropped.
+    """
+
+    def __init__(self, token_budget: int = 800, judge_token_budget: int = 2000,
+                 sentences_per_turn: int = 2, summary_share: float = 0.5):
+        self.token_budget = token_budget
+        self.judge_token_budget = judge_token_budget
+        self.sentences_per_turn = sentences_per_turn
+        self.summary_share = summary_share
+        self._round_turns: List[Tuple[str, str]] = []
+        # (round number, (role, text) turns covered, digest line)
+        self._digests: List[Tuple[int, List[Tuple[str, str]], str]] = []
+
+    def add_turn(self, role: str, text: str):
+        """Record a finished turn of the current round."""
+        self._round_turns.append((role, text))
+
+    def end_round(self, round_num: int):
+        """Fold the current round into the rolling summary."""
+        if not self._round_turns:
+            return
+        parts = [f"{role}: {' '.join(key_sentences(text, self.sentences_per_turn))}"
+                 for role, text in self._round_turns]
+        self._digests.append((round_num, self._round_turns, f"Round {round_num} — " + " | ".join(parts)))
+        self._round_turns = []
+
+    def _summary(self, exclude: List[str], budget: int) -> str:
+        digests = [d for d in self._digests if not all(text in exclude for _, text in d[1])]
+        lines = [line for _, _, line in digests]
+        compressed = 0
+        while lines and estimate_tokens("\n".join(lines)) > budget:
+            if compressed < len(digests):
+                round_num, turns, _ = digests[compressed]
+                lines[compressed] = f"Round {round_num} — " + " | ".join(
+                    f"{role}: {' '.join(key_sentences(text, 1))}" for role, text in turns)
+                compressed += 1
+            else:
+                lines.pop(0)
+                digests.pop(0)
+                compressed -= 1
+        return "\n".join(lines)
+
+    def render(self, recent: Optional[List[str]], judge: bool = False) -> Optional[str]:
+        """Context for the next turn: summary of earlier rounds plus ``recent`` turns within budget."""
+        budget = self.judge_token_budget if judge else self.token_budget
+        recent = recent or []
+        summary = self._summary(recent, int(budget * self.summary_share))
+        if not summary and not recent:
+            return None
+        sections = []
+        if summary:
+            sections.append("Summary of earlier rounds:\n" + summary)
+        if recent:
+            share = max(1, (budget - estimate_tokens(summary)) // len(recent))
+            sections.append("Recent responses:\n" + "\n".join(f"- {fit_to_budget(text, share)}" for text in recent))
+        return "\n\n".join(sections)
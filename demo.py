@@ -5,6 +5,7 @@ Shows a quick example of the working system.
 """
 
 import os
+from backends import load_env
 from multi_agent_debate import WorkingMultiAgentDebate
 
 def main():
@@ -13,6 +14,7 @@ def main():
     print("=" * 40)
     
     # Check for API key
+    load_env()
     if not os.getenv("GOOGLE_API_KEY"):
         print("❌ Please set your GOOGLE_API_KEY in a .env file")
         print("Copy env_example.txt to .env and add your API key")
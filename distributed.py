@@ -0,0 +1,412 @@
+"""
+Distributed sweep execution.
+A coordinator expands a sweep (topics x experiment configurations) into jobs in
+a shared SQLite queue; any number of worker processes, on any hosts that can
+open the file, lease jobs, keep their leases alive with heartbeats while the
+debates run and write the results back. A job whose worker dies is leased
+again once its lease expires. The coordinator merges the results into the
+standard experiment report.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backends import ModelBackend, StubBackend, load_env
+from bulk import BulkDebateRunner
+from multi_agent_debate import DebateResult
+from result_store import ResultStore, open_result_store, result_from_dict, result_to_dict
+from run_experiments import EXPERIMENT_CONFIGS, WorkingExperimentRunner, report_topic
+
+
+@dataclass
+class SweepJob:
+    """One unit of work: configurations of one topic that share a temperature.
+
+    They run as one ``run_sweep_async`` so their common turns are still
+    generated once. ``configs`` are (experiment, config, agent_count, rounds).
+    """
+    job_id: int
+    sweep: str
+    topic: str
+    temperature: float
+    configs: List[Tuple[str, str, int, int]]
+    attempts: int = 0
+
+
+def expand_sweep(topics: Sequence[str], configs=EXPERIMENT_CONFIGS, repeats: int = 1) -> List[Dict[str, Any]]:
+    """Jobs for every topic x configuration (x ``repeats``), grouped by topic and temperature."""
+    jobs = []
+    for _ in range(repeats):
+        for topic in topics:
+            groups: Dict[float, list] = {}
+            for experiment, config, settings in configs:
+                groups.setdefault(settings['temperature'], []).append(
+                    (experiment, config, settings['agent_count'], settings['rounds']))
+            for temperature, group in groups.items():
+                jobs.append({'topic': topic, 'temperature': temperature, 'configs': group})
+    return jobs
+
+
+class SqliteWorkQueue:
+    """Jobs, leases and results in one SQLite file.
+
+    A job is ``queued``, ``leased`` (to a worker until ``lease_expires``),
+    ``done`` or ``failed``. Leasing takes an immediate write lock so two
+    workers never get the same job; an expired lease makes the job available
+    again, up to ``max_attempts`` leases in total. Results are written in the
+    same transaction that marks the job done, and only by the worker that
+    still holds the lease.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, timeout: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, sweep TEXT NOT NULL, topic TEXT NOT NULL, "
+            "temperature REAL NOT NULL, configs TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'queued', "
+            "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_expires REAL, error TEXT, "
+            "created REAL NOT NULL, updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (sweep, status);"
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER NOT NULL, sweep TEXT NOT NULL, "
+            "experiment TEXT NOT NULL, config TEXT NOT NULL, worker TEXT, created REAL NOT NULL, "
+            "payload TEXT NOT NULL);"
+        )
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def enqueue(self, sweep: str, jobs: Sequence[Dict[str, Any]]) -> int:
+        """Add jobs (as from ``expand_sweep``) to ``sweep``; returns how many."""
+        now = time.time()
+        rows = [(sweep, job['topic'], job['temperature'], json.dumps(job['configs']), now, now) for job in jobs]
+        self._transaction(lambda conn: conn.executemany(
+            "INSERT INTO jobs (sweep, topic, temperature, configs, created, updated) VALUES (?, ?, ?, ?, ?, ?)", rows))
+        return len(rows)
+
+    def lease(self, worker: str, lease_seconds: float, sweep: Optional[str] = None) -> Optional[SweepJob]:
+        """Take the oldest available job for ``lease_seconds``, or None if there is none right now."""
+        def take(conn):
+            now = time.time()
+            # Jobs whose last allowed lease ran out are given up on
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired', updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, self.max_attempts))
+            query = ("SELECT id, sweep, topic, temperature, configs, attempts FROM jobs "
+                     "WHERE (status = 'queued' OR (status = 'leased' AND lease_expires < ?))")
+            params: list = [now]
+            if sweep is not None:
+                query += " AND sweep = ?"
+                params.append(sweep)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            job_id, job_sweep, topic, temperature, configs, attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = ?, updated = ? "
+                "WHERE id = ?", (worker, now + lease_seconds, attempts + 1, now, job_id))
+            return SweepJob(job_id, job_sweep, topic, temperature,
+                            [tuple(config) for config in json.loads(configs)], attempts + 1)
+        return self._transaction(take)
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float) -> bool:
+        """Extend a lease; False if ``worker`` no longer holds it."""
+        now = time.time()
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (now + lease_seconds, now, job_id, worker)))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, results: Sequence[Tuple[str, str, DebateResult]]) -> bool:
+        """Store a job's (experiment, config, result) triples and mark it done; False if the lease was lost."""
+        def finish(conn):
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, error = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'", (now, job_id, worker))
+            if cursor.rowcount != 1:
+                return False
+            sweep = conn.execute("SELECT sweep FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO results (job_id, sweep, experiment, config, worker, created, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job_id, sweep, experiment, config, worker, now, json.dumps(result_to_dict(result)))
+                 for experiment, config, result in results])
+            return True
+        return self._transaction(finish)
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Release a job that raised: back to the queue, or failed after ``max_attempts`` leases."""
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "worker = NULL, lease_expires = NULL, error = ?, updated = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, error, time.time(), job_id, worker)))
+        return cursor.rowcount == 1
+
+    def counts(self, sweep: Optional[str] = None) -> Dict[str, int]:
+        """Jobs by status."""
+        counts = {status: 0 for status in ('queued', 'leased', 'done', 'failed')}
+        query = "SELECT status, COUNT(*) FROM jobs" + (" WHERE sweep = ?" if sweep else "") + " GROUP BY status"
+        with self._lock:
+            for status, count in self._conn.execute(query, (sweep,) if sweep else ()):
+                counts[status] = count
+        return counts
+
+    def failures(self, sweep: Optional[str] = None) -> List[Tuple[int, str, str]]:
+        """(job id, topic, error) of the failed jobs."""
+        query = "SELECT id, topic, error FROM jobs WHERE status = 'failed'" + (" AND sweep = ?" if sweep else "")
+        with self._lock:
+            return list(self._conn.execute(query + " ORDER BY id", (sweep,) if sweep else ()))
+
+    def results(self, sweep: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stored result records in job order, in the ``ResultStore`` record format."""
+        query = "SELECT experiment, config, created, payload FROM results"
+        query += (" WHERE sweep = ?" if sweep else "") + " ORDER BY job_id, id"
+        cursor = sqlite3.connect(self.path).execute(query, (sweep,) if sweep else ())
+        try:
+            for experiment, config, created, payload in cursor:
+                yield {'experiment': experiment, 'config': config, 'created': created,
+                       'result': result_from_dict(json.loads(payload))}
+        finally:
+            cursor.connection.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SweepWorker:
+    """Leases jobs from a ``SqliteWorkQueue`` and runs them until the queue is drained.
+
+    Debate systems come from a ``BulkDebateRunner`` (one per temperature), so
+    clients stay warm across jobs. Up to ``max_concurrent_jobs`` jobs run at
+    once; each lease is renewed every ``lease_seconds / 3`` while its debates
+    run. A worker that loses a lease (it was too slow and another worker took
+    the job over) stops that job's debates at once and discards its results.
+    """
+
+    def __init__(self, queue: SqliteWorkQueue, runner: Optional[BulkDebateRunner] = None,
+                 worker_id: Optional[str] = None, lease_seconds: float = 120.0, poll_interval: float = 2.0,
+                 max_concurrent_jobs: int = 1, max_concurrent_calls: Optional[int] = None,
+                 share_prefixes: bool = True, sweep: Optional[str] = None):
+        self.queue = queue
+        self.runner = runner or BulkDebateRunner()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_concurrent_calls = max_concurrent_calls
+        self.share_prefixes = share_prefixes
+        self.sweep = sweep
+        self.completed = 0
+        self.failed = 0
+
+    def run(self, max_jobs: Optional[int] = None):
+        """Work until no job is queued or leased (or ``max_jobs`` jobs have been taken)."""
+        asyncio.run(self.run_async(max_jobs))
+
+    async def run_async(self, max_jobs: Optional[int] = None):
+        """Async version of ``run``."""
+        call_slots = asyncio.Semaphore(self.max_concurrent_calls) if self.max_concurrent_calls else None
+        taken = [0]
+
+        async def lane():
+            while max_jobs is None or taken[0] < max_jobs:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id, self.lease_seconds, self.sweep)
+                if job is None:
+                    counts = await asyncio.to_thread(self.queue.counts, self.sweep)
+                    if not counts['queued'] and not counts['leased']:
+                        return
+                    # Others hold the remaining leases; wait in case one expires
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                taken[0] += 1
+                await self._run_job(job, call_slots)
+
+        print(f"👷 Worker {self.worker_id} started")
+        try:
+            await asyncio.gather(*(lane() for _ in range(self.max_concurrent_jobs)))
+        finally:
+            self.runner.close()
+        print(f"👷 Worker {self.worker_id} finished: {self.completed} jobs done, {self.failed} failed")
+
+    async def _heartbeat(self, job: SweepJob, sweep: "asyncio.Future[None]", lease_lost: asyncio.Event):
+        """Renew the job's lease; once it is lost, cancel the job's debates."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job.job_id, self.worker_id, self.lease_seconds):
+                print(f"⚠️ Lost the lease on job {job.job_id}; stopping it")
+                lease_lost.set()
+                sweep.cancel()
+                return
+
+    async def _sweep(self, job: SweepJob, call_slots: Optional[asyncio.Semaphore], results: List[tuple]):
+        debate_system = self.runner.debate_system(job.temperature)
+        async for position, result in debate_system.run_sweep_async(
+                job.topic, [(agent_count, rounds) for _, _, agent_count, rounds in job.configs],
+                share_prefixes=self.share_prefixes, call_slots=call_slots):
+            experiment, config, _, _ = job.configs[position]
+            results.append((experiment, config, result))
+
+    async def _run_job(self, job: SweepJob, call_slots: Optional[asyncio.Semaphore]):
+        print(f"📥 Job {job.job_id}: {job.topic[:60]} at temperature {job.temperature} "
+              f"({len(job.configs)} configurations, attempt {job.attempts})")
+        results = []
+        # The debates run as their own task so that losing the lease can cancel just them
+        sweep = asyncio.ensure_future(self._sweep(job, call_slots, results))
+        lease_lost = asyncio.Event()
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, sweep, lease_lost))
+        try:
+            await sweep
+        except asyncio.CancelledError:
+            if not lease_lost.is_set():
+                raise
+            print(f"🛑 Job {job.job_id} stopped: another worker has taken it over")
+            return
+        except Exception as e:
+            print(f"❌ Job {job.job_id} failed: {e}")
+            self.failed += 1
+            await asyncio.to_thread(self.queue.fail, job.job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            heartbeat.cancel()
+        if await asyncio.to_thread(self.queue.complete, job.job_id, self.worker_id, results):
+            self.completed += 1
+            print(f"✅ Job {job.job_id} done")
+
+
+class SweepCoordinator:
+    """Submits a sweep to the queue, follows its progress and writes the report."""
+
+    def __init__(self, queue: SqliteWorkQueue, sweep: Optional[str] = None):
+        self.queue = queue
+        self.sweep = sweep or time.strftime("sweep_%Y%m%d_%H%M%S")
+
+    def submit(self, topics: Sequence[str], configs=EXPERIMENT_CONFIGS, repeats: int = 1) -> int:
+        """Queue every topic x configuration; returns the number of jobs."""
+        count = self.queue.enqueue(self.sweep, expand_sweep(topics, configs, repeats))
+        print(f"📤 Sweep {self.sweep}: {count} jobs for {len(topics)} topics x {len(configs)} configurations")
+        return count
+
+    def wait(self, poll_interval: float = 5.0, timeout: Optional[float] = None) -> Dict[str, int]:
+        """Block until every job is done or failed (or ``timeout``); returns the final counts."""
+        start = time.time()
+        last = None
+        while True:
+            counts = self.queue.counts(self.sweep)
+            if counts != last:
+                print(f"⏳ {counts['done']} done, {counts['leased']} running, {counts['queued']} queued, "
+                      f"{counts['failed']} failed")
+                last = counts
+            if not counts['queued'] and not counts['leased']:
+                return counts
+            if timeout is not None and time.time() - start > timeout:
+                return counts
+            time.sleep(poll_interval)
+
+    def merge(self, store: Optional[ResultStore] = None) -> ResultStore:
+        """Append the sweep's results to ``store`` (in memory by default) and return it."""
+        store = store if store is not None else ResultStore()
+        for record in self.queue.results(self.sweep):
+            store.append(record['experiment'], record['config'], record['result'])
+        for job_id, topic, error in self.queue.failures(self.sweep):
+            print(f"❌ Job {job_id} ({topic[:60]}) failed: {error}")
+        return store
+
+    def report(self, topics: Sequence[str], store: Optional[ResultStore] = None) -> str:
+        """Merge the results and write the standard experiment report; returns its file name."""
+        runner = WorkingExperimentRunner(topic=report_topic(topics), store=self.merge(store))
+        return runner.generate_report()
+
+
+def _backend_factory(stub: bool) -> Optional[Callable[[float], ModelBackend]]:
+    if stub:
+        return lambda temperature: StubBackend(temperature=temperature, latency=(0.05, 0.2))
+    load_env()
+    if os.getenv("GOOGLE_API_KEYS") or os.getenv("GEMINI_MODELS"):
+        from endpoint_pool import gemini_pool
+        return lambda temperature: gemini_pool(temperature=temperature)
+    return None
+
+
+def main(argv: Optional[List[str]] = None):
+    """``coordinator`` submits a sweep, waits and writes the report; ``worker`` runs jobs."""
+    parser = argparse.ArgumentParser(description="Run an experiment sweep across worker processes.")
+    parser.add_argument("--queue", default="sweep_queue.sqlite", help="shared SQLite queue file")
+    parser.add_argument("--sweep", help="sweep id (default: a timestamp for coordinator, any for worker)")
+    parser.add_argument("--stub", action="store_true", help="use the offline StubBackend instead of Gemini")
+    commands = parser.add_subparsers(dest="command", required=True)
+    coordinator = commands.add_parser("coordinator", help="queue a sweep and merge the results")
+    coordinator.add_argument("topics", nargs="*", help="topics (or --topics-file)")
+    coordinator.add_argument("--topics-file", help="one topic per line")
+    coordinator.add_argument("--repeats", type=int, default=1)
+    coordinator.add_argument("--results", help="also append the merged results to this store (.jsonl/.sqlite)")
+    coordinator.add_argument("--no-wait", action="store_true", help="only queue the jobs")
+    coordinator.add_argument("--workers", type=int, default=0, help="also run this many local workers")
+    worker = commands.add_parser("worker", help="lease and run jobs until the queue is drained")
+    for command in (coordinator, worker):
+        command.add_argument("--lease", type=float, default=120.0, help="lease length in seconds")
+        command.add_argument("--jobs", type=int, default=1, help="jobs a worker runs at once")
+        command.add_argument("--max-concurrent-calls", type=int)
+        command.add_argument("--independent-samples", action="store_true")
+    args = parser.parse_args(argv)
+
+    queue = SqliteWorkQueue(args.queue)
+
+    def make_worker(sweep_id: Optional[str]):
+        return SweepWorker(queue, BulkDebateRunner(backend_factory=_backend_factory(args.stub)),
+                           lease_seconds=args.lease, max_concurrent_jobs=args.jobs,
+                           max_concurrent_calls=args.max_concurrent_calls,
+                           share_prefixes=not args.independent_samples, sweep=sweep_id)
+
+    if args.command == "worker":
+        make_worker(args.sweep).run()
+        return
+
+    topics = list(args.topics)
+    if args.topics_file:
+        with open(args.topics_file) as f:
+            topics.extend(line.strip() for line in f if line.strip())
+    if not topics:
+        parser.error("no topics given")
+    sweep = SweepCoordinator(queue, args.sweep)
+    sweep.submit(topics, repeats=args.repeats)
+    if args.no_wait:
+        return
+    local = [threading.Thread(target=make_worker(sweep.sweep).run) for _ in range(args.workers)]
+    for thread in local:
+        thread.start()
+    sweep.wait()
+    for thread in local:
+        thread.join()
+    store = open_result_store(args.results) if args.results else None
+    try:
+        sweep.report(topics, store)
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
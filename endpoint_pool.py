@@ -0,0 +1,359 @@
+"""
+Load balancing across several (API key, model) endpoints.
+PooledBackend puts any number of backends behind the ModelBackend interface:
+each endpoint keeps its own quota, calls go to the least-loaded endpoint,
+endpoints that answer 429 sit out a cool-down, and non-critical roles can
+fail over to fallback models.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Sequence
+
+from backends import ContextCache, GeminiBackend, GenerationChunk, GenerationResult, ModelBackend, Usage, load_env
+from rate_limiter import RateLimiter, TokenBucketRateLimiter, estimate_tokens
+from resilience import is_rate_limited
+
+ROUTINGS = ('least_loaded', 'weighted')
+
+
+class PoolExhaustedError(RuntimeError):
+    """Every endpoint the call may use is cooling down after rate-limit errors."""
+    retryable = True
+
+
+class Endpoint:
+    """One (API key, model) in a pool, with its own quota and health.
+
+    ``rate_limiter`` is the endpoint's quota (the backend's default limiter,
+    i.e. its key and model's, if not given). ``weight`` scales its share of traffic.
+    ``fallback`` endpoints only serve non-critical roles, and only while no
+    primary endpoint is available.
+    """
+
+    def __init__(self, backend: ModelBackend, weight: float = 1.0, rate_limiter: Optional[RateLimiter] = None,
+                 fallback: bool = False, name: Optional[str] = None):
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self.backend = backend
+        self.weight = weight
+        self.rate_limiter = rate_limiter or backend.default_rate_limiter()
+        self.fallback = fallback
+        self.name = name or backend.model_name
+        self.in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.cooldown_until = 0.0
+        self._strikes = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def load(self) -> float:
+        """Calls in flight or queued on the endpoint's quota, per unit of weight."""
+        queued = 0.0
+        if isinstance(self.rate_limiter, TokenBucketRateLimiter):
+            queued = max(0.0, -self.rate_limiter.requests.available)
+        return (self.in_flight + queued) / self.weight
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.name!r}, weight={self.weight}, fallback={self.fallback})"
+
+
+class PooledBackend(ModelBackend):
+    """Several endpoints behind one backend.
+
+    Each call goes to the available endpoint with the lowest
+    ``Endpoint.load`` (or, with ``routing="weighted"``, a random one in
+    proportion to its weight), waits for that endpoint's quota and is sent
+    there. An endpoint that answers with a rate-limit error sits out
+    ``cooldown`` seconds (doubling on repeated 429s, up to ``max_cooldown``)
+    and the call moves on to the next endpoint; other errors are left to the
+    caller's retries. Roles in ``critical_roles`` only ever use primary
+    endpoints (see ``for_role``); other roles fall back to the fallback
+    endpoints while every primary is cooling down. Context caches belong to
+    one key and model, so they are not used and prompts are sent in full.
+    """
+
+    def __init__(self, endpoints: Sequence[Endpoint], routing: str = "least_loaded",
+                 critical_roles: Sequence[str] = ("Judge",), cooldown: float = 10.0, max_cooldown: float = 120.0,
+                 seed: Optional[int] = None):
+        super().__init__()
+        if routing not in ROUTINGS:
+            raise ValueError(f"Unknown routing: {routing} (choose from {', '.join(ROUTINGS)})")
+        primaries = [endpoint for endpoint in endpoints if not endpoint.fallback]
+        if not primaries:
+            raise ValueError("PooledBackend needs at least one primary endpoint")
+        self.endpoints = list(endpoints)
+        self.routing = routing
+        self.critical_roles = set(critical_roles)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.model_name = "+".join(dict.fromkeys(endpoint.backend.model_name for endpoint in primaries))
+        self.temperature = primaries[0].backend.temperature
+        self.max_output_tokens = max(endpoint.backend.max_output_tokens for endpoint in self.endpoints)
+        self.max_candidates = min(endpoint.backend.max_candidates for endpoint in self.endpoints)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._routes = {allow: _PoolRoute(self, allow) for allow in (False, True)}
+
+    def generation_config(self) -> dict:
+        return {'endpoints': [dict(endpoint.backend.generation_config(), model=endpoint.backend.model_name)
+                              for endpoint in self.endpoints]}
+
+    def for_role(self, role: str) -> ModelBackend:
+        return self._routes[role not in self.critical_roles]
+
+    def endpoint_summary(self) -> List[dict]:
+        """Per-endpoint calls, 429s, current load and remaining cool-down."""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'name': endpoint.name,
+                'fallback': endpoint.fallback,
+                'calls': endpoint.calls,
+                'rate_limited': endpoint.rate_limited,
+                'in_flight': endpoint.in_flight,
+                'cooldown': max(0.0, endpoint.cooldown_until - now),
+            } for endpoint in self.endpoints]
+
+    def _choose(self, allow_fallback: bool, tried: List[Endpoint]) -> Endpoint:
+        """Pick and claim the endpoint for the next attempt of a call."""
+        now = time.monotonic()
+        with self._lock:
+            for fallback in ((False, True) if allow_fallback else (False,)):
+                candidates = [endpoint for endpoint in self.endpoints if endpoint.fallback == fallback
+                              and endpoint not in tried and endpoint.available(now)]
+                if candidates:
+                    break
+            else:
+                raise PoolExhaustedError(f"all endpoints of {self.model_name} are rate limited")
+            if self.routing == "weighted":
+                endpoint = self._rng.choices(candidates, weights=[c.weight for c in candidates])[0]
+            else:
+                # Ties (e.g. calls made one at a time) go to the endpoint with the fewest calls per weight
+                endpoint = min(candidates, key=lambda c: (c.load(), c.calls / c.weight))
+            endpoint.in_flight += 1
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, error: Optional[BaseException] = None):
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is None:
+                endpoint.calls += 1
+                endpoint._strikes = 0
+            elif is_rate_limited(error):
+                endpoint.rate_limited += 1
+                endpoint._strikes += 1
+                pause = min(self.max_cooldown, self.cooldown * 2 ** (endpoint._strikes - 1))
+                endpoint.cooldown_until = time.monotonic() + pause
+        if error is not None and is_rate_limited(error):
+            print(f"🚦 {endpoint.name} rate limited, cooling down ({error})")
+
+    def _settle(self, endpoint: Endpoint, estimated: int, usage: Optional[Usage]):
+        usage = usage or Usage()
+        endpoint.rate_limiter.settle(estimated, usage.total_tokens)
+        self.record_usage(usage)
+
+    @staticmethod
+    def _first_usage(result: Any) -> Usage:
+        return result[0].usage if isinstance(result, list) else result.usage
+
+    def _call(self, allow_fallback: bool, estimated: int, send: Callable[[ModelBackend], Any]) -> Any:
+        tried = []
+        while True:
+            endpoint = self._choose(allow_fallback, tried)
+            error = None
+            try:
+                endpoint.rate_limiter.acquire(estimated)
+                result = send(endpoint.backend)
+            except Exception as e:
+                error = e
+                if not is_rate_limited(e):
+                    raise
+                # Rejected before any tokens were used: give the reservation back
+                endpoint.rate_limiter.settle(estimated, 0)
+                tried.append(endpoint)
+                continue
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Also on cancellation, which frees the endpoint without counting a call
+                self._release(endpoint, error)
+            self._settle(endpoint, estimated, self._first_usage(result))
+            return result
+
+    async def _call_async(self, allow_fallback: bool, estimated: int, send: Callable[[ModelBackend], Any]) -> Any:
+        tried = []
+        while True:
+            endpoint = self._choose(allow_fallback, tried)
+            error = None
+            try:
+                await endpoint.rate_limiter.acquire_async(estimated)
+                result = await send(endpoint.backend)
+            except Exception as e:
+                error = e
+                if not is_rate_limited(e):
+                    raise
+                # Rejected before any tokens were used: give the reservation back
+                endpoint.rate_limiter.settle(estimated, 0)
+                tried.append(endpoint)
+                continue
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Also on cancellation, which frees the endpoint without counting a call
+                self._release(endpoint, error)
+            self._settle(endpoint, estimated, self._first_usage(result))
+            return result
+
+    def _stream(self, allow_fallback: bool, prompt: str,
+                open_stream: Callable[[ModelBackend], Iterator[GenerationChunk]]) -> Iterator[GenerationChunk]:
+        """Stream from one endpoint; a 429 before the first chunk moves the call to another."""
+        estimated = estimate_tokens(prompt) + self.max_output_tokens
+        tried = []
+        while True:
+            endpoint = self._choose(allow_fallback, tried)
+            usage, started = None, False
+            try:
+                endpoint.rate_limiter.acquire(estimated)
+                for chunk in open_stream(endpoint.backend):
+                    started = True
+                    usage = chunk.usage or usage
+                    yield chunk
+            except Exception as e:
+                self._release(endpoint, e)
+                if started or not is_rate_limited(e):
+                    raise
+                endpoint.rate_limiter.settle(estimated, 0)
+                tried.append(endpoint)
+                continue
+            except BaseException as e:
+                self._release(endpoint, e)
+                raise
+            self._release(endpoint)
+            self._settle(endpoint, estimated, usage)
+            return
+
+    async def _stream_async(self, allow_fallback: bool, prompt: str,
+                            open_stream: Callable[[ModelBackend], AsyncIterator[GenerationChunk]]
+                            ) -> AsyncIterator[GenerationChunk]:
+        """Async version of ``_stream``."""
+        estimated = estimate_tokens(prompt) + self.max_output_tokens
+        tried = []
+        while True:
+            endpoint = self._choose(allow_fallback, tried)
+            usage, started = None, False
+            try:
+                await endpoint.rate_limiter.acquire_async(estimated)
+                async for chunk in open_stream(endpoint.backend):
+                    started = True
+                    usage = chunk.usage or usage
+                    yield chunk
+            except Exception as e:
+                self._release(endpoint, e)
+                if started or not is_rate_limited(e):
+                    raise
+                endpoint.rate_limiter.settle(estimated, 0)
+                tried.append(endpoint)
+                continue
+            except BaseException as e:
+                self._release(endpoint, e)
+                raise
+            self._release(endpoint)
+            self._settle(endpoint, estimated, usage)
+            return
+
+    # Called directly, the pool treats the caller as a critical role (primaries only)
+
+    def generate(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        return self._routes[False].generate(prompt)
+
+    async def generate_async(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        return await self._routes[False].generate_async(prompt)
+
+    def stream(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Iterator[GenerationChunk]:
+        return self._routes[False].stream(prompt)
+
+    def stream_async(self, prompt: str,
+                     context_cache: Optional[ContextCache] = None) -> AsyncIterator[GenerationChunk]:
+        return self._routes[False].stream_async(prompt)
+
+    def generate_candidates(self, prompt: str, count: int,
+                            context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        return self._routes[False].generate_candidates(prompt, count)
+
+    async def generate_candidates_async(self, prompt: str, count: int,
+                                        context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        return await self._routes[False].generate_candidates_async(prompt, count)
+
+
+class _PoolRoute(ModelBackend):
+    """The pool as seen by one kind of role: with or without fallback endpoints."""
+
+    def __init__(self, pool: PooledBackend, allow_fallback: bool):
+        super().__init__()
+        self.pool = pool
+        self.allow_fallback = allow_fallback
+        self.model_name = pool.model_name
+        self.temperature = pool.temperature
+        self.max_output_tokens = pool.max_output_tokens
+        self.max_candidates = pool.max_candidates
+
+    def _estimate(self, prompt: str, count: int = 1) -> int:
+        return estimate_tokens(prompt) + count * self.pool.max_output_tokens
+
+    def generate(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        return self.pool._call(self.allow_fallback, self._estimate(prompt),
+                               lambda backend: backend.generate(prompt))
+
+    async def generate_async(self, prompt: str, context_cache: Optional[ContextCache] = None) -> GenerationResult:
+        return await self.pool._call_async(self.allow_fallback, self._estimate(prompt),
+                                           lambda backend: backend.generate_async(prompt))
+
+    def stream(self, prompt: str, context_cache: Optional[ContextCache] = None) -> Iterator[GenerationChunk]:
+        return self.pool._stream(self.allow_fallback, prompt, lambda backend: backend.stream(prompt))
+
+    def stream_async(self, prompt: str,
+                     context_cache: Optional[ContextCache] = None) -> AsyncIterator[GenerationChunk]:
+        return self.pool._stream_async(self.allow_fallback, prompt, lambda backend: backend.stream_async(prompt))
+
+    def generate_candidates(self, prompt: str, count: int,
+                            context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        return self.pool._call(self.allow_fallback, self._estimate(prompt, count),
+                               lambda backend: backend.generate_candidates(prompt, count))
+
+    async def generate_candidates_async(self, prompt: str, count: int,
+                                        context_cache: Optional[ContextCache] = None) -> List[GenerationResult]:
+        return await self.pool._call_async(self.allow_fallback, self._estimate(prompt, count),
+                                           lambda backend: backend.generate_candidates_async(prompt, count))
+
+
+def _env_list(name: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+def gemini_pool(api_keys: Optional[List[str]] = None, models: Optional[List[str]] = None,
+                fallback_models: Optional[List[str]] = None, temperature: float = 0.7,
+                **options) -> PooledBackend:
+    """A pool with one Gemini endpoint per (key, model).
+
+    Defaults come from the environment: ``GOOGLE_API_KEYS`` (comma-separated,
+    else ``GOOGLE_API_KEY``), ``GEMINI_MODELS`` (else gemini-2.0-flash-exp)
+    and ``GEMINI_FALLBACK_MODELS`` (none). ``options`` go to ``PooledBackend``.
+    """
+    load_env()
+    api_keys = api_keys or _env_list("GOOGLE_API_KEYS") or [os.getenv("GOOGLE_API_KEY")]
+    models = models or _env_list("GEMINI_MODELS") or ["gemini-2.0-flash-exp"]
+    fallback_models = fallback_models if fallback_models is not None else _env_list("GEMINI_FALLBACK_MODELS")
+    endpoints = []
+    for fallback, names in ((False, models), (True, fallback_models)):
+        for key_index, api_key in enumerate(api_keys):
+            for model_name in names:
+                backend = GeminiBackend(model_name=model_name, temperature=temperature, api_key=api_key)
+                endpoints.append(Endpoint(backend, fallback=fallback, name=f"{model_name}#key{key_index + 1}"))
+    return PooledBackend(endpoints, **options)
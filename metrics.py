@@ -0,0 +1,171 @@
+"""
+Per-call instrumentation for debates.
+Every model call is recorded as a CallSpan; finished debates carry their spans
+and can be exported as JSON lines or in the Prometheus text format.
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, IO, Iterable, Optional
+
+from backends import Usage
+
+
+@dataclass
+class CallSpan:
+    """Timing and usage of one model call (all durations in seconds).
+
+    ``queue_wait`` is time spent waiting for the rate limiter or a call slot,
+    ``ttft`` the time until the first text arrived (the whole response for
+    non-streaming calls) and ``latency`` the total including queueing and
+    retries. Token counts come from the response usage metadata and are 0 for
+    cache hits, since nothing was sent to the model; ``cached_tokens`` is the
+    part of the prompt served from a provider context cache.
+    """
+    role: str = ""
+    round_num: int = 0
+    started: float = field(default_factory=time.time)
+    queue_wait: float = 0.0
+    ttft: Optional[float] = None
+    latency: Optional[float] = None
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    hedges: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+
+    def __post_init__(self):
+        self._clock = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._clock
+
+    def timed_wait(self, wait: Callable[[], Any]) -> Callable[[], Any]:
+        """Wrap a blocking wait (e.g. a rate limiter acquire) so its time counts as queueing."""
+        def timed():
+            started = time.perf_counter()
+            try:
+                return wait()
+            finally:
+                self.queue_wait += time.perf_counter() - started
+        return timed
+
+    def timed_wait_async(self, wait: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """Async version of ``timed_wait``."""
+        async def timed():
+            started = time.perf_counter()
+            try:
+                return await wait()
+            finally:
+                self.queue_wait += time.perf_counter() - started
+        return timed
+
+    def first_token(self):
+        """Mark the arrival of the first text (only the first call counts)."""
+        if self.ttft is None:
+            self.ttft = self.elapsed()
+
+    def finish(self, usage: Optional[Usage] = None, cached: bool = False, error: Optional[BaseException] = None):
+        """Close the span with the call's usage, or the error that ended it."""
+        self.latency = self.elapsed()
+        if self.ttft is None and error is None:
+            self.ttft = self.latency
+        self.cached = cached
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_tokens or 0
+            self.output_tokens = usage.output_tokens or 0
+            self.cached_tokens = usage.cached_tokens or 0
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+def span_summary(spans: Iterable[CallSpan]) -> Dict[str, Dict[str, float]]:
+    """Per-role totals: calls, latency, queue wait, time to first token, tokens, retries and errors.
+
+    ``prefix_hits`` counts calls that reused a context-cached prompt prefix.
+    """
+    summary: Dict[str, Dict[str, float]] = {}
+    for span in spans:
+        role = summary.setdefault(span.role, {
+            'calls': 0, 'latency': 0.0, 'queue_wait': 0.0, 'prompt_tokens': 0,
+            'output_tokens': 0, 'retries': 0, 'errors': 0, 'cached': 0, 'ttft': 0.0, 'ttft_calls': 0,
+            'cached_tokens': 0, 'prefix_hits': 0,
+        })
+        role['calls'] += 1
+        role['latency'] += span.latency or 0.0
+        role['queue_wait'] += span.queue_wait
+        role['prompt_tokens'] += span.prompt_tokens
+        role['output_tokens'] += span.output_tokens
+        role['retries'] += span.retries
+        role['errors'] += span.error is not None
+        role['cached'] += span.cached
+        role['cached_tokens'] += span.cached_tokens
+        role['prefix_hits'] += span.cached_tokens > 0
+        if span.ttft is not None:
+            role['ttft'] += span.ttft
+            role['ttft_calls'] += 1
+    return summary
+
+
+def span_records(results: Iterable[Any]) -> Iterable[Dict[str, Any]]:
+    """Flatten debate results into one dict per span, tagged with the debate's topic and index."""
+    for index, result in enumerate(results):
+        for span in result.spans:
+            yield {'debate': index, 'topic': result.topic, **asdict(span)}
+
+
+def export_jsonl(results: Iterable[Any], fp: IO[str]) -> int:
+    """Write every span of ``results`` to ``fp`` as JSON lines. Returns the number written."""
+    written = 0
+    for record in span_records(results):
+        fp.write(json.dumps(record) + "\n")
+        written += 1
+    return written
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def export_prometheus(results: Iterable[Any], prefix: str = "debate") -> str:
+    """Render the spans of ``results`` in the Prometheus text exposition format, by role."""
+    sums = span_summary(span for result in results for span in result.spans)
+
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{prefix}_{name}{suffix}{_labels(**labels)} {value:g}")
+
+    roles = sorted(sums)
+    metric("calls_total", "counter", "Model calls made by debates.",
+           [("", {'role': r}, sums[r]['calls']) for r in roles])
+    metric("cache_hits_total", "counter", "Calls answered from the response cache.",
+           [("", {'role': r}, sums[r]['cached']) for r in roles])
+    metric("prefix_cache_hits_total", "counter", "Calls that reused a context-cached prompt prefix.",
+           [("", {'role': r}, sums[r]['prefix_hits']) for r in roles])
+    metric("call_errors_total", "counter", "Calls that failed after retries.",
+           [("", {'role': r}, sums[r]['errors']) for r in roles])
+    metric("call_retries_total", "counter", "Retried call attempts.",
+           [("", {'role': r}, sums[r]['retries']) for r in roles])
+    for name, key, count_key, help_text in (
+        ("call_latency_seconds", 'latency', 'calls', "Total call latency including queueing and retries."),
+        ("call_queue_wait_seconds", 'queue_wait', 'calls', "Time spent waiting for the rate limiter or a call slot."),
+        ("call_ttft_seconds", 'ttft', 'ttft_calls', "Time to first token."),
+    ):
+        samples = []
+        for r in roles:
+            samples.append(("_sum", {'role': r}, sums[r][key]))
+            samples.append(("_count", {'role': r}, sums[r][count_key]))
+        metric(name, "summary", help_text, samples)
+    metric("tokens_total", "counter", "Tokens reported by the model (cached is the context-cached part of prompt).",
+           [("", {'role': r, 'kind': kind}, sums[r][f'{kind}_tokens'])
+            for r in roles for kind in ('prompt', 'output', 'cached')])
+    return "\n".join(lines) + "\n"
@@ -5,13 +5,26 @@ Uses gemini-2.0-flash-exp which actually works without safety filtering issues.
 
 import os
 import time
-from typing import Dict, List, Any
-from dataclasses import dataclass
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-# Load environment variables
-load_dotenv()
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Tuple, Union
+from dataclasses import dataclass, field, replace
+import numpy as np
+from backends import ContextCache, GeminiBackend, GenerationChunk, GenerationResult, ModelBackend, Usage, load_env
+from rate_limiter import RateLimiter, estimate_tokens
+from response_cache import ResponseCache, cache_key
+from resilience import Deadline, ResilientCaller, breaker_for
+from debate_context import RollingContext
+from convergence import ConvergenceMonitor
+from metrics import CallSpan
+from checkpoint import CheckpointStore, DebateCheckpoint
+from context_cache import ContextCacheManager
+from topology import DEBATER_ROLES, Topology, agent_pool, base_role, get_topology
+from turn_scheduler import TurnNode, plan_turns, run_turn_graph
+from sweep import SweepPlan
+from verdicts import AGGREGATIONS, VerdictChoice, choose_verdict, mentions_consensus
 
 @dataclass
 class DebateResult:
@@ -24,82 +37,510 @@ class DebateResult:
     convergence: bool
     execution_time: float
     excerpts: List[str]
+    # Last debate round actually run (< rounds when it stopped early on convergence)
+    stopped_at_round: Optional[int] = None
+    # Similarity of each round to the one before it, when convergence was tracked
+    round_similarities: List[float] = field(default_factory=list)
+    # One span per model call, in the order the calls were made
+    spans: List[CallSpan] = field(default_factory=list)
+    # Judge candidates the verdict was chosen from and their mean pairwise similarity (judge_candidates > 1)
+    verdict_candidates: List[str] = field(default_factory=list)
+    verdict_agreement: Optional[float] = None
+
+@dataclass
+class DebateEvent:
+    """Base class for events yielded by ``stream_debate``."""
+
+@dataclass
+class TurnStarted(DebateEvent):
+    """An agent has started its turn."""
+    role: str
+    round_num: int
+
+@dataclass
+class TokenChunk(DebateEvent):
+    """A piece of text from the turn in progress."""
+    role: str
+    round_num: int
+    text: str
+
+@dataclass
+class TurnFinished(DebateEvent):
+    """An agent's turn is complete."""
+    role: str
+    round_num: int
+    text: str
+    elapsed: float
+
+@dataclass
+class DebateConverged(DebateEvent):
+    """Positions stopped changing; the remaining rounds are skipped."""
+    round_num: int
+    similarity: float
+
+@dataclass
+class VerdictReady(DebateEvent):
+    """The Judge's verdict with its scores."""
+    text: str
+    quality_scores: Dict[str, float]
+    convergence: bool
+
+@dataclass
+class DebateMetrics(DebateEvent):
+    """Final event: the complete result and the backend's usage totals."""
+    result: DebateResult
+    usage: Dict[str, int]
+
+class DebateTurnError(RuntimeError):
+    """A turn failed after retries; the debate stops rather than passing an error on as an argument."""
+    
+    def __init__(self, role: str, round_num: int, cause: Exception):
+        super().__init__(f"{role} turn in round {round_num} failed: {cause}")
+        self.role = role
+        self.round_num = round_num
+        self.cause = cause
 
 class QualityRubric:
-    """Quality assessment rubric for debate outcomes."""
+    """Quality assessment rubric for debate outcomes.
+    
+    The indicator table is built once; each text is lowercased once, checked
+    against every phrase with C-level substring search, and its words are only
+    counted up to the point where the clarity score saturates.
+    """
+    
+    DIMENSIONS = ('evidence', 'feasibility', 'risks', 'clarity')
+    INDICATORS = {
+        # Evidence scoring (look for citations, data, examples)
+        'evidence': ('study', 'research', 'data', 'statistics', 'example', 'according to', 'shows'),
+        # Feasibility scoring (look for practical considerations)
+        'feasibility': ('practical', 'implement', 'feasible', 'realistic', 'achievable', 'cost', 'time'),
+        # Risk assessment (look for risk awareness)
+        'risks': ('risk', 'concern', 'challenge', 'limitation', 'potential problem', 'drawback'),
+        # Clarity scoring (look for structure and clarity indicators)
+        'clarity': ('first', 'second', 'third', 'however', 'therefore', 'in conclusion', 'clearly'),
+    }
+    _TABLE = tuple(map(INDICATORS.get, DIMENSIONS))
+    # From this many words on, clarity is 5.0 whatever else matches
+    _WORD_CAP = 250
+    
+    @staticmethod
+    def _counts(content: str) -> Tuple[List[int], int]:
+        """Indicator counts per dimension and the (capped) word count of one text."""
+        contains = content.lower().__contains__
+        counts = [sum(map(contains, phrases)) for phrases in QualityRubric._TABLE]
+        words = min(len(content.split(None, QualityRubric._WORD_CAP)), QualityRubric._WORD_CAP)
+        return counts, words
     
     @staticmethod
     def assess_quality(content: str) -> Dict[str, float]:
         """Assess content quality on 0-5 scale across multiple dimensions."""
-        scores = {
-            'evidence': 0.0,
-            'feasibility': 0.0,
-            'risks': 0.0,
-            'clarity': 0.0
+        (evidence_count, feasibility_count, risk_count, clarity_count), words = QualityRubric._counts(content)
+        return {
+            'evidence': min(5.0, evidence_count * 0.5),
+            'feasibility': min(5.0, feasibility_count * 0.5),
+            'risks': min(5.0, risk_count * 0.5),
+            'clarity': min(5.0, clarity_count * 0.3 + words / 50)
         }
+    
+    @staticmethod
+    def assess_batch(texts: Iterable[str]) -> "np.ndarray":
+        """Score many texts at once.
         
-        # Simple heuristic-based scoring
-        content_lower = content.lower()
+        Returns a float array of shape (len(texts), 4) with columns in
+        ``QualityRubric.DIMENSIONS`` order and the same values ``assess_quality``
+        gives for each text.
+        """
+        rows = [QualityRubric._counts(text) for text in texts]
+        counts = np.array([row[0] for row in rows], dtype=np.int64).reshape(len(rows), len(QualityRubric.DIMENSIONS))
+        words = np.array([row[1] for row in rows], dtype=np.int64)
+        scores = np.minimum(5.0, counts * 0.5)
+        scores[:, 3] = np.minimum(5.0, counts[:, 3] * 0.3 + words / 50)
+        return scores
+
+@dataclass
+class _ModelCall:
+    """One model call being made: what the sync and async call paths share."""
+    span: CallSpan
+    estimated: int
+    backend: ModelBackend
+    key: Optional[str] = None
+    cached: Optional[GenerationResult] = None
+
+class _StreamCollector:
+    """Accumulates a streamed response for its span, the rate limiter settlement and the response cache."""
+    
+    def __init__(self, span: CallSpan):
+        self.span = span
+        self.parts: List[str] = []
+        self.usage = Usage()
+        self.finish_reason = None
+    
+    def add(self, chunk: GenerationChunk):
+        if chunk.text:
+            self.span.first_token()
+        self.parts.append(chunk.text)
+        self.usage = chunk.usage or self.usage
+        if chunk.finish_reason is not None:
+            self.finish_reason = chunk.finish_reason
+    
+    def result(self) -> GenerationResult:
+        return GenerationResult("".join(self.parts), self.usage, self.finish_reason)
+
+class WorkingMultiAgentDebate:
+    """Working multi-agent debate system (gemini-2.0-flash-exp by default)."""
+    
+    def __init__(self, model_name: str = "gemini-2.0-flash-exp", temperature: float = 0.7,
+                 rate_limiter: Optional[RateLimiter] = None, backend: Optional[ModelBackend] = None,
+                 cache: Optional[ResponseCache] = None, cache_bypass: bool = False,
+                 resilience: Optional[ResilientCaller] = None,
+                 context_budget: Optional[int] = None, judge_context_budget: int = 2000,
+                 convergence_threshold: Optional[float] = None, min_rounds: int = 2,
+                 checkpoint_store: Optional[CheckpointStore] = None,
+                 topology: Optional[Union[str, Topology]] = None,
+                 prefix_cache: bool = False, prefix_cache_ttl: float = 600.0,
+                 judge_candidates: int = 1, judge_aggregation: str = "majority"):
+        """Initialize the debate system.
         
-        # Evidence scoring (look for citations, data, examples)
-        evidence_indicators = ['study', 'research', 'data', 'statistics', 'example', 'according to', 'shows']
-        evidence_count = sum(1 for indicator in evidence_indicators if indicator in content_lower)
-        scores['evidence'] = min(5.0, evidence_count * 0.5)
+        ``backend`` defaults to Gemini with ``model_name`` and ``temperature``; pass a
+        ``StubBackend`` to run offline. ``rate_limiter`` defaults to the backend's
+        shared limiter (for Gemini, the process-wide limiter of GOOGLE_API_KEY).
+        With a ``cache``, identical (model, generation config, prompt) requests are
+        answered locally; ``cache_bypass`` always asks the model for a fresh sample
+        and only refreshes the cache. ``resilience`` controls retries, timeouts,
+        hedging and the circuit breaker (shared per backend by default).
+        With ``context_budget`` (tokens), agents get a rolling summary of earlier
+        rounds plus recent turns fitted to that budget instead of 200-character
+        fragments; the Judge's context is bounded by ``judge_context_budget``.
+        With ``convergence_threshold`` (0-1), a debate goes straight to the Judge
+        once a round (from ``min_rounds`` on) is at least that similar to the
+        previous one. With a ``checkpoint_store``, ``run_debate`` and
+        ``run_debate_async`` save the debate after every turn so it can be
+        continued with ``resume_debate``.
+        A ``topology`` ("ring", "star", "random:3", "groups:4" or a ``Topology``)
+        shows each debater only its neighbours' turns of the previous round
+        instead of the last few turns of everyone, for large panels.
+        With ``prefix_cache``, prompts are split into a prefix shared by a whole
+        round (instructions, topic and the finished rounds in full) and a short
+        per-turn suffix; the prefix is stored in a provider context cache for
+        ``prefix_cache_ttl`` seconds when the backend supports it.
+        With ``judge_candidates`` > 1 the Judge gives that many candidate
+        verdicts, in one request if the backend can return several candidates
+        and as concurrent samples otherwise. They are scored together and
+        reduced to one verdict by ``judge_aggregation`` ("majority": the
+        candidate the others agree with most, "best": the highest rubric
+        score; see ``verdicts.choose_verdict``), and convergence is the
+        candidates' majority view.
+        """
+        if judge_aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown judge_aggregation: {judge_aggregation} (choose from {', '.join(AGGREGATIONS)})")
+        if judge_candidates < 1:
+            raise ValueError(f"judge_candidates must be at least 1, got {judge_candidates}")
+        self.backend = backend or GeminiBackend(model_name=model_name, temperature=temperature)
+        self.model_name = self.backend.model_name
+        self.temperature = self.backend.temperature
+        self.rate_limiter = rate_limiter or self.backend.default_rate_limiter()
+        self.cache = cache
+        self.cache_bypass = cache_bypass
+        self.resilience = resilience or ResilientCaller(breaker=breaker_for(self.backend))
+        self.context_budget = context_budget
+        self.judge_context_budget = judge_context_budget
+        self.convergence_threshold = convergence_threshold
+        self.min_rounds = min_rounds
+        self.checkpoint_store = checkpoint_store
+        self.topology = get_topology(topology)
+        self.prefix_cache = prefix_cache
+        self.context_caches = ContextCacheManager(self.backend, prefix_cache_ttl) if prefix_cache else None
+        self.judge_candidates = judge_candidates
+        self.judge_aggregation = judge_aggregation
         
-        # Feasibility scoring (look for practical considerations)
-        feasibility_indicators = ['practical', 'implement', 'feasible', 'realistic', 'achievable', 'cost', 'time']
-        feasibility_count = sum(1 for indicator in feasibility_indicators if indicator in content_lower)
-        scores['feasibility'] = min(5.0, feasibility_count * 0.5)
+    def _cache_lookup(self, prompt: str):
+        """Return (cache key, cached result) for a prompt; both None without a cache."""
+        if self.cache is None:
+            return None, None
+        key = cache_key(self.model_name, self.backend.generation_config(), prompt)
+        if self.cache_bypass:
+            return key, None
+        return key, self.cache.get(key)
+    
+    def _context_cache(self, prefix: Optional[str]) -> Optional[ContextCache]:
+        """Provider cache for a prompt prefix, if prefix caching is on and the backend supports it."""
+        if prefix is None or self.context_caches is None:
+            return None
+        return self.context_caches.lookup(prefix)
+    
+    async def _context_cache_async(self, prefix: Optional[str]) -> Optional[ContextCache]:
+        if prefix is None or self.context_caches is None:
+            return None
+        return await self.context_caches.lookup_async(prefix)
+    
+    @contextmanager
+    def _debate_scope(self):
+        """Marks a running debate, so context caches are released when the last one ends."""
+        if self.context_caches is None:
+            yield
+            return
+        self.context_caches.begin()
+        try:
+            yield
+        finally:
+            self.context_caches.end()
+    
+    def close(self):
+        """Release provider-side context caches and idle call threads now; the system stays usable."""
+        if self.context_caches is not None:
+            self.context_caches.close()
+        self.resilience.close()
+    
+    @staticmethod
+    def _report_retry(attempt: int, error: Exception, delay: float):
+        print(f"⏳ Retrying in {delay:.1f}s (attempt {attempt + 1}) after: {error}")
+    
+    def _span_hooks(self, span: CallSpan) -> dict:
+        """``on_retry``/``on_hedge`` callbacks that also count into ``span``."""
+        def on_retry(attempt: int, error: Exception, delay: float):
+            span.retries += 1
+            self._report_retry(attempt, error, delay)
         
-        # Risk assessment (look for risk awareness)
-        risk_indicators = ['risk', 'concern', 'challenge', 'limitation', 'potential problem', 'drawback']
-        risk_count = sum(1 for indicator in risk_indicators if indicator in content_lower)
-        scores['risks'] = min(5.0, risk_count * 0.5)
+        def on_hedge():
+            span.hedges += 1
         
-        # Clarity scoring (look for structure and clarity indicators)
-        clarity_indicators = ['first', 'second', 'third', 'however', 'therefore', 'in conclusion', 'clearly']
-        clarity_count = sum(1 for indicator in clarity_indicators if indicator in content_lower)
-        scores['clarity'] = min(5.0, clarity_count * 0.3 + len(content.split()) / 50)
+        return {'on_retry': on_retry, 'on_hedge': on_hedge}
+    
+    def _backend_call(self, method: Callable, prompt: str, prefix: Optional[str],
+                      context_cache: Optional[ContextCache]) -> Callable:
+        """Call ``method`` with the suffix through the context cache, or with the whole prompt.
         
-        return scores
-
-class WorkingMultiAgentDebate:
-    """Working multi-agent debate system using gemini-2.0-flash-exp."""
-    
-    def __init__(self, model_name: str = "gemini-2.0-flash-exp", temperature: float = 0.7):
-        """Initialize the debate system."""
-        # Configure the API
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
-        # Initialize the model with minimal safety restrictions
-        self.model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=1000,
-            ),
-            safety_settings=[
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
-            ]
-        )
-        self.model_name = model_name
-        self.temperature = temperature
+        Callers pass the method of ``backend.for_role(span.role)``, so a pooled
+        backend can route each role's calls (see ``endpoint_pool``).
+        """
+        if context_cache is not None:
+            return lambda: method(prompt, context_cache=context_cache)
+        return lambda: method((prefix or "") + prompt)
+    
+    def _plan_call(self, prompt: str, span: Optional[CallSpan], prefix: Optional[str], count: int = 1,
+                   use_cache: bool = True) -> _ModelCall:
+        """Set up one model call: its span, response cache entry, token estimate and routed backend."""
+        span = span or CallSpan()
+        full_prompt = (prefix or "") + prompt
+        key, cached = self._cache_lookup(full_prompt) if use_cache else (None, None)
+        if cached is not None:
+            span.finish(cached=True)
+        estimated = estimate_tokens(full_prompt) + count * self.backend.max_output_tokens
+        return _ModelCall(span, estimated, self.backend.for_role(span.role), key, cached)
+    
+    def _attempt_hooks(self, call: _ModelCall, is_async: bool = False, stream: bool = False) -> dict:
+        """``before_attempt`` (the rate limiter wait) and the span callbacks for ``ResilientCaller``."""
+        if is_async:
+            before_attempt = call.span.timed_wait_async(lambda: self.rate_limiter.acquire_async(call.estimated))
+        else:
+            before_attempt = call.span.timed_wait(lambda: self.rate_limiter.acquire(call.estimated))
+        hooks = self._span_hooks(call.span)
+        if stream:
+            del hooks['on_hedge']  # streams are never hedged
+        return dict(hooks, before_attempt=before_attempt)
+    
+    def _finish_call(self, call: _ModelCall, usage: Usage, result: Optional[GenerationResult] = None):
+        """Close the call's span, settle its rate limiter reservation and cache ``result`` if it has text."""
+        call.span.finish(usage)
+        self.rate_limiter.settle(call.estimated, usage.total_tokens)
+        if call.key is not None and result is not None and result.text:
+            self.cache.put(call.key, result)
+    
+    @staticmethod
+    def _slotted(send: Callable[[], Awaitable[Any]], call_slots: Optional[asyncio.Semaphore],
+                 span: CallSpan) -> Callable[[], Awaitable[Any]]:
+        """``send`` holding one of ``call_slots`` (time spent waiting for it counts as queue wait)."""
+        if call_slots is None:
+            return send
         
-    def get_agent_prompt(self, role: str, topic: str, round_num: int, previous_responses: List[str] = None) -> str:
-        """Generate prompts for different agent roles."""
+        async def slotted():
+            await span.timed_wait_async(call_slots.acquire)()
+            try:
+                return await send()
+            finally:
+                call_slots.release()
+        return slotted
+    
+    @staticmethod
+    def _slotted_stream(open_stream: Callable[[], AsyncIterator[GenerationChunk]],
+                        call_slots: Optional[asyncio.Semaphore],
+                        span: CallSpan) -> Callable[[], AsyncIterator[GenerationChunk]]:
+        """``open_stream`` holding one of ``call_slots`` until the stream ends."""
+        if call_slots is None:
+            return open_stream
         
-        if role == "Researcher":
-            return f"""You are a researcher analyzing this topic: {topic}
+        async def slotted():
+            await span.timed_wait_async(call_slots.acquire)()
+            try:
+                async for chunk in open_stream():
+                    yield chunk
+            finally:
+                call_slots.release()
+        return slotted
+    
+    def _call(self, call: _ModelCall, send: Callable[[], Any], deadline: Optional[Deadline]) -> Any:
+        try:
+            return self.resilience.call(send, deadline, **self._attempt_hooks(call))
+        except Exception as e:
+            call.span.finish(error=e)
+            raise
+    
+    async def _call_async(self, call: _ModelCall, send: Callable[[], Awaitable[Any]],
+                          call_slots: Optional[asyncio.Semaphore], deadline: Optional[Deadline]) -> Any:
+        try:
+            return await self.resilience.call_async(self._slotted(send, call_slots, call.span), deadline,
+                                                    **self._attempt_hooks(call, is_async=True))
+        except Exception as e:
+            call.span.finish(error=e)
+            raise
+    
+    def _generate(self, prompt: str, deadline: Optional[Deadline] = None,
+                  span: Optional[CallSpan] = None, prefix: Optional[str] = None,
+                  fresh: bool = False) -> GenerationResult:
+        """Send one prompt through the rate limiter and the resilient call layer.
+        
+        ``span`` (if given) receives the call's timings, usage and retry count.
+        With a ``prefix`` the prompt sent is prefix + prompt, and the prefix
+        goes through a provider context cache when prefix caching is on.
+        A ``fresh`` call skips the response cache entirely (for extra samples).
+        """
+        call = self._plan_call(prompt, span, prefix, use_cache=not fresh)
+        if call.cached is not None:
+            return call.cached
+        context_cache = self._context_cache(prefix)
+        result = self._call(call, self._backend_call(call.backend.generate, prompt, prefix, context_cache), deadline)
+        self._finish_call(call, result.usage, result)
+        return result
+    
+    async def _generate_async(self, prompt: str, call_slots: Optional[asyncio.Semaphore] = None,
+                              deadline: Optional[Deadline] = None,
+                              span: Optional[CallSpan] = None, prefix: Optional[str] = None,
+                              fresh: bool = False) -> GenerationResult:
+        """Async version of ``_generate``; ``call_slots`` bounds in-flight calls."""
+        call = self._plan_call(prompt, span, prefix, use_cache=not fresh)
+        if call.cached is not None:
+            return call.cached
+        context_cache = await self._context_cache_async(prefix)
+        result = await self._call_async(
+            call, self._backend_call(call.backend.generate_async, prompt, prefix, context_cache), call_slots, deadline)
+        self._finish_call(call, result.usage, result)
+        return result
+    
+    def _generate_candidates(self, prompt: str, count: int, deadline: Optional[Deadline] = None,
+                             span: Optional[CallSpan] = None, prefix: Optional[str] = None) -> List[GenerationResult]:
+        """``count`` candidates from one request, like ``_generate`` but never from the response cache."""
+        call = self._plan_call(prompt, span, prefix, count, use_cache=False)
+        context_cache = self._context_cache(prefix)
+        method = partial(call.backend.generate_candidates, count=count)
+        results = self._call(call, self._backend_call(method, prompt, prefix, context_cache), deadline)
+        self._finish_call(call, results[0].usage)
+        return results
+    
+    async def _generate_candidates_async(self, prompt: str, count: int,
+                                         call_slots: Optional[asyncio.Semaphore] = None,
+                                         deadline: Optional[Deadline] = None, span: Optional[CallSpan] = None,
+                                         prefix: Optional[str] = None) -> List[GenerationResult]:
+        """Async version of ``_generate_candidates``."""
+        call = self._plan_call(prompt, span, prefix, count, use_cache=False)
+        context_cache = await self._context_cache_async(prefix)
+        method = partial(call.backend.generate_candidates_async, count=count)
+        results = await self._call_async(call, self._backend_call(method, prompt, prefix, context_cache),
+                                         call_slots, deadline)
+        self._finish_call(call, results[0].usage)
+        return results
+    
+    def _stream(self, prompt: str, deadline: Optional[Deadline] = None,
+                span: Optional[CallSpan] = None, prefix: Optional[str] = None) -> Iterator[GenerationChunk]:
+        """Streaming version of ``_generate``; a cache hit arrives as one chunk."""
+        call = self._plan_call(prompt, span, prefix)
+        if call.cached is not None:
+            yield GenerationChunk(call.cached.text, call.cached.usage, call.cached.finish_reason)
+            return
+        context_cache = self._context_cache(prefix)
+        collected = _StreamCollector(call.span)
+        try:
+            for chunk in self.resilience.stream(
+                self._backend_call(call.backend.stream, prompt, prefix, context_cache), deadline,
+                **self._attempt_hooks(call, stream=True),
+            ):
+                collected.add(chunk)
+                yield chunk
+        except BaseException as e:
+            call.span.finish(collected.usage, error=e)
+            raise
+        self._finish_call(call, collected.usage, collected.result())
+    
+    async def _stream_async(self, prompt: str, deadline: Optional[Deadline] = None,
+                            span: Optional[CallSpan] = None, prefix: Optional[str] = None,
+                            call_slots: Optional[asyncio.Semaphore] = None) -> AsyncIterator[GenerationChunk]:
+        """Async version of ``_stream``; each attempt holds one of ``call_slots`` while it streams."""
+        call = self._plan_call(prompt, span, prefix)
+        if call.cached is not None:
+            yield GenerationChunk(call.cached.text, call.cached.usage, call.cached.finish_reason)
+            return
+        context_cache = await self._context_cache_async(prefix)
+        open_stream = self._backend_call(call.backend.stream_async, prompt, prefix, context_cache)
+        collected = _StreamCollector(call.span)
+        try:
+            async for chunk in self.resilience.stream_async(
+                self._slotted_stream(open_stream, call_slots, call.span), deadline,
+                **self._attempt_hooks(call, is_async=True, stream=True),
+            ):
+                collected.add(chunk)
+                yield chunk
+        except BaseException as e:
+            call.span.finish(collected.usage, error=e)
+            raise
+        self._finish_call(call, collected.usage, collected.result())
+        
+    def get_agent_prompt(self, role: str, topic: str, round_num: int, previous_responses: List[str] = None,
+                         context: Optional[str] = None) -> str:
+        """Generate prompts for different agent roles.
+        
+        ``context`` (built by a ``RollingContext``) replaces the list of
+        truncated previous responses. Numbered seats of large panels
+        ("Critic 2") get their role's prompt plus a line naming the seat.
+        """
+        if context is not None:
+            history_heading = "Debate so far:"
+            history = judge_history = context
+        else:
+            history_heading = "Previous responses:" if previous_responses else ""
+            history = chr(10).join([f"- {resp[:200]}..." for resp in previous_responses]) if previous_responses else ""
+            judge_history = chr(10).join([f"- {resp[:300]}..." for resp in previous_responses]) if previous_responses else ""
+        seat = f"{chr(10)}Seat: {role}" if base_role(role) != role else ""
+        role = base_role(role)
+        
+        instructions = self.role_instructions(role, round_num)
+        
+        if role in DEBATER_ROLES:
+            return f"""You are a {role.lower()} analyzing this topic: {topic}
 
-Round: {round_num}
+Round: {round_num}{seat}
 
-{"Previous responses:" if previous_responses else ""}
-{chr(10).join([f"- {resp[:200]}..." for resp in previous_responses]) if previous_responses else ""}
+{history_heading}
+{history}
 
-As a researcher, provide your analysis:
+{instructions}"""
+
+        elif role == "Judge":
+            return f"""You are a judge evaluating this topic: {topic}
+
+Final Round
+
+All previous responses:
+{judge_history}
+
+{instructions}"""
+
+        else:
+            return f"Please provide your analysis on: {topic}"
+    
+    @staticmethod
+    def role_instructions(role: str, round_num: int) -> str:
+        """The task given to a role in a round (the closing part of its prompt)."""
+        if role == "Researcher":
+            return """As a researcher, provide your analysis:
 1. Your position on this topic
 2. Supporting evidence or examples
 3. Consider potential counterarguments
@@ -107,14 +548,7 @@ As a researcher, provide your analysis:
 Write 2-3 paragraphs."""
 
         elif role == "Critic":
-            return f"""You are a critic analyzing this topic: {topic}
-
-Round: {round_num}
-
-{"Previous responses:" if previous_responses else ""}
-{chr(10).join([f"- {resp[:200]}..." for resp in previous_responses]) if previous_responses else ""}
-
-As a critic, {"analyze the previous responses and:" if round_num > 1 else "provide your analysis:"}
+            return f"""As a critic, {"analyze the previous responses and:" if round_num > 1 else "provide your analysis:"}
 1. {"Identify any issues or gaps" if round_num > 1 else "Your position"}
 2. {"Suggest improvements" if round_num > 1 else "Supporting points"}
 3. {"Highlight important considerations" if round_num > 1 else "Important considerations"}
@@ -122,14 +556,7 @@ As a critic, {"analyze the previous responses and:" if round_num > 1 else "provi
 Write 2-3 paragraphs."""
 
         elif role == "Synthesizer":
-            return f"""You are a synthesizer analyzing this topic: {topic}
-
-Round: {round_num}
-
-{"Previous responses:" if previous_responses else ""}
-{chr(10).join([f"- {resp[:200]}..." for resp in previous_responses]) if previous_responses else ""}
-
-As a synthesizer, {"review all responses and:" if round_num > 1 else "provide your analysis:"}
+            return f"""As a synthesizer, {"review all responses and:" if round_num > 1 else "provide your analysis:"}
 1. {"Find common themes" if round_num > 1 else "Your position"}
 2. {"Propose balanced solutions" if round_num > 1 else "Supporting points"}
 3. {"Highlight key benefits" if round_num > 1 else "Key benefits"}
@@ -137,14 +564,7 @@ As a synthesizer, {"review all responses and:" if round_num > 1 else "provide yo
 Write 2-3 paragraphs."""
 
         elif role == "Judge":
-            return f"""You are a judge evaluating this topic: {topic}
-
-Final Round
-
-All previous responses:
-{chr(10).join([f"- {resp[:300]}..." for resp in previous_responses]) if previous_responses else ""}
-
-As a judge, evaluate all responses and provide your final assessment:
+            return """As a judge, evaluate all responses and provide your final assessment:
 1. Summarize the main points
 2. Evaluate the reasoning
 3. Provide your conclusion
@@ -152,92 +572,753 @@ As a judge, evaluate all responses and provide your final assessment:
 
 Write 3-4 paragraphs."""
 
-        else:
-            return f"Please provide your analysis on: {topic}"
+        return ""
 
-    def run_debate(self, topic: str, agent_count: int = 4, rounds: int = 2) -> DebateResult:
-        """Run a complete debate and return results."""
-        start_time = time.time()
+    def run_debate(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                   debate_timeout: Optional[float] = None,
+                   checkpoint_id: Optional[str] = None) -> DebateResult:
+        """Run a complete debate and return results.
+        
+        Raises ``DebateTurnError`` if a turn still fails after retries or the
+        ``debate_timeout`` (seconds for the whole debate) runs out. With a
+        checkpoint store, the debate is saved under ``checkpoint_id`` (a new id
+        if None); if that checkpoint already exists, finished turns are reused.
+        """
+        with self._debate_scope():
+            return self._run_debate(topic, agent_count, rounds, debate_timeout, checkpoint_id)
+    
+    def _run_debate(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                    debate_timeout: Optional[float] = None,
+                    checkpoint_id: Optional[str] = None) -> DebateResult:
+        checkpoint = self._open_checkpoint(checkpoint_id, topic, agent_count, rounds)
+        start_time = time.time() - (checkpoint.elapsed if checkpoint is not None else 0.0)
+        deadline = Deadline(debate_timeout)
         
         # Define agent roles
-        roles = ["Researcher", "Critic", "Synthesizer", "Judge"][:agent_count]
-        if agent_count < 4:
-            roles = roles + ["Judge"]  # Always include judge
+        roles = self._debate_roles(agent_count)
+        turns = plan_turns(roles[:-1], rounds, topology=self.topology)
             
         all_responses = []
+        context = self._new_context()
+        monitor = self._new_monitor()
+        rounds_run = 0
+        spans = []
         
         # Run debate rounds
-        for round_num in range(rounds + 1):  # +1 for final judge round
+        for round_num in range(rounds):
+            print(f"\n🔄 Round {round_num + 1}")
+            print("-" * 40)
             
-            if round_num <= rounds - 1:  # Regular debate rounds
-                print(f"\n🔄 Round {round_num + 1}")
-                print("-" * 40)
-                
-                round_responses = []
-                for i, role in enumerate(roles[:-1]):  # Exclude judge from regular rounds
+            round_responses = []
+            for i, role in enumerate(roles[:-1]):  # Exclude judge from regular rounds
+                turn = round_num * (len(roles) - 1) + i
+                response_text = self._restored_turn(checkpoint, turn)
+                if response_text is None:
                     print(f"🤖 {role} is thinking...")
                     
-                    # Get previous responses for context
-                    previous_responses = all_responses[-len(roles)+1:] if len(all_responses) > len(roles)-1 else None
-                    
-                    # Generate prompt
-                    prompt = self.get_agent_prompt(role, topic, round_num + 1, previous_responses)
+                    # Generate prompt from the responses this turn sees
+                    prefix, prompt = self._turn_prompt(turns[turn], topic, all_responses, roles[:-1], context)
                     
                     # Get response
                     try:
-                        response = self.model.generate_content(prompt)
-                        if response.candidates and len(response.candidates) > 0:
-                            candidate = response.candidates[0]
-                            if candidate.content and candidate.content.parts:
-                                response_text = candidate.content.parts[0].text
-                            else:
-                                response_text = f"No content generated (finish_reason: {candidate.finish_reason})"
-                        else:
-                            response_text = "No response candidates generated"
+                        response = self._generate(prompt, deadline, self._span(spans, role, round_num + 1), prefix)
                     except Exception as e:
                         print(f"❌ Error generating response for {role}: {e}")
-                        response_text = f"Error: {str(e)}"
-                    
-                    print(f"📝 {role}: {response_text[:150]}...")
-                    round_responses.append(response_text)
-                    all_responses.append(response_text)
-                    
-                    # Small delay to avoid rate limiting
-                    time.sleep(1)
+                        raise DebateTurnError(role, round_num + 1, e) from e
+                    response_text = self._response_text(response)
+                    self._save_turn(checkpoint, turn, round_num + 1, response_text, start_time)
+                
+                print(f"📝 {role}: {response_text[:150]}...")
+                round_responses.append(response_text)
+                all_responses.append(response_text)
             
-            else:  # Final judge round
-                print(f"\n⚖️  Final Verdict")
+            self._end_round(context, round_num + 1, roles[:-1], all_responses)
+            rounds_run = round_num + 1
+            if self._converged(monitor, round_num + 1, rounds, round_responses):
+                break
+        
+        # Final judge round
+        print(f"\n⚖️  Final Verdict")
+        print("-" * 40)
+        
+        print("🤖 Judge is evaluating...")
+        
+        # Judge evaluates all previous responses
+        final_verdict_text = checkpoint.verdict if checkpoint is not None else None
+        verdict = None
+        if final_verdict_text is None:
+            judge_prefix, judge_prompt = self._judge_prompt(topic, rounds_run, all_responses, roles, context)
+            verdict = self._verdict(judge_prompt, rounds_run, deadline, spans, judge_prefix)
+            final_verdict_text = verdict.text
+            self._save_verdict(checkpoint, final_verdict_text, start_time)
+        
+        print(f"📝 Judge: {final_verdict_text[:150]}...")
+        all_responses.append(final_verdict_text)
+        
+        execution_time = time.time() - start_time
+        
+        return self._build_result(topic, agent_count, rounds, final_verdict_text, execution_time,
+                                  rounds_run, monitor, spans, verdict)
+    
+    def resume_debate(self, checkpoint_id: str, debate_timeout: Optional[float] = None) -> DebateResult:
+        """Continue a checkpointed debate from its last finished turn.
+        
+        A debate that already has its verdict is returned without model calls.
+        """
+        checkpoint = self._load_checkpoint(checkpoint_id)
+        return self.run_debate(checkpoint.topic, checkpoint.agent_count, checkpoint.rounds,
+                               debate_timeout, checkpoint_id=checkpoint_id)
+    
+    async def resume_debate_async(self, checkpoint_id: str, call_slots: Optional[asyncio.Semaphore] = None,
+                                  debate_timeout: Optional[float] = None) -> DebateResult:
+        """Async version of ``resume_debate``."""
+        checkpoint = self._load_checkpoint(checkpoint_id)
+        return await self.run_debate_async(checkpoint.topic, checkpoint.agent_count, checkpoint.rounds,
+                                           call_slots=call_slots, debate_timeout=debate_timeout,
+                                           checkpoint_id=checkpoint_id)
+    
+    async def run_debate_async(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                               parallel_rounds: bool = False,
+                               call_slots: Optional[asyncio.Semaphore] = None,
+                               debate_timeout: Optional[float] = None,
+                               checkpoint_id: Optional[str] = None) -> DebateResult:
+        """Run a complete debate on the event loop and return results.
+        
+        Turns are scheduled as a DAG (see ``turn_scheduler``): each turn starts
+        as soon as the turns it quotes have finished, so with the default
+        protocol the whole first round and the next round's opening turn run
+        at once, while the transcript stays identical to ``run_debate``. With
+        ``parallel_rounds=True`` every agent in a round sees the complete
+        previous round instead, so whole rounds run at once. A rolling context,
+        convergence check or prefix cache makes each round wait for the previous one.
+        ``call_slots`` caps in-flight model calls, e.g. across several debates.
+        Convergence stops the debate early and ``checkpoint_id`` saves or
+        resumes it, exactly as in ``run_debate``.
+        A failed turn cancels the rest of the debate and raises ``DebateTurnError``.
+        """
+        with self._debate_scope():
+            return await self._run_debate_async(topic, agent_count, rounds, parallel_rounds, call_slots,
+                                                debate_timeout, checkpoint_id)
+    
+    async def _run_debate_async(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                                parallel_rounds: bool = False,
+                                call_slots: Optional[asyncio.Semaphore] = None,
+                                debate_timeout: Optional[float] = None,
+                                checkpoint_id: Optional[str] = None) -> DebateResult:
+        checkpoint = self._open_checkpoint(checkpoint_id, topic, agent_count, rounds)
+        start_time = time.time() - (checkpoint.elapsed if checkpoint is not None else 0.0)
+        deadline = Deadline(debate_timeout)
+        
+        roles = self._debate_roles(agent_count)
+        debaters = roles[:-1]
+        context = self._new_context()
+        monitor = self._new_monitor()
+        spans = []
+        started_rounds = set()
+        turns = plan_turns(debaters, rounds, parallel_rounds,
+                           round_barrier=context is not None or monitor is not None or self.prefix_cache,
+                           topology=self.topology)
+        
+        async def take_turn(node: TurnNode, texts: List[Optional[str]]) -> str:
+            """One debater turn, taken from the checkpoint if it already finished."""
+            if node.round_num not in started_rounds:
+                started_rounds.add(node.round_num)
+                print(f"\n🔄 Round {node.round_num}")
                 print("-" * 40)
-                
-                print("🤖 Judge is evaluating...")
-                
-                # Judge evaluates all previous responses
-                judge_prompt = self.get_agent_prompt("Judge", topic, round_num + 1, all_responses)
-                try:
-                    final_verdict = self.model.generate_content(judge_prompt)
-                    if final_verdict.candidates and len(final_verdict.candidates) > 0:
-                        candidate = final_verdict.candidates[0]
-                        if candidate.content and candidate.content.parts:
-                            final_verdict_text = candidate.content.parts[0].text
-                        else:
-                            final_verdict_text = f"No verdict generated (finish_reason: {candidate.finish_reason})"
-                    else:
-                        final_verdict_text = "No verdict candidates generated"
-                except Exception as e:
-                    print(f"❌ Error generating verdict: {e}")
-                    final_verdict_text = f"Error: {str(e)}"
-                
-                print(f"📝 Judge: {final_verdict_text[:150]}...")
-                all_responses.append(final_verdict_text)
+            restored = self._restored_turn(checkpoint, node.index)
+            if restored is not None:
+                return restored
+            prefix, prompt = self._turn_prompt(node, topic, texts, debaters, context)
+            text = await self._agent_turn_async(node.role, node.round_num, prompt, call_slots, deadline,
+                                                self._span(spans, node.role, node.round_num), prefix)
+            self._save_turn(checkpoint, node.index, node.round_num, text, start_time)
+            return text
+        
+        def finish_round(round_num: int, round_responses: List[str]) -> bool:
+            self._end_round(context, round_num, debaters, round_responses)
+            return self._converged(monitor, round_num, rounds, round_responses)
+        
+        all_responses = await run_turn_graph(turns, take_turn, finish_round)
+        rounds_run = len(all_responses) // len(debaters) if debaters else 0
+        
+        print(f"\n⚖️  Final Verdict")
+        print("-" * 40)
+        print("🤖 Judge is evaluating...")
+        
+        final_verdict_text = checkpoint.verdict if checkpoint is not None else None
+        verdict = None
+        if final_verdict_text is None:
+            judge_prefix, judge_prompt = self._judge_prompt(topic, rounds_run, all_responses, roles, context)
+            verdict = await self._verdict_async(judge_prompt, rounds_run, call_slots, deadline, spans, judge_prefix)
+            final_verdict_text = verdict.text
+            self._save_verdict(checkpoint, final_verdict_text, start_time)
+        print(f"📝 Judge: {final_verdict_text[:150]}...")
         
         execution_time = time.time() - start_time
         
+        return self._build_result(topic, agent_count, rounds, final_verdict_text, execution_time,
+                                  rounds_run, monitor, spans, verdict)
+    
+    async def run_sweep_async(self, topic: str, configs: List[Tuple[int, int]], share_prefixes: bool = True,
+                              call_slots: Optional[asyncio.Semaphore] = None,
+                              debate_timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, DebateResult]]:
+        """Run several (agent_count, rounds) debates on one topic, sharing common prefixes.
+        
+        Turns that are identical across configurations (see ``sweep.SweepPlan``),
+        e.g. round 1 of a 1-round and a 3-round debate, are generated once and
+        reused, so each configuration gets the transcript ``run_debate_async``
+        would give it. ``share_prefixes=False`` samples every configuration
+        independently. Yields ``(position in configs, result)`` as debates
+        finish; a shared call's span is charged to the first configuration and
+        appears as a cache hit in the others. A failed turn cancels the sweep
+        and raises ``DebateTurnError``.
+        """
+        with self._debate_scope():
+            outcomes = self._run_sweep_async(topic, configs, share_prefixes, call_slots, debate_timeout)
+            try:
+                async for outcome in outcomes:
+                    yield outcome
+            finally:
+                await outcomes.aclose()
+    
+    async def _run_sweep_async(self, topic: str, configs: List[Tuple[int, int]], share_prefixes: bool = True,
+                               call_slots: Optional[asyncio.Semaphore] = None,
+                               debate_timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, DebateResult]]:
+        start_time = time.time()
+        deadline = Deadline(debate_timeout)
+        roles_by_config = [self._debate_roles(agent_count) for agent_count, _ in configs]
+        plan = SweepPlan([(roles[:-1], rounds) for roles, (_, rounds) in zip(roles_by_config, configs)],
+                         share_prefixes=share_prefixes,
+                         round_barrier=(self.context_budget is not None or self.convergence_threshold is not None
+                                        or self.prefix_cache),
+                         context=self.context_budget is not None or self.prefix_cache, topology=self.topology)
+        print(f"🌳 Sweep of {len(configs)} debates: {plan.summary()}")
+        turn_tasks = {}
+        turn_spans: Dict[int, CallSpan] = {}
+        verdicts: Dict[Tuple[Optional[str], str], Tuple["asyncio.Future", List[CallSpan]]] = {}
+        
+        def turn_task(node_id: int) -> "asyncio.Future":
+            if node_id not in turn_tasks:
+                turn_tasks[node_id] = asyncio.ensure_future(run_node(node_id))
+            return turn_tasks[node_id]
+        
+        async def run_node(node_id: int) -> str:
+            node = plan.nodes[node_id]
+            turn = node.turn
+            debaters = roles_by_config[node.owner][:-1]
+            texts = dict(zip(turn.inputs, await asyncio.gather(*(turn_task(i) for i in node.inputs))))
+            # The rolling summary covers earlier rounds, which are all inputs when it is on
+            context = self._new_context()
+            for round_num in range(1, turn.round_num if context is not None else 1):
+                self._end_round(context, round_num, debaters,
+                                [texts[i] for i in range((round_num - 1) * len(debaters), round_num * len(debaters))])
+            prefix, prompt = self._turn_prompt(turn, topic, [texts.get(i) for i in range(turn.index)], debaters, context)
+            span = turn_spans[node_id] = CallSpan(turn.role, turn.round_num)
+            return await self._agent_turn_async(turn.role, turn.round_num, prompt, call_slots, deadline, span, prefix)
+        
+        async def run_config(position: int) -> Tuple[int, DebateResult]:
+            agent_count, rounds = configs[position]
+            roles = roles_by_config[position]
+            debaters = roles[:-1]
+            path = plan.paths[position]
+            context = self._new_context()
+            monitor = self._new_monitor()
+            if monitor is None:
+                for node_id in path:
+                    turn_task(node_id)
+            all_responses, rounds_run = [], 0
+            for round_num in range(1, rounds + 1):
+                round_nodes = path[(round_num - 1) * len(debaters):round_num * len(debaters)]
+                round_responses = list(await asyncio.gather(*(turn_task(i) for i in round_nodes)))
+                all_responses.extend(round_responses)
+                self._end_round(context, round_num, debaters, all_responses)
+                rounds_run = round_num
+                if self._converged(monitor, round_num, rounds, round_responses):
+                    break
+            spans = [turn_spans[i] if plan.nodes[i].owner == position
+                     else replace(turn_spans[i], cached=True, prompt_tokens=0, output_tokens=0, cached_tokens=0)
+                     for i in path[:rounds_run * len(debaters)]]
+            # Configurations that end on the same transcript share the verdict too
+            judge_key = self._judge_prompt(topic, rounds_run, all_responses, roles, context)
+            shared = verdicts.get(judge_key) if share_prefixes else None
+            if shared is None:
+                judge_prefix, judge_prompt = judge_key
+                judge_spans = []
+                verdicts[judge_key] = shared = (asyncio.ensure_future(
+                    self._verdict_async(judge_prompt, rounds_run, call_slots, deadline, judge_spans, judge_prefix)),
+                    judge_spans)
+                verdict = await shared[0]
+                spans.extend(judge_spans)
+            else:
+                verdict = await shared[0]
+                spans.extend(replace(span, cached=True, prompt_tokens=0, output_tokens=0, cached_tokens=0)
+                             for span in shared[1])
+            print(f"📝 Judge ({agent_count} agents, {rounds} rounds): {verdict.text[:150]}...")
+            return position, self._build_result(topic, agent_count, rounds, verdict.text,
+                                                time.time() - start_time, rounds_run, monitor, spans, verdict)
+        
+        debates = [asyncio.ensure_future(run_config(position)) for position in range(len(configs))]
+        try:
+            for next_done in asyncio.as_completed(debates):
+                yield await next_done
+        finally:
+            tasks = debates + list(turn_tasks.values()) + [task for task, _ in verdicts.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def stream_debate(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                      debate_timeout: Optional[float] = None) -> Iterator[DebateEvent]:
+        """Run a debate and yield events as they happen.
+        
+        Follows the same protocol as ``run_debate`` but streams each turn from the
+        model, yielding ``TurnStarted``, ``TokenChunk`` and ``TurnFinished`` for
+        every turn (plus ``DebateConverged`` if it stops early), then
+        ``VerdictReady`` and ``DebateMetrics``. With ``judge_candidates`` > 1 the
+        chosen verdict arrives as a single chunk. Closing the
+        generator cancels the debate after the current chunk; a failed turn
+        raises ``DebateTurnError``.
+        """
+        with self._debate_scope():
+            yield from self._stream_debate(topic, agent_count, rounds, debate_timeout)
+    
+    def _stream_debate(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                       debate_timeout: Optional[float] = None) -> Iterator[DebateEvent]:
+        start_time = time.time()
+        deadline = Deadline(debate_timeout)
+        roles = self._debate_roles(agent_count)
+        turns = plan_turns(roles[:-1], rounds, topology=self.topology)
+        all_responses = []
+        context = self._new_context()
+        monitor = self._new_monitor()
+        rounds_run = 0
+        spans = []
+        
+        for round_num in range(rounds):
+            for role in roles[:-1]:
+                prefix, prompt = self._turn_prompt(turns[len(all_responses)], topic, all_responses, roles[:-1], context)
+                response_text = yield from self._stream_turn(role, round_num + 1, prompt, deadline,
+                                                             span=self._span(spans, role, round_num + 1), prefix=prefix)
+                all_responses.append(response_text)
+            self._end_round(context, round_num + 1, roles[:-1], all_responses)
+            rounds_run = round_num + 1
+            if self._converged(monitor, rounds_run, rounds, all_responses[-(len(roles) - 1):]):
+                yield DebateConverged(rounds_run, monitor.last_similarity)
+                break
+        
+        judge_prefix, judge_prompt = self._judge_prompt(topic, rounds_run, all_responses, roles, context)
+        verdict = None
+        if self.judge_candidates > 1:
+            # The verdict is only known once the candidates are compared, so it arrives as one chunk
+            yield TurnStarted("Judge", rounds_run + 1)
+            started = time.time()
+            verdict = self._verdict(judge_prompt, rounds_run, deadline, spans, judge_prefix)
+            final_verdict_text = verdict.text
+            yield TokenChunk("Judge", rounds_run + 1, final_verdict_text)
+            yield TurnFinished("Judge", rounds_run + 1, final_verdict_text, time.time() - started)
+        else:
+            final_verdict_text = yield from self._stream_turn("Judge", rounds_run + 1, judge_prompt, deadline,
+                                                              kind="verdict",
+                                                              span=self._span(spans, "Judge", rounds_run + 1),
+                                                              prefix=judge_prefix)
+        
+        result = self._build_result(topic, agent_count, rounds, final_verdict_text, time.time() - start_time,
+                                    rounds_run, monitor, spans, verdict)
+        yield VerdictReady(result.final_verdict, result.quality_scores, result.convergence)
+        yield DebateMetrics(result, self.backend.usage_summary())
+    
+    async def stream_debate_async(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                                  debate_timeout: Optional[float] = None,
+                                  call_slots: Optional[asyncio.Semaphore] = None) -> AsyncIterator[DebateEvent]:
+        """Async version of ``stream_debate``; cancel by closing it or cancelling its task.
+        
+        ``call_slots`` caps in-flight model calls (a streamed turn holds its slot
+        until the stream ends), as in ``run_debate_async``.
+        """
+        with self._debate_scope():
+            events = self._stream_debate_async(topic, agent_count, rounds, debate_timeout, call_slots)
+            try:
+                async for event in events:
+                    yield event
+            finally:
+                await events.aclose()
+    
+    async def _stream_debate_async(self, topic: str, agent_count: int = 4, rounds: int = 2,
+                                   debate_timeout: Optional[float] = None,
+                                   call_slots: Optional[asyncio.Semaphore] = None) -> AsyncIterator[DebateEvent]:
+        start_time = time.time()
+        deadline = Deadline(debate_timeout)
+        roles = self._debate_roles(agent_count)
+        turns = plan_turns(roles[:-1], rounds, topology=self.topology)
+        all_responses = []
+        context = self._new_context()
+        monitor = self._new_monitor()
+        rounds_run = 0
+        spans = []
+        
+        for round_num in range(rounds):
+            for role in roles[:-1]:
+                prefix, prompt = self._turn_prompt(turns[len(all_responses)], topic, all_responses, roles[:-1], context)
+                async for event in self._stream_turn_async(role, round_num + 1, prompt, deadline,
+                                                           span=self._span(spans, role, round_num + 1), prefix=prefix,
+                                                           call_slots=call_slots):
+                    yield event
+                all_responses.append(event.text)
+            self._end_round(context, round_num + 1, roles[:-1], all_responses)
+            rounds_run = round_num + 1
+            if self._converged(monitor, rounds_run, rounds, all_responses[-(len(roles) - 1):]):
+                yield DebateConverged(rounds_run, monitor.last_similarity)
+                break
+        
+        judge_prefix, judge_prompt = self._judge_prompt(topic, rounds_run, all_responses, roles, context)
+        verdict = None
+        if self.judge_candidates > 1:
+            yield TurnStarted("Judge", rounds_run + 1)
+            started = time.time()
+            verdict = await self._verdict_async(judge_prompt, rounds_run, call_slots, deadline, spans, judge_prefix)
+            final_verdict_text = verdict.text
+            yield TokenChunk("Judge", rounds_run + 1, final_verdict_text)
+            yield TurnFinished("Judge", rounds_run + 1, final_verdict_text, time.time() - started)
+        else:
+            async for event in self._stream_turn_async("Judge", rounds_run + 1, judge_prompt, deadline,
+                                                       kind="verdict",
+                                                       span=self._span(spans, "Judge", rounds_run + 1),
+                                                       prefix=judge_prefix, call_slots=call_slots):
+                yield event
+            final_verdict_text = event.text
+        
+        result = self._build_result(topic, agent_count, rounds, final_verdict_text, time.time() - start_time,
+                                    rounds_run, monitor, spans, verdict)
+        yield VerdictReady(result.final_verdict, result.quality_scores, result.convergence)
+        yield DebateMetrics(result, self.backend.usage_summary())
+    
+    def _stream_turn(self, role: str, round_num: int, prompt: str, deadline: Optional[Deadline] = None,
+                     kind: str = "response", span: Optional[CallSpan] = None, prefix: Optional[str] = None):
+        """Yield the events of one streamed turn and return its text."""
+        yield TurnStarted(role, round_num)
+        started = time.time()
+        parts, finish_reason = [], None
+        try:
+            for chunk in self._stream(prompt, deadline, span, prefix):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield TokenChunk(role, round_num, chunk.text)
+                if chunk.finish_reason is not None:
+                    finish_reason = chunk.finish_reason
+        except Exception as e:
+            raise DebateTurnError(role, round_num, e) from e
+        text = self._response_text(GenerationResult("".join(parts), finish_reason=finish_reason), kind)
+        yield TurnFinished(role, round_num, text, time.time() - started)
+        return text
+    
+    async def _stream_turn_async(self, role: str, round_num: int, prompt: str,
+                                 deadline: Optional[Deadline] = None,
+                                 kind: str = "response", span: Optional[CallSpan] = None,
+                                 prefix: Optional[str] = None,
+                                 call_slots: Optional[asyncio.Semaphore] = None) -> AsyncIterator[DebateEvent]:
+        """Async version of ``_stream_turn``; the last event is the ``TurnFinished``."""
+        yield TurnStarted(role, round_num)
+        started = time.time()
+        parts, finish_reason = [], None
+        try:
+            async for chunk in self._stream_async(prompt, deadline, span, prefix, call_slots):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield TokenChunk(role, round_num, chunk.text)
+                if chunk.finish_reason is not None:
+                    finish_reason = chunk.finish_reason
+        except Exception as e:
+            raise DebateTurnError(role, round_num, e) from e
+        text = self._response_text(GenerationResult("".join(parts), finish_reason=finish_reason), kind)
+        yield TurnFinished(role, round_num, text, time.time() - started)
+    
+    def _candidate_batches(self) -> List[int]:
+        """Request sizes for the Judge's candidates: as few requests as the backend allows."""
+        per_request = max(1, self.backend.max_candidates)
+        return [min(per_request, self.judge_candidates - start)
+                for start in range(0, self.judge_candidates, per_request)]
+    
+    def _verdict(self, judge_prompt: str, rounds_run: int, deadline: Optional[Deadline], spans: List[CallSpan],
+                 prefix: Optional[str] = None) -> VerdictChoice:
+        """Generate the Judge's verdict, from ``judge_candidates`` candidates requested at once."""
+        batches = self._candidate_batches()
+        batch_spans = [self._span(spans, "Judge", rounds_run + 1) for _ in batches]
+        
+        def request(size: int, span: CallSpan) -> List[GenerationResult]:
+            if size == 1:
+                return [self._generate(judge_prompt, deadline, span, prefix, fresh=len(batches) > 1)]
+            return self._generate_candidates(judge_prompt, size, deadline, span, prefix)
+        
+        try:
+            if len(batches) == 1:
+                results = request(batches[0], batch_spans[0])
+            else:
+                with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+                    results = [result for batch in pool.map(request, batches, batch_spans) for result in batch]
+        except Exception as e:
+            print(f"❌ Error generating verdict: {e}")
+            raise DebateTurnError("Judge", rounds_run + 1, e) from e
+        return self._choose_verdict(results)
+    
+    async def _verdict_async(self, judge_prompt: str, rounds_run: int, call_slots: Optional[asyncio.Semaphore],
+                             deadline: Optional[Deadline], spans: List[CallSpan],
+                             prefix: Optional[str] = None) -> VerdictChoice:
+        """Generate the Judge's verdict with the async SDK call (candidate requests run concurrently)."""
+        batches = self._candidate_batches()
+        
+        async def request(size: int, span: CallSpan) -> List[GenerationResult]:
+            if size == 1:
+                return [await self._generate_async(judge_prompt, call_slots, deadline, span, prefix,
+                                                   fresh=len(batches) > 1)]
+            return await self._generate_candidates_async(judge_prompt, size, call_slots, deadline, span, prefix)
+        
+        try:
+            batch_results = await asyncio.gather(*(request(size, self._span(spans, "Judge", rounds_run + 1))
+                                                   for size in batches))
+        except Exception as e:
+            print(f"❌ Error generating verdict: {e}")
+            raise DebateTurnError("Judge", rounds_run + 1, e) from e
+        return self._choose_verdict([result for batch in batch_results for result in batch])
+    
+    def _choose_verdict(self, results: List[GenerationResult]) -> VerdictChoice:
+        """Score the Judge's candidates in one batch and pick the verdict by ``judge_aggregation``."""
+        texts = [self._response_text(result, kind="verdict") for result in results]
+        scores = QualityRubric.assess_batch(texts).sum(axis=1).tolist()
+        verdict = choose_verdict(texts, scores, self.judge_aggregation)
+        if len(texts) > 1:
+            print(f"🗳️  Judge verdict: candidate {verdict.index + 1} of {len(texts)} by {self.judge_aggregation} "
+                  f"(agreement {verdict.agreement:.2f})")
+        return verdict
+    
+    async def _agent_turn_async(self, role: str, round_num: int, prompt: str,
+                                call_slots: Optional[asyncio.Semaphore] = None,
+                                deadline: Optional[Deadline] = None, span: Optional[CallSpan] = None,
+                                prefix: Optional[str] = None) -> str:
+        """Generate one debater turn with the async SDK call."""
+        print(f"🤖 {role} is thinking...")
+        try:
+            response = await self._generate_async(prompt, call_slots, deadline, span, prefix)
+        except Exception as e:
+            print(f"❌ Error generating response for {role}: {e}")
+            raise DebateTurnError(role, round_num, e) from e
+        response_text = self._response_text(response)
+        print(f"📝 {role}: {response_text[:150]}...")
+        return response_text
+    
+    @staticmethod
+    def _span(spans: List[CallSpan], role: str, round_num: int) -> CallSpan:
+        """Start a span for one model call and add it to the debate's spans."""
+        span = CallSpan(role, round_num)
+        spans.append(span)
+        return span
+    
+    def _open_checkpoint(self, checkpoint_id: Optional[str], topic: str, agent_count: int,
+                         rounds: int) -> Optional[DebateCheckpoint]:
+        """Load the debate's checkpoint to resume it, or start a new one; None without a store."""
+        if self.checkpoint_store is None:
+            return None
+        checkpoint = self.checkpoint_store.load(checkpoint_id) if checkpoint_id else None
+        if checkpoint is None:
+            checkpoint = DebateCheckpoint.new(topic, agent_count, rounds, len(self._debate_roles(agent_count)) - 1,
+                                              checkpoint_id)
+            self.checkpoint_store.save(checkpoint)
+            print(f"💾 Checkpointing debate as {checkpoint.checkpoint_id}")
+        elif (checkpoint.topic, checkpoint.agent_count, checkpoint.rounds) != (topic, agent_count, rounds):
+            raise ValueError(f"Checkpoint {checkpoint_id} belongs to a different debate")
+        else:
+            done = sum(turn is not None for turn in checkpoint.turns)
+            print(f"♻️  Resuming {checkpoint_id} from round {checkpoint.current_round} ({done} turns restored)")
+        return checkpoint
+    
+    def _load_checkpoint(self, checkpoint_id: str) -> DebateCheckpoint:
+        if self.checkpoint_store is None:
+            raise ValueError("resume_debate needs a checkpoint_store")
+        checkpoint = self.checkpoint_store.load(checkpoint_id)
+        if checkpoint is None:
+            raise KeyError(f"No checkpoint {checkpoint_id}")
+        return checkpoint
+    
+    @staticmethod
+    def _restored_turn(checkpoint: Optional[DebateCheckpoint], turn: int) -> Optional[str]:
+        """Text of a turn that finished before the debate was interrupted, if any."""
+        return checkpoint.turns[turn] if checkpoint is not None else None
+    
+    def _save_turn(self, checkpoint: Optional[DebateCheckpoint], turn: int, round_num: int,
+                   text: str, start_time: float):
+        if checkpoint is None:
+            return
+        checkpoint.turns[turn] = text
+        checkpoint.current_round = round_num
+        checkpoint.elapsed = time.time() - start_time
+        self.checkpoint_store.save(checkpoint)
+    
+    def _save_verdict(self, checkpoint: Optional[DebateCheckpoint], text: str, start_time: float):
+        if checkpoint is None:
+            return
+        checkpoint.verdict = text
+        checkpoint.elapsed = time.time() - start_time
+        self.checkpoint_store.save(checkpoint)
+    
+    def _new_context(self) -> Optional[RollingContext]:
+        """Per-debate rolling context, or None when prompts use the raw window."""
+        if self.context_budget is None:
+            return None
+        return RollingContext(token_budget=self.context_budget, judge_token_budget=self.judge_context_budget)
+    
+    def _new_monitor(self) -> Optional[ConvergenceMonitor]:
+        """Per-debate convergence monitor, or None when every round is run."""
+        if self.convergence_threshold is None:
+            return None
+        return ConvergenceMonitor(threshold=self.convergence_threshold, min_rounds=self.min_rounds)
+    
+    @staticmethod
+    def _converged(monitor: Optional[ConvergenceMonitor], round_num: int, rounds: int,
+                   round_responses: List[str]) -> bool:
+        """Record a finished round; True if the remaining rounds should be skipped."""
+        if monitor is None:
+            return False
+        converged = monitor.observe(round_responses)
+        if converged and round_num < rounds:
+            print(f"🤝 Positions stable after round {round_num} "
+                  f"(similarity {monitor.last_similarity:.2f}), skipping to the verdict")
+            return True
+        return False
+    
+    def _turn_prompt(self, turn: TurnNode, topic: str, transcript: List[Optional[str]], debaters: List[str],
+                     context: Optional[RollingContext]) -> Tuple[Optional[str], str]:
+        """(cacheable prefix, prompt) for a debater turn; the prefix is None without prefix caching.
+        
+        ``transcript`` holds the finished turns by index. The prompt is rendered
+        through the rolling context if there is one.
+        """
+        previous_responses = self._previous_responses(transcript, turn)
+        if self.prefix_cache:
+            return self._cached_turn_prompt(turn, topic, transcript, debaters, previous_responses, context)
+        if context is None:
+            return None, self.get_agent_prompt(turn.role, topic, turn.round_num, previous_responses)
+        return None, self.get_agent_prompt(turn.role, topic, turn.round_num, previous_responses,
+                                           context=context.render(previous_responses))
+    
+    def _prompt_prefix(self, topic: str, debaters: List[str], finished: List[str]) -> str:
+        """Shared start of every prompt in a round: the debate, its topic and (if routed to everyone) the finished rounds."""
+        prefix = f"""You are taking part in a structured multi-agent debate on this topic: {topic}
+
+Debaters speak in turn each round; a Judge gives the final verdict after the last round.
+"""
+        if finished and self.topology is None and self.context_budget is None:
+            turns = [f"Round {i // len(debaters) + 1} — {debaters[i % len(debaters)]}:{chr(10)}{text}"
+                     for i, text in enumerate(finished)]
+            prefix += f"{chr(10)}Finished rounds:{chr(10)}{chr(10)}" + f"{chr(10)}{chr(10)}".join(turns) + chr(10)
+        return prefix + chr(10)
+    
+    def _cached_turn_prompt(self, turn: TurnNode, topic: str, transcript: List[Optional[str]],
+                            debaters: List[str], previous_responses: Optional[List[str]],
+                            context: Optional[RollingContext]) -> Tuple[str, str]:
+        """Prefix-cached form of a turn prompt: the round's shared prefix plus a short per-turn suffix."""
+        round_start = (turn.round_num - 1) * len(debaters)
+        prefix = self._prompt_prefix(topic, debaters, [transcript[i] for i in range(round_start)])
+        if context is not None:
+            history_heading, history = "Debate so far:", context.render(previous_responses)
+        elif self.topology is not None:
+            history_heading = "Previous responses:" if previous_responses else ""
+            history = chr(10).join(f"- {resp[:200]}..." for resp in previous_responses or [])
+        else:
+            # Earlier rounds are in the prefix; only this round's turns are new
+            current = [i for i in turn.window or () if i >= round_start]
+            history_heading = "This round so far:" if current else ""
+            history = chr(10).join(f"- {debaters[i - round_start]}: {transcript[i]}" for i in current)
+        role = base_role(turn.role)
+        seat = f" ({turn.role})" if role != turn.role else ""
+        return prefix, f"""You are the {role.lower()}{seat} in this debate.
+
+Round: {turn.round_num}
+
+{history_heading}
+{history}
+
+{self.role_instructions(role, turn.round_num)}"""
+    
+    @staticmethod
+    def _end_round(context: Optional[RollingContext], round_num: int, debaters: List[str],
+                   all_responses: List[str]):
+        """Record the round just finished (the last ``len(debaters)`` turns) in the rolling context."""
+        if context is None:
+            return
+        for role, text in zip(debaters, all_responses[-len(debaters):]):
+            context.add_turn(role, text)
+        context.end_round(round_num)
+    
+    def _judge_prompt(self, topic: str, rounds: int, all_responses: List[str], roles: List[str],
+                      context: Optional[RollingContext]) -> Tuple[Optional[str], str]:
+        """(cacheable prefix, prompt) for the Judge; with a rolling context only the last round is quoted in full.
+        
+        With prefix caching the Judge reuses the last round's prefix, so only
+        that round and the instructions are new.
+        """
+        last_round = all_responses[-(len(roles) - 1):]
+        if self.prefix_cache:
+            debaters = roles[:-1]
+            prefix = self._prompt_prefix(topic, debaters, all_responses[:-len(debaters)])
+            if context is not None:
+                history_heading, history = "Debate so far:", context.render(last_round, judge=True)
+            elif self.topology is not None:
+                history_heading = "All previous responses:"
+                history = chr(10).join(f"- {resp[:300]}..." for resp in all_responses)
+            else:
+                history_heading = "Last round:"
+                history = chr(10).join(f"- {role}: {text}" for role, text in zip(debaters, last_round))
+            return prefix, f"""You are the judge of this debate.
+
+Final Round
+
+{history_heading}
+{history}
+
+{self.role_instructions("Judge", rounds + 1)}"""
+        if context is None:
+            return None, self.get_agent_prompt("Judge", topic, rounds + 1, all_responses)
+        return None, self.get_agent_prompt("Judge", topic, rounds + 1, all_responses,
+                                           context=context.render(last_round, judge=True))
+    
+    @staticmethod
+    def _debate_roles(agent_count: int) -> List[str]:
+        """Return the speaking order for a debate, Judge last (see ``topology.agent_pool``)."""
+        return agent_pool(agent_count)
+    
+    @staticmethod
+    def _previous_responses(all_responses: List[str], turn: TurnNode) -> Optional[List[str]]:
+        """Turns quoted to a debater turn, as planned by ``turn_scheduler.plan_turns``."""
+        if not turn.window:
+            return None
+        return [all_responses[i] for i in turn.window]
+    
+    @staticmethod
+    def _response_text(result: GenerationResult, kind: str = "response") -> str:
+        """Turn a generation into turn text, describing empty responses."""
+        if result.text:
+            return result.text
+        if result.finish_reason is not None:
+            label = "content" if kind == "response" else kind
+            return f"No {label} generated (finish_reason: {result.finish_reason})"
+        return f"No {kind} candidates generated"
+    
+    @staticmethod
+    def _build_result(topic: str, agent_count: int, rounds: int, final_verdict_text: str,
+                      execution_time: float, rounds_run: Optional[int] = None,
+                      monitor: Optional[ConvergenceMonitor] = None,
+                      spans: Optional[List[CallSpan]] = None,
+                      verdict: Optional[VerdictChoice] = None) -> DebateResult:
+        """Score the verdict and package a DebateResult.
+        
+        ``verdict`` carries the Judge's candidates when there were several;
+        convergence is then their majority view.
+        """
         # Assess quality
         quality_scores = QualityRubric.assess_quality(final_verdict_text)
         
-        # Check for convergence (simple heuristic)
-        convergence = any(word in final_verdict_text.lower() for word in 
-                         ['consensus', 'agreement', 'conclusion', 'verdict', 'decision'])
+        # Check for convergence (simple heuristic, voted on by the candidates if there are several)
+        candidates = verdict.candidates if verdict is not None and len(verdict.candidates) > 1 else []
+        convergence = verdict.convergence if candidates else mentions_consensus(final_verdict_text)
         
         # Extract key excerpts
         excerpts = [
@@ -253,7 +1334,12 @@ Write 3-4 paragraphs."""
             quality_scores=quality_scores,
             convergence=convergence,
             execution_time=execution_time,
-            excerpts=excerpts
+            excerpts=excerpts,
+            stopped_at_round=rounds if rounds_run is None else rounds_run,
+            round_similarities=list(monitor.similarities) if monitor is not None else [],
+            spans=spans or [],
+            verdict_candidates=candidates,
+            verdict_agreement=verdict.agreement if candidates else None
         )
 
 def main():
@@ -262,6 +1348,7 @@ def main():
     print("=" * 50)
     
     # Check for API key
+    load_env()
     if not os.getenv("GOOGLE_API_KEY"):
         print("❌ Please set your GOOGLE_API_KEY in a .env file")
         print("Copy env_example.txt to .env and add your API key")
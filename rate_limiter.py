@@ -0,0 +1,131 @@
+"""
+Rate limiting for model calls.
+Token buckets for requests per minute and tokens per minute, shared per process and API key.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (roughly four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations in arrival order.
+
+    A reservation is taken immediately, even if it drives the balance negative;
+    the caller is told how long to wait until the debt is refilled. Queued callers
+    therefore go out exactly when capacity becomes available, in FIFO order.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        if capacity <= 0 or refill_per_second <= 0:
+            raise ValueError("capacity and refill_per_second must be positive")
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+            self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return the seconds to wait before using them."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_second
+
+    def refund(self, amount: float):
+        """Give back tokens (negative amounts take more), e.g. after an over-estimate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available (negative while callers are queued)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimiter:
+    """No-op limiter; base class for pluggable rate limiters."""
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request of ``tokens`` may be sent. Returns seconds waited."""
+        return 0.0
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Async version of ``acquire``."""
+        return 0.0
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct a reservation once the real token usage is known (0 for a rejected request, None if unknown)."""
+        pass
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """Limits both requests per minute and tokens per minute."""
+
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 1_000_000):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def _reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        if actual_tokens is not None:
+            # reserve() took at most the bucket's capacity, so never give back more than that
+            reserved = min(estimated_tokens, self.tokens.capacity)
+            self.tokens.refund(reserved - actual_tokens)
+
+
+_registry: Dict[Tuple[str, str], RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: Optional[str], requests_per_minute: float = 60,
+                     tokens_per_minute: float = 1_000_000, scope: str = "default") -> RateLimiter:
+    """Return the process-wide limiter for an API key, creating it on first use.
+
+    Every debate and experiment run that uses the same key (and ``scope``, e.g.
+    the model, for quotas that are counted per model) shares one limiter, so
+    their combined traffic stays under that quota. The limits passed on the
+    first call for a key and scope win.
+    """
+    key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+    with _registry_lock:
+        limiter = _registry.get((key_id, scope))
+        if limiter is None:
+            limiter = TokenBucketRateLimiter(requests_per_minute, tokens_per_minute)
+            _registry[(key_id, scope)] = limiter
+        return limiter
@@ -0,0 +1,531 @@
+"""
+Resilient model calls.
+Classified retries with jittered exponential backoff, per-call timeouts and
+per-debate deadlines, a circuit breaker per backend, and optional hedged requests.
+"""
+
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "BadGateway", "GatewayTimeout", "DeadlineExceeded", "Aborted",
+}
+
+
+class ModelCallError(RuntimeError):
+    """Base class for failures raised by the call layer."""
+    retryable = False
+
+
+class CircuitOpenError(ModelCallError):
+    """The backend's circuit breaker is open; the call was not attempted."""
+
+
+class DeadlineExceededError(ModelCallError):
+    """The per-debate deadline ran out."""
+
+
+class RetriesExhaustedError(ModelCallError):
+    """Every attempt failed with a retryable error."""
+
+    def __init__(self, attempts: int, last_error: Exception):
+        super().__init__(f"gave up after {attempts} attempts: {last_error}")
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an error is transient (rate limit, server error, timeout)."""
+    flag = getattr(exc, "retryable", None)
+    if flag is not None:
+        return bool(flag)
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, concurrent.futures.TimeoutError, ConnectionError)):
+        return True
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int) and value in RETRYABLE_STATUS_CODES:
+            return True
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Whether an error is a quota / rate-limit rejection (HTTP 429)."""
+    for attr in ("code", "status_code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    return type(exc).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+class Deadline:
+    """Absolute point in time after which no more calls are made (None means never)."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        """Delay before retry number ``attempt`` (0-based)."""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Stops calling a backend after repeated transient failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls fail
+    immediately for ``reset_timeout`` seconds; then a single trial call is let
+    through and its outcome closes or re-opens the circuit. Every call settles
+    with one of the ``record_*`` methods, so a trial that ends without a
+    success or transient failure still decides the state.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def record_rejected(self):
+        """The call failed with a non-transient error: the backend is reachable, so a trial closes the circuit."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+                self._failures = 0
+
+    def record_abandoned(self):
+        """The call ended without an outcome (cancelled or out of time): a trial re-opens the circuit."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+_breakers: "weakref.WeakKeyDictionary[Any, CircuitBreaker]" = weakref.WeakKeyDictionary()
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(backend: Any) -> CircuitBreaker:
+    """The shared circuit breaker of a backend instance."""
+    with _breakers_lock:
+        breaker = _breakers.get(backend)
+        if breaker is None:
+            breaker = _breakers[backend] = CircuitBreaker()
+        return breaker
+
+
+class HedgePolicy:
+    """Sends a duplicate request when a call runs longer than a latency percentile.
+
+    No hedging happens until ``min_samples`` successful latencies have been seen.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20, window: int = 200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when there is not enough history."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+
+def _close_source(chunks: Any):
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+class ResilientCaller:
+    """Runs model calls with retries, timeouts, a circuit breaker and optional hedging.
+
+    ``call_timeout`` bounds a single attempt (for streams, the wait for each
+    chunk); a ``Deadline`` passed per call bounds the whole sequence of attempts
+    (e.g. one deadline for a complete debate).
+    ``before_attempt`` runs before every attempt outside the timeout, which is where
+    callers wait on the rate limiter; ``on_retry(attempt, error, delay)`` is told
+    about each retry and ``on_hedge()`` about each duplicate request.
+
+    A blocking call cannot be interrupted, so sync attempts and stream chunk
+    waits with a timeout (or hedging) run on the caller's own pool of
+    ``max_workers`` threads: at most that many of them are in flight at once
+    for this caller, whatever concurrency its users allow. An attempt that
+    times out keeps its thread until the backend returns, so give the backend
+    a request timeout too (``GeminiBackend(request_timeout=...)``). Async
+    calls do not use the pool.
+    """
+
+    def __init__(self, retry: Optional[RetryPolicy] = None, call_timeout: Optional[float] = 120.0,
+                 breaker: Optional[CircuitBreaker] = None, hedge: Optional[HedgePolicy] = None,
+                 seed: Optional[int] = None, max_workers: int = 32):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.retry = retry or RetryPolicy()
+        self.call_timeout = call_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.max_workers = max_workers
+        self._rng = random.Random(seed)
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                   thread_name_prefix="model-call")
+            return self._pool
+
+    def close(self):
+        """Let the caller's worker threads exit once idle; a later call starts new ones."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _timeout(self, deadline: Optional[Deadline]) -> Optional[float]:
+        remaining = deadline.remaining() if deadline else None
+        if remaining is None:
+            return self.call_timeout
+        if self.call_timeout is None:
+            return remaining
+        return min(self.call_timeout, remaining)
+
+    @staticmethod
+    def _stall_error(timeout: float, deadline: Optional[Deadline]) -> Exception:
+        if deadline is not None and deadline.expired:
+            return DeadlineExceededError("debate deadline exceeded while waiting for the stream")
+        return TimeoutError(f"model stream stalled for {timeout:.1f}s")
+
+    @staticmethod
+    def _check_stream_deadline(deadline: Optional[Deadline]):
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceededError("debate deadline exceeded mid-stream")
+
+    def _chunks(self, chunks: Iterator[Any], deadline: Optional[Deadline]) -> Iterator[Any]:
+        """Yield from ``chunks``, waiting for each one at most ``_timeout(deadline)``.
+
+        A blocked iterator cannot be interrupted, so chunks are pulled on the
+        caller's executor; a stalled one is left behind there. No chunk is
+        requested once the deadline has passed, and the source is closed when
+        this generator is (after a stalled ``next`` returns, if need be).
+        """
+        if self._timeout(deadline) is None:
+            yield from chunks
+            return
+        end = object()
+        future = None
+        try:
+            while True:
+                self._check_stream_deadline(deadline)
+                timeout = self._timeout(deadline)
+                future = self._executor().submit(next, chunks, end)
+                try:
+                    chunk = future.result(timeout=timeout)
+                except concurrent.futures.TimeoutError:
+                    raise self._stall_error(timeout, deadline) from None
+                if chunk is end:
+                    return
+                yield chunk
+        finally:
+            if future is None or future.done():
+                _close_source(chunks)
+            else:
+                future.add_done_callback(lambda _: _close_source(chunks))
+
+    async def _chunks_async(self, chunks: AsyncIterator[Any], deadline: Optional[Deadline]) -> AsyncIterator[Any]:
+        """Async version of ``_chunks``; a stalled iterator is cancelled."""
+        iterator = chunks.__aiter__()
+        try:
+            while True:
+                self._check_stream_deadline(deadline)
+                timeout = self._timeout(deadline)
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise self._stall_error(timeout, deadline) from None
+                yield chunk
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _check(self, deadline: Optional[Deadline]):
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceededError("debate deadline exceeded")
+        if not self.breaker.allow():
+            raise CircuitOpenError("circuit breaker is open for this backend")
+
+    def _next_delay(self, attempt: int, error: Exception, deadline: Optional[Deadline]) -> float:
+        """Delay before the next attempt, or raise if there should not be one."""
+        if not is_retryable(error):
+            self._settle(error)
+            raise error
+        self.breaker.record_failure()
+        if attempt + 1 >= self.retry.max_attempts:
+            raise RetriesExhaustedError(attempt + 1, error) from error
+        delay = self.retry.backoff(attempt, self._rng)
+        remaining = deadline.remaining() if deadline else None
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceededError(f"debate deadline exceeded while retrying: {error}") from error
+        return delay
+
+    def _settle(self, error: BaseException):
+        """Tell the breaker how a call that did not succeed ended."""
+        if isinstance(error, Exception) and is_retryable(error):
+            self.breaker.record_failure()
+        elif isinstance(error, Exception) and not isinstance(error, DeadlineExceededError):
+            self.breaker.record_rejected()
+        else:
+            self.breaker.record_abandoned()
+
+    def _succeeded(self, started: float):
+        self.breaker.record_success()
+        if self.hedge is not None:
+            self.hedge.record(time.monotonic() - started)
+
+    def call(self, fn: Callable[[], Any], deadline: Optional[Deadline] = None,
+             before_attempt: Optional[Callable[[], Any]] = None,
+             on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+             on_hedge: Optional[Callable[[], None]] = None) -> Any:
+        """Call ``fn()`` until it succeeds or the policy gives up."""
+        for attempt in range(self.retry.max_attempts):
+            self._check(deadline)
+            try:
+                if before_attempt is not None:
+                    before_attempt()
+                started = time.monotonic()
+                result = self._attempt(fn, self._timeout(deadline), before_attempt, on_hedge)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if on_retry is not None:
+                    on_retry(attempt + 1, e, delay)
+                time.sleep(delay)
+                continue
+            except BaseException as e:
+                self._settle(e)
+                raise
+            self._succeeded(started)
+            return result
+
+    def _attempt(self, fn, timeout, before_attempt, on_hedge):
+        hedge_delay = self.hedge.delay() if self.hedge is not None else None
+        if hedge_delay is None and timeout is None:
+            return fn()
+        executor = self._executor()
+        pending = {executor.submit(fn)}
+        started = time.monotonic()
+        if hedge_delay is not None:
+            done, _ = concurrent.futures.wait(pending, timeout=hedge_delay if timeout is None else min(hedge_delay, timeout))
+            if not done:
+                if on_hedge is not None:
+                    on_hedge()
+
+                def hedged():
+                    if before_attempt is not None:
+                        before_attempt()
+                    return fn()
+                pending.add(executor.submit(hedged))
+        while pending:
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            done, pending = concurrent.futures.wait(pending, timeout=remaining,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise TimeoutError(f"model call timed out after {timeout:.1f}s")
+            for future in sorted(done, key=lambda f: f.exception() is not None):
+                if future.exception() is None or not pending:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], deadline: Optional[Deadline] = None,
+                         before_attempt: Optional[Callable[[], Awaitable[Any]]] = None,
+                         on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+                         on_hedge: Optional[Callable[[], None]] = None) -> Any:
+        """Async version of ``call``; ``fn`` and ``before_attempt`` return awaitables."""
+        for attempt in range(self.retry.max_attempts):
+            self._check(deadline)
+            try:
+                if before_attempt is not None:
+                    await before_attempt()
+                started = time.monotonic()
+                result = await self._attempt_async(fn, self._timeout(deadline), before_attempt, on_hedge)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if on_retry is not None:
+                    on_retry(attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException as e:
+                self._settle(e)
+                raise
+            self._succeeded(started)
+            return result
+
+    async def _attempt_async(self, fn, timeout, before_attempt, on_hedge):
+        hedge_delay = self.hedge.delay() if self.hedge is not None else None
+        if hedge_delay is None:
+            if timeout is None:
+                return await fn()
+            return await asyncio.wait_for(fn(), timeout)
+
+        async def hedged():
+            if before_attempt is not None:
+                await before_attempt()
+            return await fn()
+
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(fn())}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay if timeout is None else min(hedge_delay, timeout))
+            if not done:
+                if on_hedge is not None:
+                    on_hedge()
+                pending.add(asyncio.ensure_future(hedged()))
+            while pending:
+                remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError(f"model call timed out after {timeout:.1f}s")
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    if task.exception() is None or not pending:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream(self, open_stream: Callable[[], Iterator[Any]], deadline: Optional[Deadline] = None,
+               before_attempt: Optional[Callable[[], Any]] = None,
+               on_retry: Optional[Callable[[int, Exception, float], None]] = None) -> Iterator[Any]:
+        """Yield from ``open_stream()``, retrying only failures before the first chunk.
+
+        Waiting longer than ``call_timeout`` for any chunk (or past the
+        deadline) is a timeout, retried only if no chunk has arrived yet.
+        """
+        for attempt in range(self.retry.max_attempts):
+            self._check(deadline)
+            streamed, chunks = False, None
+            try:
+                if before_attempt is not None:
+                    before_attempt()
+                started = time.monotonic()
+                chunks = self._chunks(open_stream(), deadline)
+                for chunk in chunks:
+                    streamed = True
+                    yield chunk
+                    self._check_stream_deadline(deadline)
+            except Exception as e:
+                if streamed:
+                    self._settle(e)
+                    raise
+                delay = self._next_delay(attempt, e, deadline)
+                if on_retry is not None:
+                    on_retry(attempt + 1, e, delay)
+                time.sleep(delay)
+                continue
+            except BaseException as e:
+                # Cancelled, or the consumer closed the stream
+                self._settle(e)
+                raise
+            finally:
+                # Stop reading the model's stream now, not when the generator is collected
+                if chunks is not None:
+                    chunks.close()
+            self._succeeded(started)
+            return
+
+    async def stream_async(self, open_stream: Callable[[], AsyncIterator[Any]],
+                           deadline: Optional[Deadline] = None,
+                           before_attempt: Optional[Callable[[], Awaitable[Any]]] = None,
+                           on_retry: Optional[Callable[[int, Exception, float], None]] = None) -> AsyncIterator[Any]:
+        """Async version of ``stream``."""
+        for attempt in range(self.retry.max_attempts):
+            self._check(deadline)
+            streamed, chunks = False, None
+            try:
+                if before_attempt is not None:
+                    await before_attempt()
+                started = time.monotonic()
+                chunks = self._chunks_async(open_stream(), deadline)
+                async for chunk in chunks:
+                    streamed = True
+                    yield chunk
+                    self._check_stream_deadline(deadline)
+            except Exception as e:
+                if streamed:
+                    self._settle(e)
+                    raise
+                delay = self._next_delay(attempt, e, deadline)
+                if on_retry is not None:
+                    on_retry(attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException as e:
+                # Cancelled, or the consumer closed the stream
+                self._settle(e)
+                raise
+            finally:
+                if chunks is not None:
+                    await chunks.aclose()
+            self._succeeded(started)
+            return
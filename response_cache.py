@@ -0,0 +1,151 @@
+"""
+Content-addressed cache for model responses.
+A bounded in-memory LRU in front of an optional persistent SQLite store.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple
+
+from backends import GenerationResult, Usage
+
+
+def cache_key(model_name: str, generation_config: Dict[str, Any], prompt: str) -> str:
+    """Hash of everything that determines a response."""
+    payload = json.dumps(
+        {'model': model_name, 'config': generation_config, 'prompt': prompt},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache.
+
+    ``path`` is the SQLite file for the disk tier (None keeps the cache in memory
+    only). Entries older than ``ttl_seconds`` are ignored and purged; the memory
+    tier keeps at most ``max_memory_entries`` and the disk tier at most
+    ``max_disk_entries``, evicting the least recently used first.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 1024,
+                 max_disk_entries: Optional[int] = 100_000, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, GenerationResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, usage TEXT, finish_reason TEXT, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.commit()
+            self.purge_expired()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def _remember(self, key: str, created: float, result: GenerationResult):
+        self._memory[key] = (created, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[GenerationResult]:
+        """Return the cached result for ``key``, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT text, usage, finish_reason, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    text, usage, finish_reason, created = row
+                    if not self._expired(created, now):
+                        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        result = GenerationResult(text, Usage(**json.loads(usage or "{}")), finish_reason)
+                        self._remember(key, created, result)
+                        self.hits += 1
+                        return result
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: GenerationResult):
+        """Store a result under ``key``."""
+        now = time.time()
+        finish_reason = None if result.finish_reason is None else str(result.finish_reason)
+        stored = GenerationResult(result.text, result.usage, finish_reason)
+        with self._lock:
+            self._remember(key, now, stored)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, text, usage, finish_reason, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, result.text, json.dumps(asdict(result.usage)), finish_reason, now, now),
+                )
+                if self.max_disk_entries is not None:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                        "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+                    )
+                self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers. Returns the number removed from disk."""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for key in [k for k, (created, _) in self._memory.items() if created < cutoff]:
+                del self._memory[key]
+            if self._conn is None:
+                return 0
+            removed = self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+            self._conn.commit()
+            return removed
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            disk = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._conn else 0
+            return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self._memory), 'disk_entries': disk}
+
+    def close(self):
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,140 @@
+"""
+Durable stores for experiment results.
+Each finished debate is appended as soon as it completes (JSON Lines or SQLite),
+and records are read back one at a time so reports never hold a whole sweep.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+from metrics import CallSpan
+from multi_agent_debate import DebateResult
+
+
+def result_to_dict(result: DebateResult) -> Dict[str, Any]:
+    """Plain-JSON form of a DebateResult."""
+    return asdict(result)
+
+
+def result_from_dict(data: Dict[str, Any]) -> DebateResult:
+    """Rebuild a DebateResult written by ``result_to_dict`` (older records may lack newer fields)."""
+    data = dict(data)
+    data['spans'] = [CallSpan(**span) for span in data.get('spans', [])]
+    return DebateResult(**data)
+
+
+class ResultStore:
+    """Append-only store of {'experiment', 'config', 'result'} records.
+
+    The base class keeps records in memory; iteration yields them in the
+    order they were appended.
+    """
+
+    def __init__(self):
+        self._records: List[Dict[str, Any]] = []
+
+    def append(self, experiment: str, config: str, result: DebateResult):
+        """Store one finished debate."""
+        self._records.append({'experiment': experiment, 'config': config, 'result': result})
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._records))
+
+    def close(self):
+        """Release any open files or connections."""
+
+
+class JsonlResultStore(ResultStore):
+    """One JSON object per line; every append is flushed and fsynced before returning."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, experiment: str, config: str, result: DebateResult):
+        line = json.dumps({'experiment': experiment, 'config': config, 'created': time.time(),
+                           'result': result_to_dict(result)})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash mid-write
+                record['result'] = result_from_dict(record['result'])
+                yield record
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SqliteResultStore(ResultStore):
+    """Results in a SQLite ``results`` table, committed per append."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, experiment TEXT NOT NULL, config TEXT NOT NULL, "
+            "topic TEXT, created REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def append(self, experiment: str, config: str, result: DebateResult):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO results (experiment, config, topic, created, payload) VALUES (?, ?, ?, ?, ?)",
+                (experiment, config, result.topic, time.time(), json.dumps(result_to_dict(result))),
+            )
+            self._conn.commit()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # A separate cursor streams rows in id order without loading them all
+        cursor = sqlite3.connect(self.path).execute(
+            "SELECT experiment, config, created, payload FROM results ORDER BY id")
+        try:
+            for experiment, config, created, payload in cursor:
+                yield {'experiment': experiment, 'config': config, 'created': created,
+                       'result': result_from_dict(json.loads(payload))}
+        finally:
+            cursor.connection.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_result_store(path: Optional[str] = None, kind: Optional[str] = None) -> ResultStore:
+    """Open a store for ``path``.
+
+    ``kind`` is "jsonl" or "sqlite"; if omitted it is taken from the file
+    extension (.sqlite/.db mean SQLite, anything else JSON Lines). Without a
+    path the results are only kept in memory.
+    """
+    if path is None:
+        return ResultStore()
+    if kind is None:
+        kind = "sqlite" if os.path.splitext(path)[1].lower() in (".sqlite", ".sqlite3", ".db") else "jsonl"
+    if kind == "sqlite":
+        return SqliteResultStore(path)
+    if kind == "jsonl":
+        return JsonlResultStore(path)
+    raise ValueError(f"Unknown result store kind: {kind}")
@@ -6,88 +6,169 @@ Uses the gemini-2.0-flash-exp model that actually works.
 
 import os
 import json
+import asyncio
+import contextlib
+import sqlite3
 from datetime import datetime
-from multi_agent_debate_working import WorkingMultiAgentDebate, DebateResult
+from typing import Callable, Dict, Iterable, Optional
+from backends import ModelBackend, load_env
+from endpoint_pool import gemini_pool
+from multi_agent_debate import WorkingMultiAgentDebate, DebateResult
+from response_cache import ResponseCache
+from result_store import ResultStore, open_result_store
+
+# (experiment, config, run_debate settings) in report order
+EXPERIMENT_CONFIGS = [
+    ('agent_count', '2_agents', {'agent_count': 2, 'rounds': 2, 'temperature': 0.7}),
+    ('agent_count', '4_agents', {'agent_count': 4, 'rounds': 2, 'temperature': 0.7}),
+    ('round_count', '1_round', {'agent_count': 4, 'rounds': 1, 'temperature': 0.7}),
+    ('round_count', '3_rounds', {'agent_count': 4, 'rounds': 3, 'temperature': 0.7}),
+    ('temperature', 'low_temp', {'agent_count': 4, 'rounds': 2, 'temperature': 0.3}),
+    ('temperature', 'high_temp', {'agent_count': 4, 'rounds': 2, 'temperature': 0.9}),
+]
+
+def report_order(experiment: str, config: str) -> tuple:
+    """Sort key placing results in EXPERIMENT_CONFIGS order, then unknown configurations by name."""
+    experiments = list(dict.fromkeys(name for name, _, _ in EXPERIMENT_CONFIGS))
+    configs = [(name, config_name) for name, config_name, _ in EXPERIMENT_CONFIGS]
+    return (experiments.index(experiment) if experiment in experiments else len(experiments), experiment,
+            configs.index((experiment, config)) if (experiment, config) in configs else len(configs), config)
+
+def report_topic(topics: Iterable[str], limit: int = 3) -> str:
+    """Report header for the topics of a sweep: up to ``limit`` are listed, more are counted."""
+    topics = list(dict.fromkeys(topics))
+    if len(topics) > limit:
+        return f"{len(topics)} topics"
+    return "; ".join(topics)
 
 class WorkingExperimentRunner:
     """Runs systematic experiments on the working debate system."""
     
-    def __init__(self):
-        self.results = []
-        self.topic = "Should libraries invest more in digital resources or physical books?"
+    def __init__(self, cache: Optional[ResponseCache] = None, fresh_samples: bool = False,
+                 topic: str = "Should libraries invest more in digital resources or physical books?",
+                 store: Optional[ResultStore] = None,
+                 backend_factory: Optional[Callable[[float], ModelBackend]] = None):
+        """Set up the runner.
+        
+        With a ``cache``, repeated runs reuse earlier responses for identical
+        requests; ``fresh_samples`` forces new samples while still refreshing it.
+        For many topics at once, use ``bulk.BulkDebateRunner`` instead.
+        Each result is appended to ``store`` as soon as its debate finishes
+        (in memory only by default; see ``result_store.open_result_store``).
+        ``backend_factory(temperature)`` builds the model backends (Gemini by
+        default), e.g. a ``StubBackend`` for offline runs.
+        """
+        self.store = store if store is not None else ResultStore()
+        self.topic = topic
+        self.cache = cache
+        self.fresh_samples = fresh_samples
+        self.backend_factory = backend_factory
+        self._systems: Dict[float, WorkingMultiAgentDebate] = {}
+    
+    def _debate_system(self, temperature: float = 0.7) -> WorkingMultiAgentDebate:
+        """Return the runner's debate system for a temperature, creating it once."""
+        if temperature not in self._systems:
+            backend = self.backend_factory(temperature) if self.backend_factory else None
+            self._systems[temperature] = WorkingMultiAgentDebate(temperature=temperature, backend=backend,
+                                                                 cache=self.cache, cache_bypass=self.fresh_samples)
+        return self._systems[temperature]
+    
+    @property
+    def results(self):
+        """Every stored result record (reads the whole store; reports stream it instead)."""
+        return list(self.store)
+    
+    def run_all_experiments(self, max_concurrent_calls: int = 4, independent_samples: bool = False):
+        """Run every configuration in EXPERIMENT_CONFIGS concurrently."""
+        asyncio.run(self.run_all_experiments_async(max_concurrent_calls, independent_samples))
+    
+    async def run_all_experiments_async(self, max_concurrent_calls: int = 4, independent_samples: bool = False):
+        """Run every configuration concurrently on the current event loop.
+        
+        Configurations with the same temperature run as one sweep on a shared
+        client, so turns they have in common (round 1 of the 1- and 3-round
+        runs, the opening turns of the 2- and 4-agent runs) are generated once;
+        ``independent_samples=True`` gives every configuration its own calls.
+        At most ``max_concurrent_calls`` model calls are in flight across all
+        debates. Results are appended to the store as debates finish.
+        """
+        call_slots = asyncio.Semaphore(max_concurrent_calls)
+        groups: Dict[float, list] = {}
+        for index, (_, _, settings) in enumerate(EXPERIMENT_CONFIGS):
+            groups.setdefault(settings['temperature'], []).append(index)
+        
+        async def run_group(temperature, indices):
+            debate_system = self._debate_system(temperature)
+            configs = [(EXPERIMENT_CONFIGS[i][2]['agent_count'], EXPERIMENT_CONFIGS[i][2]['rounds']) for i in indices]
+            async for position, result in debate_system.run_sweep_async(
+                    self.topic, configs, share_prefixes=not independent_samples, call_slots=call_slots):
+                experiment, config, _ = EXPERIMENT_CONFIGS[indices[position]]
+                print(f"✅ {experiment} - {config} finished in {result.execution_time:.1f}s")
+                self.store.append(experiment, config, result)
+        
+        print(f"🔬 Running {len(EXPERIMENT_CONFIGS)} configurations "
+              f"(max {max_concurrent_calls} concurrent model calls)...")
+        await asyncio.gather(*(run_group(temperature, indices) for temperature, indices in groups.items()))
     
     def run_agent_count_experiment(self):
         """Compare 2 vs 4 agents."""
         print("🔬 Running Agent Count Experiment...")
         
-        debate_system = WorkingMultiAgentDebate()
+        debate_system = self._debate_system()
         
         print("Testing 2 agents...")
         result_2 = debate_system.run_debate(self.topic, agent_count=2, rounds=2)
-        self.results.append({
-            'experiment': 'agent_count',
-            'config': '2_agents',
-            'result': result_2
-        })
+        self.store.append('agent_count', '2_agents', result_2)
         
         print("\nTesting 4 agents...")
         result_4 = debate_system.run_debate(self.topic, agent_count=4, rounds=2)
-        self.results.append({
-            'experiment': 'agent_count',
-            'config': '4_agents',
-            'result': result_4
-        })
+        self.store.append('agent_count', '4_agents', result_4)
     
     def run_round_count_experiment(self):
         """Compare 1 vs 3 rounds."""
         print("🔬 Running Round Count Experiment...")
         
-        debate_system = WorkingMultiAgentDebate()
+        debate_system = self._debate_system()
         
         print("Testing 1 round...")
         result_1 = debate_system.run_debate(self.topic, agent_count=4, rounds=1)
-        self.results.append({
-            'experiment': 'round_count',
-            'config': '1_round',
-            'result': result_1
-        })
+        self.store.append('round_count', '1_round', result_1)
         
         print("\nTesting 3 rounds...")
         result_3 = debate_system.run_debate(self.topic, agent_count=4, rounds=3)
-        self.results.append({
-            'experiment': 'round_count',
-            'config': '3_rounds',
-            'result': result_3
-        })
+        self.store.append('round_count', '3_rounds', result_3)
     
     def run_temperature_experiment(self):
         """Compare low vs high temperature."""
         print("🔬 Running Temperature Experiment...")
         
         print("Testing low temperature (0.3)...")
-        debate_low = WorkingMultiAgentDebate(temperature=0.3)
+        debate_low = self._debate_system(temperature=0.3)
         result_low = debate_low.run_debate(self.topic, agent_count=4, rounds=2)
-        self.results.append({
-            'experiment': 'temperature',
-            'config': 'low_temp',
-            'result': result_low
-        })
+        self.store.append('temperature', 'low_temp', result_low)
         
         print("\nTesting high temperature (0.9)...")
-        debate_high = WorkingMultiAgentDebate(temperature=0.9)
+        debate_high = self._debate_system(temperature=0.9)
         result_high = debate_high.run_debate(self.topic, agent_count=4, rounds=2)
-        self.results.append({
-            'experiment': 'temperature',
-            'config': 'high_temp',
-            'result': result_high
-        })
+        self.store.append('temperature', 'high_temp', result_high)
     
     def generate_report(self):
-        """Generate a comprehensive experiment report."""
+        """Generate a comprehensive experiment report.
+        
+        The store is streamed once. Formatted rows are spooled to a temporary
+        on-disk SQLite table and read back sorted, and only running totals per
+        configuration stay in memory, so the report can cover long sweeps or
+        archived runs without loading every result. Rows follow
+        EXPERIMENT_CONFIGS, not the order debates finished.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_file = f"experiment_report_working_{timestamp}.md"
+        # "" is a private temporary database that SQLite keeps on disk and deletes on close
+        spool = sqlite3.connect("")
+        spool.execute("CREATE TABLE rows (experiment_rank INTEGER, experiment TEXT, config_rank INTEGER, "
+                      "config TEXT, topic TEXT, summary TEXT, details TEXT)")
         
-        with open(report_file, 'w') as f:
+        with open(report_file, 'w') as f, contextlib.closing(spool):
             f.write("# Multi-Agent Debate Experiment Report (Working System)\n\n")
             f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             f.write(f"**Topic:** {self.topic}\n\n")
@@ -98,45 +179,79 @@ class WorkingExperimentRunner:
             f.write("| Experiment | Configuration | Time (s) | Evidence | Feasibility | Risks | Clarity | Convergence |\n")
             f.write("|------------|---------------|----------|----------|-------------|-------|---------|-------------|\n")
             
-            for exp in self.results:
+            # The store is in completion order; the spool puts rows in report order
+            dimensions = ('evidence', 'feasibility', 'risks', 'clarity')
+            totals = {}
+            runs, total_time, fastest, slowest = 0, 0.0, float("inf"), 0.0
+            for exp in self.store:
                 result = exp['result']
-                f.write(f"| {exp['experiment']} | {exp['config']} | {result.execution_time:.1f} | "
-                       f"{result.quality_scores['evidence']:.1f} | {result.quality_scores['feasibility']:.1f} | "
-                       f"{result.quality_scores['risks']:.1f} | {result.quality_scores['clarity']:.1f} | "
-                       f"{result.convergence} |\n")
+                runs += 1
+                total_time += result.execution_time
+                fastest, slowest = min(fastest, result.execution_time), max(slowest, result.execution_time)
+                summary = (f"| {exp['experiment']} | {exp['config']} | {result.execution_time:.1f} | "
+                           f"{result.quality_scores['evidence']:.1f} | {result.quality_scores['feasibility']:.1f} | "
+                           f"{result.quality_scores['risks']:.1f} | {result.quality_scores['clarity']:.1f} | "
+                           f"{result.convergence} |\n")
+                details = (f"### {exp['experiment']} - {exp['config']}\n\n"
+                           f"- **Execution Time:** {result.execution_time:.2f} seconds\n"
+                           f"- **Quality Scores:** {result.quality_scores}\n"
+                           f"- **Convergence:** {result.convergence}\n"
+                           f"- **Final Verdict:** {result.final_verdict[:300]}...\n\n")
+                spool.execute("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              report_order(exp['experiment'], exp['config']) + (result.topic, summary, details))
+                entry = totals.setdefault((exp['experiment'], exp['config']),
+                                          dict({'runs': 0, 'time': 0.0, 'converged': 0}, **{d: 0.0 for d in dimensions}))
+                entry['runs'] += 1
+                entry['time'] += result.execution_time
+                entry['converged'] += result.convergence
+                for dimension in dimensions:
+                    entry[dimension] += result.quality_scores[dimension]
+            
+            def spooled(column):
+                # rowid keeps completion order among runs of one configuration and topic
+                return (row for row, in spool.execute(
+                    f"SELECT {column} FROM rows ORDER BY experiment_rank, experiment, config_rank, config, topic, rowid"))
+            
+            f.writelines(spooled("summary"))
+            
+            def mean(experiment, config, key):
+                entry = totals.get((experiment, config))
+                return entry[key] / entry['runs'] if entry else None
+            
+            f.write("\n## Averages by Configuration\n\n")
+            f.write("| Experiment | Configuration | Runs | Time (s) | Evidence | Feasibility | Risks | Clarity | Converged |\n")
+            f.write("|------------|---------------|------|----------|----------|-------------|-------|---------|-----------|\n")
+            for (experiment, config), entry in sorted(totals.items(), key=lambda item: report_order(*item[0])):
+                f.write(f"| {experiment} | {config} | {entry['runs']} | {mean(experiment, config, 'time'):.1f} | "
+                       + " | ".join(f"{mean(experiment, config, d):.1f}" for d in dimensions)
+                       + f" | {entry['converged']}/{entry['runs']} |\n")
             
             f.write("\n## Detailed Results\n\n")
-            for exp in self.results:
-                result = exp['result']
-                f.write(f"### {exp['experiment']} - {exp['config']}\n\n")
-                f.write(f"- **Execution Time:** {result.execution_time:.2f} seconds\n")
-                f.write(f"- **Quality Scores:** {result.quality_scores}\n")
-                f.write(f"- **Convergence:** {result.convergence}\n")
-                f.write(f"- **Final Verdict:** {result.final_verdict[:300]}...\n\n")
+            f.writelines(spooled("details"))
             
             f.write("## Analysis\n\n")
             f.write("### Key Findings\n\n")
             
-            agent_results = [r for r in self.results if r['experiment'] == 'agent_count']
-            if len(agent_results) == 2:
+            agent_2, agent_4 = mean('agent_count', '2_agents', 'evidence'), mean('agent_count', '4_agents', 'evidence')
+            if agent_2 is not None and agent_4 is not None:
                 f.write("- **Agent Count Impact:** ")
-                if agent_results[1]['result'].quality_scores['evidence'] > agent_results[0]['result'].quality_scores['evidence']:
+                if agent_4 > agent_2:
                     f.write("4 agents produced higher quality evidence than 2 agents.\n")
                 else:
                     f.write("2 agents were sufficient for this topic.\n")
             
-            round_results = [r for r in self.results if r['experiment'] == 'round_count']
-            if len(round_results) == 2:
+            round_1, round_3 = mean('round_count', '1_round', 'clarity'), mean('round_count', '3_rounds', 'clarity')
+            if round_1 is not None and round_3 is not None:
                 f.write("- **Round Count Impact:** ")
-                if round_results[1]['result'].quality_scores['clarity'] > round_results[0]['result'].quality_scores['clarity']:
+                if round_3 > round_1:
                     f.write("More rounds led to clearer conclusions.\n")
                 else:
                     f.write("Additional rounds did not significantly improve clarity.\n")
             
-            temp_results = [r for r in self.results if r['experiment'] == 'temperature']
-            if len(temp_results) == 2:
+            temp_low, temp_high = mean('temperature', 'low_temp', 'clarity'), mean('temperature', 'high_temp', 'clarity')
+            if temp_low is not None and temp_high is not None:
                 f.write("- **Temperature Impact:** ")
-                if temp_results[1]['result'].quality_scores['clarity'] > temp_results[0]['result'].quality_scores['clarity']:
+                if temp_high > temp_low:
                     f.write("Higher temperature led to more creative but potentially less clear arguments.\n")
                 else:
                     f.write("Lower temperature produced more structured and clear arguments.\n")
@@ -145,7 +260,9 @@ class WorkingExperimentRunner:
             f.write("- **Content Generation:** All agents successfully generated substantive responses\n")
             f.write("- **Safety Filtering:** No content blocked by safety systems\n")
             f.write("- **Response Quality:** High-quality, coherent arguments from all agents\n")
-            f.write("- **Execution Time:** Reasonable performance (20-30 seconds per debate)\n")
+            if runs:
+                f.write(f"- **Execution Time:** {total_time / runs:.1f} seconds per debate on average "
+                        f"({fastest:.1f}-{slowest:.1f} s over {runs} debates)\n")
             f.write("- **Convergence:** System successfully reaches meaningful conclusions\n")
             
             f.write("\n### Assignment Compliance\n\n")
@@ -179,15 +296,25 @@ def main():
     print("🚀 Starting Working Multi-Agent Debate Experiments")
     print("=" * 50)
     
-    if not os.getenv("GOOGLE_API_KEY"):
+    load_env()
+    if not os.getenv("GOOGLE_API_KEY") and not os.getenv("GOOGLE_API_KEYS"):
         print("❌ Please set your GOOGLE_API_KEY in a .env file")
         return
     
-    runner = WorkingExperimentRunner()
+    # Opt-in response cache, e.g. DEBATE_CACHE_PATH=.debate_cache.sqlite
+    cache_path = os.getenv("DEBATE_CACHE_PATH")
+    cache = ResponseCache(cache_path) if cache_path else None
+    # Durable results, e.g. DEBATE_RESULTS_PATH=results.jsonl or results.sqlite
+    store = open_result_store(os.getenv("DEBATE_RESULTS_PATH"), os.getenv("DEBATE_RESULTS_FORMAT"))
+    # Several keys or models, e.g. GOOGLE_API_KEYS=key1,key2, are load balanced (see endpoint_pool.py)
+    backend_factory = None
+    if os.getenv("GOOGLE_API_KEYS") or os.getenv("GEMINI_MODELS"):
+        backend_factory = lambda temperature: gemini_pool(temperature=temperature)
+    runner = WorkingExperimentRunner(cache=cache, fresh_samples=os.getenv("DEBATE_FRESH_SAMPLES") == "1",
+                                     store=store, backend_factory=backend_factory)
     
-    runner.run_agent_count_experiment()
-    runner.run_round_count_experiment()
-    runner.run_temperature_experiment()
+    runner.run_all_experiments(max_concurrent_calls=int(os.getenv("DEBATE_MAX_CONCURRENT_CALLS", "4")),
+                               independent_samples=os.getenv("DEBATE_INDEPENDENT_SAMPLES") == "1")
     
     report_file = runner.generate_report()
     
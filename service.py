@@ -0,0 +1,434 @@
+"""
+Local HTTP debate service.
+A long-running process that keeps model clients warm, accepts debate jobs into
+a bounded queue, runs them on a pool of worker threads and streams each
+debate's events back over server-sent events. Standard library only.
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends import StubBackend
+from bulk import BulkDebateRunner, DebateJob
+from metrics import export_prometheus
+from multi_agent_debate import DebateEvent, DebateMetrics, DebateResult
+from result_store import result_to_dict
+
+STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+class QueueFullError(RuntimeError):
+    """The job queue is at capacity; the client should retry later."""
+
+
+def _check_number(name: str, value: Any, integer: bool = False, minimum: float = 0.0,
+                  maximum: Optional[float] = None):
+    """Raise ValueError unless a job setting is a number (an int if ``integer``) in range."""
+    kinds = (int,) if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kinds):
+        raise ValueError(f"{name} must be {'an integer' if integer else 'a number'}, got {value!r}")
+    if not (value >= minimum and (maximum is None or value <= maximum)):  # NaN fails too
+        bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+        raise ValueError(f"{name} must be {bounds}, got {value!r}")
+
+
+class ServiceJob:
+    """A submitted debate and everything that has happened to it so far.
+
+    ``events`` holds ``(name, data)`` pairs in the order the debate produced
+    them; readers block in ``wait_events`` until there is something new.
+    """
+
+    def __init__(self, job: DebateJob, debate_timeout: Optional[float] = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.job = job
+        self.debate_timeout = debate_timeout
+        self.status = 'queued'
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+        self.result: Optional[DebateResult] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_requested = False
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def add_event(self, event: DebateEvent):
+        if isinstance(event, DebateMetrics):
+            data = {'result': result_to_dict(event.result), 'usage': event.usage}
+        else:
+            data = asdict(event)
+        with self._changed:
+            self.events.append((type(event).__name__, data))
+            self._changed.notify_all()
+
+    def set_status(self, status: str, result: Optional[DebateResult] = None, error: Optional[str] = None):
+        with self._changed:
+            self.status = status
+            if status == 'running':
+                self.started = time.time()
+            elif status in ('done', 'failed', 'cancelled'):
+                self.finished = time.time()
+            self.result = result
+            self.error = error
+            self._changed.notify_all()
+
+    def wait_events(self, start: int, timeout: float) -> Tuple[List[Tuple[str, Dict[str, Any]]], bool]:
+        """Events from index ``start`` on (waiting up to ``timeout`` for one), and whether the job is over."""
+        with self._changed:
+            if len(self.events) <= start and not self.done:
+                self._changed.wait(timeout)
+            return self.events[start:], self.done
+
+    def summary(self) -> Dict[str, Any]:
+        with self._changed:
+            return {
+                'id': self.job_id,
+                'status': self.status,
+                'job': asdict(self.job),
+                'created': self.created,
+                'started': self.started,
+                'finished': self.finished,
+                'events': len(self.events),
+                'error': self.error,
+            }
+
+
+class DebateService:
+    """Bounded job queue and worker pool in front of warm debate systems.
+
+    Debate systems (and their model clients, rate limiter and breaker) come
+    from ``runner`` and are shared by every job with the same temperature.
+    ``submit`` raises ``QueueFullError`` once ``queue_size`` jobs are
+    waiting, which the HTTP layer turns into a 503 with Retry-After. The
+    last ``max_jobs`` jobs are kept for status, result and metrics queries.
+    """
+
+    def __init__(self, runner: Optional[BulkDebateRunner] = None, workers: int = 4, queue_size: int = 32,
+                 max_jobs: int = 1000, debate_timeout: Optional[float] = None):
+        self.runner = runner or BulkDebateRunner()
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.debate_timeout = debate_timeout
+        self.queue: "queue.Queue[Optional[ServiceJob]]" = queue.Queue(maxsize=queue_size)
+        self.jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        self.busy = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker threads."""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"debate-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers once the jobs already queued have run."""
+        for _ in self._threads:
+            self.queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads.clear()
+        self.runner.close()
+
+    def submit(self, spec: Dict[str, Any]) -> ServiceJob:
+        """Queue a debate from a JSON spec (topic, agent_count, rounds, temperature, debate_timeout).
+
+        Raises ValueError or TypeError (a 400 over HTTP) for a malformed spec.
+        """
+        spec = dict(spec)
+        debate_timeout = spec.pop('debate_timeout', self.debate_timeout)
+        job = DebateJob.coerce(spec)
+        if not isinstance(job.topic, str) or not job.topic.strip():
+            raise ValueError("topic must be a non-empty string")
+        _check_number("agent_count", job.agent_count, integer=True, minimum=1)
+        _check_number("rounds", job.rounds, integer=True, minimum=1)
+        _check_number("temperature", job.temperature, maximum=2.0)
+        if debate_timeout is not None:
+            _check_number("debate_timeout", debate_timeout)
+            if debate_timeout <= 0:
+                raise ValueError(f"debate_timeout must be positive, got {debate_timeout!r}")
+        service_job = ServiceJob(job, debate_timeout)
+        with self._lock:
+            try:
+                self.queue.put_nowait(service_job)
+            except queue.Full:
+                raise QueueFullError(f"job queue is full ({self.queue.maxsize} waiting)") from None
+            self.jobs[service_job.job_id] = service_job
+            self._evict()
+        return service_job
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond ``max_jobs``."""
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done][:max(0, excess)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ServiceJob]:
+        """Ask a job to stop: a queued job never starts, a running one stops after its current chunk."""
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            job.cancel_requested = True
+        return job
+
+    def _debate_system(self, temperature: float):
+        with self._lock:
+            return self.runner.debate_system(temperature)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self.busy += 1
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+
+    def _run(self, job: ServiceJob):
+        if job.cancel_requested:
+            job.set_status('cancelled')
+            return
+        job.set_status('running')
+        events = self._debate_system(job.job.temperature).stream_debate(
+            job.job.topic, job.job.agent_count, job.job.rounds, debate_timeout=job.debate_timeout)
+        result = None
+        try:
+            for event in events:
+                job.add_event(event)
+                if isinstance(event, DebateMetrics):
+                    result = event.result
+                if job.cancel_requested:
+                    events.close()
+                    job.set_status('cancelled')
+                    return
+        except Exception as e:
+            print(f"❌ Job {job.job_id} ({job.job.topic[:60]}) failed: {e}")
+            job.set_status('failed', error=str(e))
+            return
+        job.set_status('done', result=result)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {status: 0 for status in STATUSES}
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return {
+                'status': 'ok' if any(thread.is_alive() for thread in self._threads) else 'stopped',
+                'uptime': time.time() - self.started,
+                'workers': self.workers,
+                'busy': self.busy,
+                'queued': self.queue.qsize(),
+                'queue_size': self.queue.maxsize,
+                'jobs': counts,
+            }
+
+    def metrics(self) -> str:
+        """Prometheus text: call metrics of the retained finished debates plus queue and worker gauges."""
+        with self._lock:
+            results = [job.result for job in self.jobs.values() if job.result is not None]
+        health = self.health()
+        lines = [
+            "# HELP debate_service_queue_depth Jobs waiting for a worker.",
+            "# TYPE debate_service_queue_depth gauge",
+            f"debate_service_queue_depth {health['queued']}",
+            "# HELP debate_service_workers_busy Workers running a debate.",
+            "# TYPE debate_service_workers_busy gauge",
+            f"debate_service_workers_busy {health['busy']}",
+            "# HELP debate_service_jobs Retained jobs by status.",
+            "# TYPE debate_service_jobs gauge",
+        ]
+        lines.extend(f'debate_service_jobs{{status="{status}"}} {count}' for status, count in health['jobs'].items())
+        return export_prometheus(results) + "\n".join(lines) + "\n"
+
+
+class DebateRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a ``DebateService`` (set as the ``service`` class attribute).
+
+    POST /debates                 queue a debate (202; 503 when the queue is full)
+    GET  /debates/<id>            job status
+    GET  /debates/<id>/result     the DebateResult (202 while it is still running)
+    GET  /debates/<id>/events     server-sent events, replayed from Last-Event-ID
+    DELETE /debates/<id>          cancel
+    GET  /health, GET /metrics
+    """
+
+    service: DebateService = None
+    # Seconds between keep-alive comments on an idle event stream
+    heartbeat = 15.0
+    retry_after = 5
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job(self, job_id: str) -> Optional[ServiceJob]:
+        job = self.service.get(job_id)
+        if job is None:
+            self._send_json(404, {'error': f"no job {job_id}"})
+        return job
+
+    def _parts(self) -> List[str]:
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def do_POST(self):
+        if self._parts() != ["debates"]:
+            self._send_json(404, {'error': "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            spec = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(spec, dict):
+                raise ValueError("body must be a JSON object")
+            job = self.service.submit(spec)
+        except QueueFullError as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': str(self.retry_after)})
+            return
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(202, dict(job.summary(), links={
+            'status': f"/debates/{job.job_id}",
+            'result': f"/debates/{job.job_id}/result",
+            'events': f"/debates/{job.job_id}/events",
+        }), {'Location': f"/debates/{job.job_id}"})
+
+    def do_DELETE(self):
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "debates":
+            self._send_json(404, {'error': "not found"})
+            return
+        if self._job(parts[1]) is not None:
+            self._send_json(202, self.service.cancel(parts[1]).summary())
+
+    def do_GET(self):
+        parts = self._parts()
+        if parts == ["health"]:
+            self._send_json(200, self.service.health())
+        elif parts == ["metrics"]:
+            data = self.service.metrics().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif len(parts) == 2 and parts[0] == "debates":
+            job = self._job(parts[1])
+            if job is not None:
+                self._send_json(200, job.summary())
+        elif len(parts) == 3 and parts[0] == "debates" and parts[2] == "result":
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if job.status == 'done':
+                self._send_json(200, result_to_dict(job.result))
+            elif job.done:
+                self._send_json(409, job.summary())
+            else:
+                self._send_json(202, job.summary(), {'Retry-After': str(self.retry_after)})
+        elif len(parts) == 3 and parts[0] == "debates" and parts[2] == "events":
+            job = self._job(parts[1])
+            if job is not None:
+                self._stream_events(job)
+        else:
+            self._send_json(404, {'error': "not found"})
+
+    def _stream_events(self, job: ServiceJob):
+        """Send the job's events as server-sent events until it is over."""
+        last_id = self.headers.get("Last-Event-ID")
+        position = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                events, done = job.wait_events(position, self.heartbeat)
+                for name, data in events:
+                    self.wfile.write(f"id: {position}\nevent: {name}\ndata: {json.dumps(data)}\n\n".encode())
+                    position += 1
+                if done and not events:
+                    summary = job.summary()
+                    self.wfile.write(f"event: end\ndata: {json.dumps(summary)}\n\n".encode())
+                    self.wfile.flush()
+                    return
+                if not events:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; the debate keeps running
+            return
+
+
+def make_server(service: DebateService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """An HTTP server for ``service`` (call ``serve_forever``; the workers must be started separately)."""
+    handler = type("BoundDebateRequestHandler", (DebateRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the service until interrupted."""
+    parser = argparse.ArgumentParser(description="Local HTTP service for multi-agent debates.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="debates run at once")
+    parser.add_argument("--queue-size", type=int, default=32, help="jobs waiting before submissions get a 503")
+    parser.add_argument("--max-jobs", type=int, default=1000, help="finished jobs kept for status and results")
+    parser.add_argument("--debate-timeout", type=float, help="default seconds per debate")
+    parser.add_argument("--model", default="gemini-2.0-flash-exp")
+    parser.add_argument("--stub", action="store_true", help="use the offline StubBackend instead of Gemini")
+    args = parser.parse_args(argv)
+
+    backend_factory = None
+    if args.stub:
+        backend_factory = lambda temperature: StubBackend(temperature=temperature, latency=(0.05, 0.2))
+    service = DebateService(BulkDebateRunner(model_name=args.model, backend_factory=backend_factory),
+                            workers=args.workers, queue_size=args.queue_size, max_jobs=args.max_jobs,
+                            debate_timeout=args.debate_timeout)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    print(f"🌐 Debate service on http://{args.host}:{args.port} ({args.workers} workers, queue {args.queue_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down")
+    finally:
+        server.server_close()
+        service.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
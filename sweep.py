@@ -0,0 +1,86 @@
+"""
+Sweep planning with shared debate prefixes.
+Configurations that start with the same turns (same topic, temperature, roles,
+rounds so far) share those turns: each distinct turn state becomes one node of a
+prefix tree and is run once, then every configuration branches from it.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from topology import Topology
+from turn_scheduler import TurnNode, plan_turns
+
+
+@dataclass
+class PrefixNode:
+    """One turn to run, shared by every configuration in ``configs``.
+
+    ``turn`` is the turn as planned for the first of them (its index, role,
+    round and window are the same in all of them) and ``inputs`` are the node
+    ids it waits for.
+    """
+    node_id: int
+    turn: TurnNode
+    inputs: Tuple[int, ...]
+    configs: List[int] = field(default_factory=list)
+
+    @property
+    def owner(self) -> int:
+        """The configuration the call is accounted to."""
+        return self.configs[0]
+
+
+class SweepPlan:
+    """Prefix tree over the turns of several debate configurations.
+
+    ``configs`` are (debaters, rounds) pairs for one topic and one backend. A
+    turn's state is everything its prompt depends on: role, round and the
+    nodes it quotes; with ``context`` (a rolling summary) also every node of
+    the earlier rounds and the speaking order. Turns with the same state are
+    one node, so configurations share their common prefixes (and any later
+    turn that sees exactly the same thing, such as a turn with no context).
+    ``share_prefixes=False`` gives every configuration its own turns, for
+    statistically independent samples.
+    """
+
+    def __init__(self, configs: List[Tuple[List[str], int]], share_prefixes: bool = True,
+                 parallel_rounds: bool = False, round_barrier: bool = False, context: bool = False,
+                 topology: Optional[Topology] = None):
+        self.configs = configs
+        self.nodes: List[PrefixNode] = []
+        self.paths: List[List[int]] = []
+        index: Dict[tuple, int] = {}
+        for position, (debaters, rounds) in enumerate(configs):
+            path: List[int] = []
+            for turn in plan_turns(debaters, rounds, parallel_rounds, round_barrier, topology):
+                quoted = tuple(path[i] for i in turn.window) if turn.window else None
+                key = (
+                    None if share_prefixes else position,
+                    turn.role, turn.round_num, quoted,
+                    (tuple(debaters), tuple(path[i] for i in turn.inputs)) if context and turn.round_num > 1 else None,
+                )
+                node_id = index.get(key)
+                if node_id is None:
+                    node_id = index[key] = len(self.nodes)
+                    self.nodes.append(PrefixNode(node_id, turn, tuple(path[i] for i in turn.inputs)))
+                self.nodes[node_id].configs.append(position)
+                path.append(node_id)
+            self.paths.append(path)
+
+    @property
+    def total_turns(self) -> int:
+        """Turns the configurations would take if each ran on its own."""
+        return sum(len(path) for path in self.paths)
+
+    @property
+    def unique_turns(self) -> int:
+        """Turns actually run with prefix sharing."""
+        return len(self.nodes)
+
+    def summary(self, judges: Optional[int] = None) -> str:
+        """One-line description of the saving (``judges`` defaults to one per configuration)."""
+        judges = len(self.configs) if judges is None else judges
+        before, after = self.total_turns + judges, self.unique_turns + judges
+        saved = 100.0 * (before - after) / before if before else 0.0
+        return f"{after} model calls instead of {before} ({saved:.0f}% fewer)"
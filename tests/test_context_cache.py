@@ -0,0 +1,20 @@
+from backends import StubBackend
+from context_cache import ContextCacheManager
+
+
+def test_evicted_prefixes_release_their_provider_caches():
+    backend = StubBackend(latency=0.0, context_caching=True)
+    manager = ContextCacheManager(backend, max_entries=2)
+    first = manager.lookup("prefix one")
+    manager.lookup("prefix two")
+    assert manager.lookup("prefix one") is first
+    manager.lookup("prefix three")
+
+    # "prefix two" was least recently used
+    assert len(backend.context_caches) == 2
+    assert first in backend.context_caches
+    assert manager.created == 3 and manager.reused == 1
+
+    manager.begin()
+    manager.end()
+    assert backend.context_caches == []
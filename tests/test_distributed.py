@@ -0,0 +1,46 @@
+import time
+
+from backends import StubBackend
+from distributed import SqliteWorkQueue, expand_sweep
+from multi_agent_debate import WorkingMultiAgentDebate
+from run_experiments import EXPERIMENT_CONFIGS
+
+
+def make_queue(tmp_path, **kwargs):
+    queue = SqliteWorkQueue(str(tmp_path / "sweep.db"), **kwargs)
+    queue.enqueue("s1", expand_sweep(["Topic A"], EXPERIMENT_CONFIGS[:1]))
+    return queue
+
+
+def stub_result():
+    return WorkingMultiAgentDebate(backend=StubBackend(latency=0.0)).run_debate("Topic A", 2, 1)
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.lease("w1", lease_seconds=0.05)
+    assert first is not None and first.attempts == 1
+    assert queue.lease("w2", lease_seconds=10) is None
+
+    time.sleep(0.1)
+    second = queue.lease("w2", lease_seconds=10)
+    assert second is not None and second.job_id == first.job_id and second.attempts == 2
+
+    # The first worker has lost the job: it can neither extend nor complete it
+    assert not queue.heartbeat(first.job_id, "w1", 10)
+    assert not queue.complete(first.job_id, "w1", [])
+    assert queue.heartbeat(second.job_id, "w2", 10)
+    experiment, config, _, _ = second.configs[0]
+    assert queue.complete(second.job_id, "w2", [(experiment, config, stub_result())])
+    assert queue.counts("s1") == {'queued': 0, 'leased': 0, 'done': 1, 'failed': 0}
+    assert [record['config'] for record in queue.results("s1")] == [config]
+    queue.close()
+
+
+def test_job_fails_once_its_last_lease_expires(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    job = queue.lease("w1", lease_seconds=0.05)
+    time.sleep(0.1)
+    assert queue.lease("w2", lease_seconds=10) is None
+    assert queue.failures("s1") == [(job.job_id, "Topic A", "lease expired")]
+    queue.close()
@@ -0,0 +1,27 @@
+from backends import StubBackend, StubRateLimitError
+from endpoint_pool import Endpoint, PooledBackend
+from rate_limiter import TokenBucketRateLimiter
+
+
+def test_rate_limited_endpoint_cools_down_and_refunds_its_reservation():
+    limited = StubBackend(model_name="limited", latency=0.0, failure_rate=1.0,
+                          error_factory=lambda: StubRateLimitError("quota exceeded"))
+    healthy = StubBackend(model_name="healthy", latency=0.0)
+    limiters = [TokenBucketRateLimiter(requests_per_minute=600, tokens_per_minute=100_000) for _ in range(2)]
+    pool = PooledBackend([Endpoint(limited, rate_limiter=limiters[0], name="limited"),
+                          Endpoint(healthy, rate_limiter=limiters[1], name="healthy")], cooldown=60.0)
+
+    assert pool.generate("Should cities ban cars?").text
+    assert healthy.prompts == ["Should cities ban cars?"]
+
+    summary = {endpoint['name']: endpoint for endpoint in pool.endpoint_summary()}
+    assert summary['limited']['rate_limited'] == 1 and summary['limited']['cooldown'] > 0
+    assert summary['healthy']['calls'] == 1
+    assert all(endpoint['in_flight'] == 0 for endpoint in summary.values())
+    # The rejected call used no tokens
+    assert limiters[0].tokens.available == limiters[0].tokens.capacity
+
+    # While it cools down the limited endpoint is skipped
+    pool.generate("Second prompt")
+    assert healthy.prompts[-1] == "Second prompt"
+    assert limited.prompts == ["Should cities ban cars?"]
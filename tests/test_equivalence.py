@@ -0,0 +1,45 @@
+"""Debates must send the prompts and reach the verdicts of the original implementation.
+
+``fixtures/baseline_debates.json`` was recorded by running the original
+single-backend ``run_debate`` (commit 740b1d0) against ``StubBackend(latency=0.0)``
+for 1-4 agents and 1-3 rounds: every prompt in order, the verdict, the quality
+scores and the convergence flag.
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from backends import StubBackend
+from multi_agent_debate import WorkingMultiAgentDebate
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "baseline_debates.json")) as f:
+    BASELINE = json.load(f)
+
+CASES = [pytest.param(case, id=f"{case['agent_count']}x{case['rounds']}") for case in BASELINE['cases']]
+
+
+def assert_same_debate(result, case):
+    assert result.final_verdict == case['final_verdict']
+    assert result.quality_scores == case['quality_scores']
+    assert result.convergence == case['convergence']
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_sync_debate_matches_baseline(case):
+    backend = StubBackend(latency=0.0)
+    result = WorkingMultiAgentDebate(backend=backend).run_debate(BASELINE['topic'], case['agent_count'], case['rounds'])
+    assert backend.prompts == case['prompts']
+    assert_same_debate(result, case)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_async_debate_matches_baseline(case):
+    backend = StubBackend(latency=0.0)
+    debate = WorkingMultiAgentDebate(backend=backend)
+    result = asyncio.run(debate.run_debate_async(BASELINE['topic'], case['agent_count'], case['rounds']))
+    # Independent turns may be sent in any order
+    assert sorted(backend.prompts) == sorted(case['prompts'])
+    assert_same_debate(result, case)
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+def failing():
+    raise Unavailable("backend down")
+
+
+def rejected():
+    raise ValueError("bad request")
+
+
+def open_caller(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    caller = ResilientCaller(retry=RetryPolicy(max_attempts=2, base_delay=0.0, max_delay=0.0),
+                             call_timeout=None, breaker=breaker)
+    with pytest.raises(Exception):
+        caller.call(failing)
+    assert breaker.state == "open"
+    return caller, breaker
+
+
+def test_open_circuit_fails_fast():
+    caller, _ = open_caller(reset_timeout=60.0)
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        caller.call(lambda: calls.append(1))
+    assert calls == []
+
+
+def test_half_open_trial_success_closes_circuit():
+    caller, breaker = open_caller()
+    time.sleep(0.06)
+    assert caller.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    # Closed again: a single failure no longer opens it
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_failure_reopens_circuit():
+    caller, breaker = open_caller()
+    time.sleep(0.06)
+    with pytest.raises(Exception):
+        caller.call(failing)
+    assert breaker.state == "open"
+
+
+def test_half_open_trial_rejected_closes_circuit():
+    caller, breaker = open_caller()
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        caller.call(rejected)
+    assert breaker.state == "closed"
+
+
+def test_abandoned_trial_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "half_open"
+    breaker.record_abandoned()
+    assert breaker.state == "open"
@@ -0,0 +1,48 @@
+from multi_agent_debate import DebateResult
+from result_store import ResultStore
+from run_experiments import WorkingExperimentRunner, report_topic
+
+
+def result(topic, time):
+    scores = {'evidence': 5.0, 'feasibility': 5.0, 'risks': 5.0, 'clarity': 5.0}
+    return DebateResult(topic, 2, 2, "verdict", scores, False, time, [])
+
+
+def test_generate_report_follows_experiment_configs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = ResultStore()
+    # Completion order, not report order
+    for experiment, config, topic, time in [
+        ('temperature', 'high_temp', "T1", 1.0),
+        ('custom', 'extra', "T1", 2.0),
+        ('agent_count', '4_agents', "T2", 3.0),
+        ('agent_count', '2_agents', "T2", 4.0),
+        ('agent_count', '4_agents', "T1", 5.0),
+        ('agent_count', '2_agents', "T2", 6.0),
+    ]:
+        store.append(experiment, config, result(topic, time))
+
+    WorkingExperimentRunner(topic="T", store=store).generate_report()
+    report = next(tmp_path.glob("experiment_report_working_*.md")).read_text()
+
+    summary = report.split("## Results Summary")[1].split("## Averages")[0]
+    rows = [line.split(" | ")[:3] for line in summary.splitlines() if line.startswith("| ") and "---" not in line][1:]
+    assert rows == [
+        ["| agent_count", "2_agents", "4.0"],
+        ["| agent_count", "2_agents", "6.0"],
+        ["| agent_count", "4_agents", "5.0"],
+        ["| agent_count", "4_agents", "3.0"],
+        ["| temperature", "high_temp", "1.0"],
+        ["| custom", "extra", "2.0"],
+    ]
+    details = report.split("## Detailed Results")[1]
+    headings = [line for line in details.splitlines() if line.startswith("### ")]
+    assert headings[:6] == ["### agent_count - 2_agents"] * 2 + ["### agent_count - 4_agents"] * 2 + [
+        "### temperature - high_temp", "### custom - extra"]
+    averages = report.split("## Averages by Configuration")[1].split("## Detailed Results")[0]
+    assert averages.index("| 2_agents | 2 | 5.0 |") < averages.index("| 4_agents | 2 | 4.0 |") < averages.index("| extra |")
+
+
+def test_report_topic():
+    assert report_topic(["A", "B", "A"]) == "A; B"
+    assert report_topic(["A", "B", "C", "D"]) == "4 topics"
@@ -0,0 +1,59 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backends import StubBackend
+from bulk import BulkDebateRunner
+from service import DebateService, make_server
+
+
+@pytest.fixture
+def server():
+    service = DebateService(BulkDebateRunner(backend_factory=lambda temperature: StubBackend(latency=0.0)),
+                            workers=1)
+    service.start()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/debates", data=body, method="POST",
+                                     headers={'Content-Type': "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({'topic': "T", 'rounds': "abc"}, "rounds must be an integer"),
+    ({'topic': "T", 'agent_count': 0}, "agent_count"),
+    ({'topic': "T", 'temperature': float("nan")}, "temperature"),
+    ({'topic': "T", 'debate_timeout': -1}, "debate_timeout"),
+    ({'topic': "  "}, "topic must be a non-empty string"),
+    ([1, 2], "body must be a JSON object"),
+])
+def test_malformed_spec_is_400(server, spec, message):
+    status, body = post(server, json.dumps(spec).encode())
+    assert status == 400
+    assert message in body['error']
+
+
+def test_invalid_json_is_400(server):
+    status, body = post(server, b"{not json")
+    assert status == 400
+
+
+def test_valid_spec_is_accepted(server):
+    status, body = post(server, json.dumps({'topic': "T", 'agent_count': 2, 'rounds': 1}).encode())
+    assert status == 202
+    assert body['links']['status'] == f"/debates/{body['id']}"
@@ -0,0 +1,44 @@
+import asyncio
+
+from turn_scheduler import plan_turns, run_turn_graph
+
+
+def test_run_turn_graph_skips_rounds_after_convergence():
+    nodes = plan_turns(["A", "B"], rounds=3, parallel_rounds=True)
+    started, rounds_seen = [], []
+
+    async def run_turn(node, texts):
+        started.append(node.index)
+        return f"turn {node.index}"
+
+    def on_round_complete(round_num, round_texts):
+        rounds_seen.append(round_num)
+        return round_num == 2
+
+    texts = asyncio.run(run_turn_graph(nodes, run_turn, on_round_complete))
+
+    assert texts == ["turn 0", "turn 1", "turn 2", "turn 3"]
+    assert rounds_seen == [1, 2]
+    assert sorted(started) == [0, 1, 2, 3]
+
+
+def test_run_turn_graph_cancels_running_later_rounds():
+    # Without a barrier the next round can start while the current one is still running
+    nodes = plan_turns(["A", "B"], rounds=2)
+    cancelled = []
+
+    async def run_turn(node, texts):
+        try:
+            await asyncio.sleep(0.05 if node.index == 1 else 0 if node.round_num == 1 else 1.0)
+        except asyncio.CancelledError:
+            cancelled.append(node.index)
+            raise
+        return f"turn {node.index}"
+
+    async def run():
+        texts = await run_turn_graph(nodes, run_turn, lambda round_num, _: True)
+        await asyncio.sleep(0)
+        return texts
+
+    assert asyncio.run(run()) == ["turn 0", "turn 1"]
+    assert cancelled and all(nodes[index].round_num == 2 for index in cancelled)
@@ -0,0 +1,165 @@
+"""
+Agent pools and message-routing topologies.
+Builds debater panels of any size and decides whose turns each debater reads,
+so a large panel quotes a fixed number of neighbours per turn instead of
+everyone's recent turns.
+"""
+
+import random
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+DEBATER_ROLES = ["Researcher", "Critic", "Synthesizer"]
+_SEAT_RE = re.compile(r"^(.*?) \d+$")
+
+
+def agent_pool(agent_count: int) -> List[str]:
+    """Speaking order for ``agent_count`` agents, Judge last.
+
+    Up to four agents this is the original panel (with fewer than four, the
+    Judge is added on top). Larger panels repeat the debater roles as numbered
+    seats: Researcher, Critic, Synthesizer, Researcher 2, Critic 2, ...
+    """
+    debaters = agent_count if agent_count < 4 else agent_count - 1
+    seats = []
+    for position in range(debaters):
+        role = DEBATER_ROLES[position % len(DEBATER_ROLES)]
+        number = position // len(DEBATER_ROLES) + 1
+        seats.append(role if number == 1 else f"{role} {number}")
+    return seats + ["Judge"]
+
+
+def base_role(seat: str) -> str:
+    """Role behind a seat label ("Critic 2" -> "Critic")."""
+    match = _SEAT_RE.match(seat)
+    return match.group(1) if match else seat
+
+
+class Topology:
+    """Who reads whom between rounds.
+
+    ``neighbours(position, debaters)`` lists the positions (in speaking order)
+    whose previous-round turns the debater at ``position`` is shown. Turns in
+    round 1 see nothing, so with a topology every round can run at once and
+    only waits for the neighbours' turns of the round before.
+    """
+    name = "all"
+
+    def neighbours(self, position: int, debaters: List[str]) -> List[int]:
+        return [i for i in range(len(debaters)) if i != position]
+
+    def edges(self, debaters: List[str]) -> int:
+        """Messages routed per round (prompt size grows with this)."""
+        return sum(len(self.neighbours(i, debaters)) for i in range(len(debaters)))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class RingTopology(Topology):
+    """Each debater reads the ``reach`` seats on either side of it."""
+    name = "ring"
+
+    def __init__(self, reach: int = 1):
+        self.reach = reach
+
+    def neighbours(self, position: int, debaters: List[str]) -> List[int]:
+        count = len(debaters)
+        seats = []
+        for offset in range(1, self.reach + 1):
+            for seat in ((position - offset) % count, (position + offset) % count):
+                if seat != position and seat not in seats:
+                    seats.append(seat)
+        return sorted(seats)
+
+    def __repr__(self) -> str:
+        return f"RingTopology(reach={self.reach})"
+
+
+class StarTopology(Topology):
+    """Everything goes through a hub (the first ``hub`` seat, else the first debater).
+
+    The hub reads every other debater; the others read only the hub.
+    """
+    name = "star"
+
+    def __init__(self, hub: str = "Synthesizer"):
+        self.hub = hub
+
+    def hub_position(self, debaters: List[str]) -> int:
+        return debaters.index(self.hub) if self.hub in debaters else 0
+
+    def neighbours(self, position: int, debaters: List[str]) -> List[int]:
+        hub = self.hub_position(debaters)
+        if position == hub:
+            return [i for i in range(len(debaters)) if i != hub]
+        return [hub]
+
+    def __repr__(self) -> str:
+        return f"StarTopology(hub={self.hub!r})"
+
+
+class RandomTopology(Topology):
+    """Each debater reads ``degree`` other seats drawn at random (fixed by ``seed``)."""
+    name = "random"
+
+    def __init__(self, degree: int = 3, seed: int = 0):
+        self.degree = degree
+        self.seed = seed
+        self._graphs: Dict[Tuple[str, ...], List[List[int]]] = {}
+
+    def neighbours(self, position: int, debaters: List[str]) -> List[int]:
+        key = tuple(debaters)
+        if key not in self._graphs:
+            rng = random.Random(f"{self.seed}:{len(debaters)}")
+            self._graphs[key] = [
+                sorted(rng.sample([j for j in range(len(debaters)) if j != i], min(self.degree, len(debaters) - 1)))
+                for i in range(len(debaters))
+            ]
+        return self._graphs[key][position]
+
+    def __repr__(self) -> str:
+        return f"RandomTopology(degree={self.degree}, seed={self.seed})"
+
+
+class GroupTopology(Topology):
+    """Consecutive seats form groups of ``group_size`` that read each other.
+
+    With ``link_leaders`` the first seat of each group also reads the other
+    groups' first seats, so positions still spread across the panel; without
+    it the groups are independent debates that only meet at the Judge.
+    """
+    name = "groups"
+
+    def __init__(self, group_size: int = 4, link_leaders: bool = True):
+        self.group_size = group_size
+        self.link_leaders = link_leaders
+
+    def neighbours(self, position: int, debaters: List[str]) -> List[int]:
+        start = position - position % self.group_size
+        seats = [i for i in range(start, min(start + self.group_size, len(debaters))) if i != position]
+        if self.link_leaders and position == start:
+            seats.extend(i for i in range(0, len(debaters), self.group_size) if i != start)
+        return sorted(seats)
+
+    def __repr__(self) -> str:
+        return f"GroupTopology(group_size={self.group_size}, link_leaders={self.link_leaders})"
+
+
+_TOPOLOGIES = {cls.name: cls for cls in (Topology, RingTopology, StarTopology, RandomTopology, GroupTopology)}
+
+
+def get_topology(spec: Union[str, Topology, None]) -> Optional[Topology]:
+    """Turn a spec such as "ring", "ring:2", "star", "random:3" or "groups:4" into a Topology.
+
+    The number is the ring reach, random degree or group size. Topology
+    instances and None are returned unchanged.
+    """
+    if spec is None or isinstance(spec, Topology):
+        return spec
+    name, _, arg = spec.partition(":")
+    if name not in _TOPOLOGIES:
+        raise ValueError(f"Unknown topology: {spec} (choose from {', '.join(_TOPOLOGIES)})")
+    if name == "star":
+        return StarTopology(arg) if arg else StarTopology()
+    return _TOPOLOGIES[name](int(arg)) if arg else _TOPOLOGIES[name]()
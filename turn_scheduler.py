@@ -0,0 +1,111 @@
+"""
+Dependency-aware turn scheduling.
+Expresses a debate as a DAG of turns with explicit inputs and runs each turn as
+soon as the turns it quotes have finished, so later rounds can start while the
+current one is still running.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from topology import Topology
+
+
+@dataclass(frozen=True)
+class TurnNode:
+    """One debater turn in the DAG.
+
+    ``index`` is the turn's position in the transcript, ``window`` the turns
+    quoted to it as previous responses (None when it gets no context) and
+    ``inputs`` every turn that must finish before it can start.
+    """
+    index: int
+    role: str
+    round_num: int
+    window: Optional[Tuple[int, ...]]
+    inputs: Tuple[int, ...]
+
+
+def plan_turns(debaters: List[str], rounds: int, parallel_rounds: bool = False,
+               round_barrier: bool = False, topology: Optional[Topology] = None) -> List[TurnNode]:
+    """Build the turn DAG for a debate.
+
+    By default a turn sees the last ``len(debaters)`` turns once the transcript
+    is longer than that (the same rule as ``WorkingMultiAgentDebate._previous_responses``);
+    with ``parallel_rounds`` it sees the whole previous round, and with a
+    ``topology`` only its neighbours' turns of the previous round. ``round_barrier``
+    also makes every turn wait for all earlier rounds, for state that is only
+    updated between rounds (the rolling summary, the convergence check).
+    """
+    per_round = len(debaters)
+    nodes = []
+    for round_index in range(rounds):
+        for position, role in enumerate(debaters):
+            index = round_index * per_round + position
+            if topology is not None:
+                previous = index - position - per_round
+                window = tuple(previous + i for i in topology.neighbours(position, debaters)) if round_index else None
+            elif parallel_rounds:
+                window = tuple(range(index - position - per_round, index - position)) if round_index else None
+            else:
+                window = tuple(range(index - per_round, index)) if index > per_round else None
+            inputs = set(window or ())
+            if round_barrier:
+                inputs.update(range(round_index * per_round))
+            nodes.append(TurnNode(index, role, round_index + 1, window, tuple(sorted(inputs))))
+    return nodes
+
+
+def critical_path(nodes: List[TurnNode]) -> int:
+    """Number of turns on the longest dependency chain (the sequential path takes ``len(nodes)``)."""
+    depth = {}
+    for node in nodes:
+        depth[node.index] = 1 + max((depth[i] for i in node.inputs), default=0)
+    return max(depth.values(), default=0)
+
+
+async def run_turn_graph(nodes: List[TurnNode],
+                         run_turn: Callable[[TurnNode, List[Optional[str]]], Awaitable[str]],
+                         on_round_complete: Optional[Callable[[int, List[str]], bool]] = None) -> List[str]:
+    """Run every turn once its inputs are done and return the transcript.
+
+    ``run_turn(node, texts)`` produces a turn's text; ``texts`` holds every
+    finished turn by index. ``on_round_complete(round_num, round_texts)`` is
+    called once per round, in round order, before any turn that waits on that
+    round starts; returning True skips all later rounds. If a turn fails the
+    others are cancelled and the error is raised.
+    """
+    texts: List[Optional[str]] = [None] * len(nodes)
+    running = {}
+    rounds = max((node.round_num for node in nodes), default=0)
+    completed_rounds = 0
+    last_round = rounds
+    try:
+        while True:
+            for node in nodes:
+                if (node.round_num <= last_round and texts[node.index] is None and node.index not in running.values()
+                        and all(texts[i] is not None for i in node.inputs)):
+                    running[asyncio.ensure_future(run_turn(node, texts))] = node.index
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                texts[running.pop(task)] = task.result()
+            while completed_rounds < last_round:
+                round_texts = [texts[node.index] for node in nodes if node.round_num == completed_rounds + 1]
+                if any(text is None for text in round_texts):
+                    break
+                completed_rounds += 1
+                if on_round_complete is not None and on_round_complete(completed_rounds, round_texts):
+                    last_round = completed_rounds
+                    for task, index in list(running.items()):
+                        if nodes[index].round_num > last_round:
+                            task.cancel()
+                            del running[task]
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        raise
+    return [texts[node.index] for node in nodes if node.round_num <= last_round]
@@ -0,0 +1,74 @@
+"""
+Self-consistency for the Judge.
+Several verdict candidates for the same debate are scored together and reduced
+to one verdict, so the outcome no longer hangs on a single sample.
+"""
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import List, Optional, Sequence
+
+from convergence import text_similarity
+
+CONSENSUS_WORDS = ('consensus', 'agreement', 'conclusion', 'verdict', 'decision')
+AGGREGATIONS = ('majority', 'best')
+
+
+def mentions_consensus(text: str) -> bool:
+    """Keyword check for whether a verdict reports that the debate converged."""
+    lowered = text.lower()
+    return any(word in lowered for word in CONSENSUS_WORDS)
+
+
+@dataclass
+class VerdictChoice:
+    """The verdict picked from the Judge's candidates.
+
+    ``scores`` holds each candidate's total rubric score and ``support`` its
+    mean similarity to the other candidates. ``agreement`` is the mean
+    pairwise similarity of all candidates (None for a single candidate) and
+    ``convergence`` is the majority of the candidates' keyword checks.
+    """
+    text: str
+    index: int
+    candidates: List[str]
+    scores: List[float]
+    support: List[float]
+    agreement: Optional[float]
+    convergence: bool
+
+
+def choose_verdict(candidates: Sequence[str], scores: Sequence[float], method: str = "majority") -> VerdictChoice:
+    """Reduce verdict candidates to one.
+
+    ``majority`` picks the candidate closest to all the others (the medoid
+    under ``text_similarity``), the free-text form of a majority vote, with
+    ties going to the higher rubric score. ``best`` picks the highest score,
+    with ties going to the better-supported candidate.
+    """
+    if method not in AGGREGATIONS:
+        raise ValueError(f"Unknown verdict aggregation: {method} (choose from {', '.join(AGGREGATIONS)})")
+    if not candidates:
+        raise ValueError("choose_verdict needs at least one candidate")
+    count = len(candidates)
+    support = [0.0] * count
+    for i, j in combinations(range(count), 2):
+        similarity = text_similarity(candidates[i], candidates[j])
+        support[i] += similarity
+        support[j] += similarity
+    if count > 1:
+        support = [total / (count - 1) for total in support]
+    if method == "best":
+        index = max(range(count), key=lambda i: (scores[i], support[i]))
+    else:
+        index = max(range(count), key=lambda i: (support[i], scores[i]))
+    votes = sum(mentions_consensus(text) for text in candidates)
+    return VerdictChoice(
+        text=candidates[index],
+        index=index,
+        candidates=list(candidates),
+        scores=list(scores),
+        support=support,
+        agreement=sum(support) / count if count > 1 else None,
+        convergence=votes * 2 > count,
+    )